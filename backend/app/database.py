@@ -1,5 +1,13 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import threading
+import time
 
 # Get DB URL from env or use SQLite fallback
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./farma.db")
@@ -8,9 +16,170 @@ DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./farma.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Create engine (check_same_thread is for SQLite only)
-connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-engine = create_engine(DATABASE_URL, echo=True, connect_args=connect_args)
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+# SQL logging is for debugging only; it is far too slow for the request path
+DB_ECHO = _env_flag("DB_ECHO", "false")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Hosted Postgres poolers (Neon) drop idle connections, so recycle and ping before use
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 300))
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", "true")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+class PoolMetrics:
+    """Connection pool counters: checkouts, connections in use, and time spent waiting for one."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def on_connect(self, *args):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, *args):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, *args):
+        with self._lock:
+            self.checked_out -= 1
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.timeouts += timed_out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "wait_ms_avg": round(1000 * self.wait_seconds_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(1000 * self.wait_seconds_max, 3),
+                "timeouts": self.timeouts,
+            }
+
+class _MeteredPoolMixin:
+    """Records how long each checkout waited for a free connection."""
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    pass
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a write is in progress; NORMAL sync is safe under WAL
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def _is_in_memory(url: str) -> bool:
+    return url.startswith("sqlite") and (url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url)
+
+def _engine_kwargs(url: str, poolclass, pool_size: int, max_overflow: int, pool_timeout: float,
+                   pool_recycle: int, pool_pre_ping: bool) -> dict:
+    kwargs = {}
+    if not _is_in_memory(url):
+        kwargs.update(poolclass=poolclass, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+        if not url.startswith("sqlite"):
+            kwargs.update(pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping)
+    return kwargs
+
+def _instrument(engine, url: str):
+    """Attaches PoolMetrics (as engine.pool_metrics) and, for SQLite files, the WAL pragmas."""
+    metrics = PoolMetrics()
+    if isinstance(engine.pool, _MeteredPoolMixin):
+        engine.pool.metrics = metrics
+    event.listen(engine, "connect", metrics.on_connect)
+    event.listen(engine, "checkout", metrics.on_checkout)
+    event.listen(engine, "checkin", metrics.on_checkin)
+    if url.startswith("sqlite") and not _is_in_memory(url):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    engine.pool_metrics = metrics
+
+def create_db_engine(url: str = DATABASE_URL, echo: bool = DB_ECHO, pool_size: int = DB_POOL_SIZE,
+                     max_overflow: int = DB_MAX_OVERFLOW, pool_timeout: float = DB_POOL_TIMEOUT,
+                     pool_recycle: int = DB_POOL_RECYCLE, pool_pre_ping: bool = DB_POOL_PRE_PING):
+    """
+    Engine shared by the whole app. File-backed databases get a metered QueuePool
+    (see pool_metrics); SQLite files are switched to WAL with relaxed fsync and mmap reads.
+    In-memory SQLite keeps SQLAlchemy's default pool.
+    """
+    # check_same_thread is for SQLite only
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, echo=echo, connect_args=connect_args, **_engine_kwargs(
+        url, MeteredQueuePool, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping))
+    _instrument(engine, url)
+    return engine
+
+def async_url(url: str) -> str:
+    """Maps a sync DATABASE_URL to its asyncio driver: aiosqlite for SQLite, asyncpg for Postgres."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if parsed.get_backend_name() == "postgresql":
+        # asyncpg takes ssl= instead of libpq's sslmode= and has no channel_binding option
+        query = dict(parsed.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        query.pop("channel_binding", None)
+        return parsed.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    return url
+
+def create_async_db_engine(url: str = DATABASE_URL, echo: bool = DB_ECHO, pool_size: int = DB_POOL_SIZE,
+                           max_overflow: int = DB_MAX_OVERFLOW, pool_timeout: float = DB_POOL_TIMEOUT,
+                           pool_recycle: int = DB_POOL_RECYCLE, pool_pre_ping: bool = DB_POOL_PRE_PING):
+    """
+    asyncio counterpart of create_db_engine for hot request paths, so waiting on
+    the database does not hold a threadpool thread. Same pool settings and pragmas.
+    """
+    engine = create_async_engine(async_url(url), echo=echo, **_engine_kwargs(
+        url, MeteredAsyncQueuePool, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping))
+    _instrument(engine.sync_engine, url)
+    return engine
+
+engine = create_db_engine()
+async_engine = create_async_db_engine()
+
+def pool_metrics(db_engine=None) -> dict:
+    db_engine = db_engine or engine
+    db_engine = getattr(db_engine, "sync_engine", db_engine)
+    return {"pool": db_engine.pool.status(), **db_engine.pool_metrics.snapshot()}
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
@@ -18,3 +187,7 @@ def create_db_and_tables():
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    async with AsyncSession(async_engine) as session:
+        yield session
@@ -0,0 +1,55 @@
+import hmac
+import os
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.schemas import User
+from app.services import auth_service
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# Shared secret for operator endpoints (model rollout, internal stats); unset disables them
+OPERATOR_API_KEY = os.getenv("OPERATOR_API_KEY", "")
+OPERATOR_KEY_HEADER = "X-Operator-Key"
+
+def _unauthorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
+    """
+    Claims ({'sub': phone, 'user_id': int, 'exp': ...}) of the request's bearer
+    token. Verified statelessly, so routes that only need the user id never hit the DB.
+    """
+    if credentials is None:
+        raise _unauthorized()
+    claims = auth_service.decode_access_token(credentials.credentials)
+    if claims is None or "user_id" not in claims:
+        raise _unauthorized()
+    return claims
+
+def get_optional_claims(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> Optional[dict]:
+    """Like get_token_claims for routes that also serve anonymous callers: a missing or invalid token gives None."""
+    if credentials is None:
+        return None
+    return auth_service.decode_access_token(credentials.credentials)
+
+async def get_current_user(claims: dict = Depends(get_token_claims)) -> User:
+    """The authenticated User row, served from the user cache when possible."""
+    user = auth_service.user_cache.get(("id", claims["user_id"]))
+    if user is None:
+        user = await auth_service.get_user_by_id(claims["user_id"])
+    if user is None:
+        raise _unauthorized()
+    return user
+
+def require_operator(operator_key: Optional[str] = Header(None, alias=OPERATOR_KEY_HEADER)) -> None:
+    """
+    Guards operator controls. Farmer accounts carry no role, so a bearer token is
+    not enough: the request must present OPERATOR_API_KEY in X-Operator-Key.
+    """
+    if not OPERATOR_API_KEY or not operator_key or not hmac.compare_digest(operator_key, OPERATOR_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operator key required")
@@ -1,16 +1,39 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.database import create_db_and_tables
+import asyncio
+from app.database import async_engine, create_db_and_tables, pool_metrics
+from app.services.map_service import map_service
+from app.services.sms_service import sms_queue
+from app.services.auth_service import pending_store
+from app.services.bulk_import import import_pool
+from app.services.otp_store import run_sweeper
+from app.services.model_registry import model_registry, run_watcher
+from app.services.shadow_evaluator import shadow_evaluator
 from app.routers import auth
 from app.routers import recommendations 
 from app.routers import chat
+from app.routers import models
+from app.routers import fertilizer
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Create DB tables
     create_db_and_tables()
+    await sms_queue.start()
+    otp_sweeper = asyncio.create_task(run_sweeper(pending_store))
+    model_watcher = asyncio.create_task(run_watcher(model_registry))
+    shadow_evaluator.start()
+    import_pool.start()
     yield
+    # Shutdown: Flush queued SMS, close pooled HTTP and DB connections
+    otp_sweeper.cancel()
+    model_watcher.cancel()
+    shadow_evaluator.stop()
+    import_pool.stop()
+    await sms_queue.stop()
+    await map_service.aclose()
+    await async_engine.dispose()
 
 app = FastAPI(title="FARMA Backend", version="1.0.0", lifespan=lifespan)
 
@@ -27,7 +50,17 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(recommendations.router)
 app.include_router(chat.router)
+app.include_router(models.router)
+app.include_router(fertilizer.router)
 
 @app.get("/")
 def read_root():
     return {"message": "Farm Advisory Backend is Running"}
+
+@app.get("/metrics/db")
+def db_metrics():
+    """
+    Connection pool usage per engine: checkouts, connections in use and checkout
+    wait times. "async" is the asyncio engine behind auth, OTP and outcome logging.
+    """
+    return {"sync": pool_metrics(), "async": pool_metrics(async_engine)}
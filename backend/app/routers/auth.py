@@ -1,17 +1,36 @@
-from fastapi import APIRouter, HTTPException, status
-from app.schemas import UserCreate, OTPRequest, OTPVerify, Token, User, LoginRequest
+import csv
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from app.dependencies import get_current_user, require_operator
+from app.schemas import UserCreate, OTPRequest, OTPVerify, Token, User, LoginRequest, UserProfile
 from app.services import auth_service
+from app.services.bulk_import import ImportInProgress, import_pool
+from app.services.sms_service import sms_queue
+from app.services.workers import PoolSaturated
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/register")
-def register(user_in: UserCreate):
-    result = auth_service.register_user_step1(
-        user_in.phone, 
-        user_in.full_name, 
-        user_in.language,
-        password=user_in.password
+def _busy() -> HTTPException:
+    # The bcrypt pool is full; ask the client to back off instead of queueing forever
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again shortly.",
+        headers={"Retry-After": "1"},
     )
+
+@router.post("/register")
+async def register(user_in: UserCreate):
+    # Returns as soon as the OTP is queued; the SMS goes out in the background
+    try:
+        result = await auth_service.register_user_step1(
+            user_in.phone, 
+            user_in.full_name, 
+            user_in.language,
+            password=user_in.password
+        )
+    except PoolSaturated:
+        raise _busy()
     if result.get("error"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -20,9 +39,12 @@ def register(user_in: UserCreate):
     return result
 
 @router.post("/login")
-def login(login_in: LoginRequest):
+async def login(login_in: LoginRequest):
     """Login with phone and password."""
-    result = auth_service.login_user(login_in.phone, login_in.password)
+    try:
+        result = await auth_service.login_user(login_in.phone, login_in.password)
+    except PoolSaturated:
+        raise _busy()
     if result.get("error"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,9 +53,9 @@ def login(login_in: LoginRequest):
     return result
 
 @router.post("/verify-otp", response_model=Token)
-def verify_otp(otp_in: OTPVerify):
+async def verify_otp(otp_in: OTPVerify):
     try:
-        token_data = auth_service.verify_otp_step2(otp_in.phone, otp_in.otp)
+        token_data = await auth_service.verify_otp_step2(otp_in.phone, otp_in.otp)
         if not token_data:
             # None returned means input mismatch (wrong OTP)
             raise HTTPException(
@@ -50,3 +72,35 @@ def verify_otp(otp_in: OTPVerify):
             detail=str(e),
         )
 
+@router.get("/me", response_model=UserProfile)
+def me(user: User = Depends(get_current_user)):
+    """Profile of the token's owner; no DB query when the user is cached."""
+    return UserProfile(user_id=user.id, phone=user.phone, full_name=user.full_name, language=user.language)
+
+@router.post("/bulk-import", dependencies=[Depends(require_operator)])
+async def bulk_import(file: UploadFile = File(...)):
+    """
+    Enrolls farmers from a CSV (phone, full_name, optional language and password)
+    without per-farmer OTP, so it takes the operator key. Already registered
+    phones are skipped. Passwords are hashed on the server's shared import pool.
+    """
+    def run():
+        lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        return import_pool.run(lines)
+
+    try:
+        return await run_in_threadpool(run)
+    except ImportInProgress as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+@router.get("/workers", dependencies=[Depends(require_operator)])
+def worker_stats():
+    """Queue depth and throughput of the bcrypt pool and the SMS queue."""
+    return {"bcrypt": auth_service.password_pool.stats(), "sms": sms_queue.stats()}
@@ -1,9 +1,19 @@
-from fastapi import APIRouter, HTTPException, Body
+import asyncio
+import json
+import os
+from fastapi import APIRouter, HTTPException, Body, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from app.services.chat_service import chat_service
 from app.schemas import Recommendation
 
+# Seconds without a client frame before /chat/ws sends {"event": "ping"}
+WS_HEARTBEAT_SECONDS = float(os.getenv("CHAT_WS_HEARTBEAT_SECONDS", 25))
+# Seconds without a client frame (message, ping or pong) before /chat/ws closes the connection
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("CHAT_WS_IDLE_TIMEOUT_SECONDS", 120))
+
 router = APIRouter(
     prefix="/chat",
     tags=["chat"],
@@ -29,7 +39,110 @@ async def chat(request: ChatRequest):
     Process a chat message and return the bot's response and current state.
     """
     try:
-        result = chat_service.process_message(request.session_id, request.message, request.language)
+        result = await chat_service.process_message(request.session_id, request.message, request.language)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# Proxies (nginx) buffer responses unless told not to, which would hold back the early events
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming variant of POST /chat/. Sends a "progress" event as soon as the
+    new state is known (e.g. "Analyzing your farm profile..." or a location
+    lookup in progress), then the final "message" event once the geocoder or
+    recommendations finish. Each event has the ChatResponse fields.
+    Server-sent events by default; NDJSON (one event object per line, with an
+    "event" key) when the Accept header asks for application/x-ndjson.
+    """
+    ndjson = "application/x-ndjson" in http_request.headers.get("accept", "")
+
+    async def events():
+        try:
+            async for reply in chat_service.stream_message(request.session_id, request.message, request.language):
+                yield _format_event(reply, ndjson)
+        except Exception as e:
+            yield _format_event({"event": "error", "detail": str(e)}, ndjson)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson" if ndjson else "text/event-stream",
+                             headers=STREAM_HEADERS)
+
+def _format_event(reply: dict, ndjson: bool) -> str:
+    if ndjson:
+        return json.dumps(jsonable_encoder(reply)) + "\n"
+    data = jsonable_encoder({k: v for k, v in reply.items() if k != "event"})
+    return f"event: {reply['event']}\ndata: {json.dumps(data)}\n\n"
+
+@router.websocket("/ws")
+async def chat_ws(websocket: WebSocket, session_id: Optional[str] = None, language: str = "en"):
+    """
+    Chat over one WebSocket. The connection holds its ChatSession for its whole
+    life, so turns skip the session store lookup; the session is still saved
+    after every turn, so a client that drops reconnects with ?session_id= and
+    picks up where it was (the first frame then says "resumed": true).
+
+    The server sends JSON objects with an "event" key: "state" on connect,
+    then the same "progress"/"message" events as POST /chat/stream for each
+    turn, "ping"/"pong" heartbeats and "error".
+    The client sends {"message": ..., "language": ...} (a plain text frame is
+    taken as the message), {"type": "ping"} or {"type": "pong"}. After
+    WS_HEARTBEAT_SECONDS of silence the server pings; after
+    WS_IDLE_TIMEOUT_SECONDS it closes with 1001.
+    """
+    await websocket.accept()
+    session = await chat_service.get_or_create_session(session_id)
+    await websocket.send_json({**chat_service.state_reply(session, language), "resumed": session.session_id == session_id})
+    silent = 0.0
+    try:
+        while True:
+            try:
+                async with asyncio.timeout(WS_HEARTBEAT_SECONDS):
+                    frame = await websocket.receive_text()
+            except TimeoutError:
+                silent += WS_HEARTBEAT_SECONDS
+                if silent >= WS_IDLE_TIMEOUT_SECONDS:
+                    await websocket.close(code=1001)
+                    return
+                await websocket.send_json({"event": "ping"})
+                continue
+            silent = 0.0
+
+            try:
+                request = _parse_frame(frame)
+            except ValueError as e:
+                await websocket.send_json({"event": "error", "detail": str(e)})
+                continue
+            if request.get("type") == "ping":
+                await websocket.send_json({"event": "pong"})
+                continue
+            if request.get("type") == "pong":
+                continue
+
+            language = request.get("language") or language
+            try:
+                async for reply in chat_service.stream_turn(session, request["message"], language):
+                    await websocket.send_json(jsonable_encoder(reply))
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"event": "error", "detail": str(e)})
+    except WebSocketDisconnect:
+        pass # the session was saved by its last turn; reconnecting with its id resumes it
+
+def _parse_frame(frame: str) -> dict:
+    """A client frame as {"message", "language"} or {"type"}; raises ValueError for anything else."""
+    try:
+        request = json.loads(frame)
+    except ValueError:
+        return {"message": frame}
+    if not isinstance(request, dict):
+        return {"message": frame}
+    if request.get("type") in ("ping", "pong"):
+        return request
+    if not isinstance(request.get("message"), str):
+        raise ValueError('Expected {"message": "..."} or {"type": "ping"}')
+    if request.get("language") is not None and not isinstance(request["language"], str):
+        raise ValueError("language must be a string")
+    return request
@@ -0,0 +1,38 @@
+from typing import Annotated, List
+from fastapi import APIRouter, Body, HTTPException, Query
+from ..schemas import FertilizerQuery, FertilizerRecommendation
+from ..services.fertilizer_engine import FERTILIZER_K, fertilizer_index
+
+router = APIRouter()
+
+# Largest number of queries accepted by /fertilizer/batch
+MAX_FERTILIZER_BATCH = 10000
+
+def _check_loaded():
+    if not fertilizer_index.loaded:
+        raise HTTPException(status_code=503, detail="Fertilizer dataset is not loaded.")
+
+@router.post("/fertilizer", response_model=FertilizerRecommendation)
+async def recommend_fertilizer(query: FertilizerQuery, k: Annotated[int, Query(ge=1, le=50)] = FERTILIZER_K):
+    """
+    Recommend a fertilizer for measured N/P/K levels: the k nearest labelled
+    profiles from the dataset (restricted to soilType / cropType when given)
+    and the most common fertilizer among them.
+    """
+    _check_loaded()
+    result = fertilizer_index.query(query, k)
+    if not result.neighbours:
+        raise HTTPException(status_code=404, detail="No fertilizer profiles for the given soil and crop type.")
+    return result
+
+@router.post("/fertilizer/batch", response_model=List[FertilizerRecommendation])
+def recommend_fertilizer_batch(queries: Annotated[List[FertilizerQuery], Body()], k: Annotated[int, Query(ge=1, le=50)] = FERTILIZER_K):
+    """
+    Answer many fertilizer queries in one call, in input order. Queries with
+    an unknown soil or crop type get an empty result instead of failing the batch.
+    """
+    # Plain def: FastAPI runs it in the threadpool, so large batches never block the event loop
+    if len(queries) > MAX_FERTILIZER_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_FERTILIZER_BATCH} queries per batch.")
+    _check_loaded()
+    return fertilizer_index.query_batch(queries, k)
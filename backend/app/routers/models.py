@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+from app.dependencies import require_operator
+from app.services.model_registry import ReloadInProgress, UnknownModelVersion, model_registry
+from app.services.shadow_evaluator import shadow_evaluator
+
+router = APIRouter(prefix="/models", tags=["models"])
+
+class ABSplitUpdate(BaseModel):
+    percent: float = Field(ge=0, le=100)
+
+def _load_error(e: Exception) -> HTTPException:
+    if isinstance(e, UnknownModelVersion):
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("")
+def list_models():
+    """Model versions on disk, the one serving requests, and any load in progress."""
+    return model_registry.status()
+
+@router.post("/{version}/activate", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_operator)])
+async def activate_model(version: str):
+    """
+    Loads `version` in the background and swaps it in once its smoke test passes;
+    requests keep being served by the current version meanwhile. Other workers
+    follow through the pointer file. Poll GET /models for the outcome.
+    """
+    try:
+        model_registry.activate_in_background(version)
+    except (UnknownModelVersion, ReloadInProgress) as e:
+        raise _load_error(e)
+    return {"status": "loading", "version": version}
+
+@router.post("/{version}/candidate", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_operator)])
+async def load_candidate(version: str):
+    """
+    Loads `version` in the background as the candidate. From then on it scores
+    live traffic in shadow, and serves the A/B share set with PUT /models/ab-split.
+    """
+    try:
+        model_registry.load_candidate_in_background(version)
+    except (UnknownModelVersion, ReloadInProgress) as e:
+        raise _load_error(e)
+    return {"status": "loading", "candidate": version}
+
+@router.delete("/candidate", dependencies=[Depends(require_operator)])
+def clear_candidate():
+    model_registry.clear_candidate()
+    return {"candidate": None}
+
+@router.put("/ab-split", dependencies=[Depends(require_operator)])
+def set_ab_split(update: ABSplitUpdate):
+    """Percentage of users/sessions served by the candidate model (0 = shadow only)."""
+    model_registry.ab_split.percent = update.percent
+    return {"ab_percent": update.percent}
+
+@router.get("/evaluation", dependencies=[Depends(require_operator)])
+def evaluation():
+    """Shadow comparison of candidate and live models: agreement, top-k overlap and latency per soil/season."""
+    return {"ab_percent": model_registry.ab_split.percent, **shadow_evaluator.snapshot()}
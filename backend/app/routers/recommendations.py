@@ -1,23 +1,235 @@
-from fastapi import APIRouter, HTTPException, Body
-from typing import List
-from ..schemas import FarmerContext, Recommendation
-from ..services.recommendation_engine import engine
+import itertools
+import json
+import time
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Body, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Annotated, Any, Dict, List, Optional
+from ..dependencies import get_current_user, get_optional_claims
+from ..schemas import FarmerContext, OutcomeReport, RankingOptions, Recommendation, User
+from ..services.model_registry import model_registry
+from ..services.outcome_log import log_outcome
+from ..services.recommendation_engine import RecommendationEngine
+from ..services.shadow_evaluator import shadow_evaluator
 
 router = APIRouter()
 
+# Contexts scored per vectorized engine call in the batch endpoint
+BATCH_CHUNK_SIZE = 1000
+# Most contexts one batch request may carry
+MAX_BATCH_ITEMS = 10000
+# Largest batch body accepted, checked while it is read (a context is well under 1 KB)
+MAX_BATCH_BYTES = MAX_BATCH_ITEMS * 1024
+# Response header naming the model version that produced the answer
+MODEL_VERSION_HEADER = "X-Model-Version"
+# A/B key for anonymous callers (signed-in users are keyed by user id)
+SESSION_HEADER = "X-Session-Id"
+# Largest cartesian product a what-if request may expand to
+MAX_WHAT_IF_VARIANTS = 1000
+
+class WhatIfRequest(BaseModel):
+    base: FarmerContext
+    # FarmerContext field -> values to try, e.g. {"season": ["kharif", "rabi"], "hasIrrigation": [true, false]}
+    overrides: Dict[str, List[Any]] = Field(default_factory=dict)
+
+def _current_engine() -> RecommendationEngine:
+    # Read the reference once: the whole request is served by this engine even if a swap happens meanwhile
+    engine = model_registry.active
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Recommendation model is not loaded.")
+    return engine
+
 @router.post("/recommendations", response_model=List[Recommendation])
-async def get_recommendations(context: FarmerContext = Body(...)):
+async def get_recommendations(request: Request, response: Response, background_tasks: BackgroundTasks,
+                              options: Annotated[RankingOptions, Query()], context: FarmerContext = Body(...),
+                              claims: Optional[dict] = Depends(get_optional_claims)):
     """
-    Get crop recommendations based on the farmer's context.
-    Currently primarily uses Soil Type for prediction.
+    Get crop recommendations based on the farmer's context, best first.
+    Currently primarily uses Soil Type for prediction. Query parameters k,
+    minProbability, seasonWeight and landWeight control the ranking (default:
+    the single best crop).
+    When a candidate model is loaded, an A/B share of users (or X-Session-Id
+    sessions) is served by it, and the other model scores the request in the
+    background for comparison.
     """
     if not context.soilType:
         raise HTTPException(status_code=400, detail="Soil Type is required for recommendations.")
-    
-    recommendations = engine.get_recommendations(context)
-    
+
+    key = str(claims["user_id"]) if claims and "user_id" in claims else request.headers.get(SESSION_HEADER)
+    engine, shadow, arm = model_registry.route(key)
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Recommendation model is not loaded.")
+    response.headers[MODEL_VERSION_HEADER] = engine.version
+    started = time.perf_counter()
+    recommendations = engine.get_recommendations(context, options)
+    if shadow is not None:
+        background_tasks.add_task(_submit_shadow, context, engine, shadow, arm, recommendations, time.perf_counter() - started, options)
+
     if not recommendations:
-        # Fallback or empty if no soil type matches known types
-        raise HTTPException(status_code=404, detail="No suitable crops found for the given soil type.")
-        
+        # Fallback or empty if no soil type matches known types.
+        # Returned rather than raised so the shadow comparison still runs.
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "No suitable crops found for the given soil type."},
+            headers={MODEL_VERSION_HEADER: engine.version},
+            background=background_tasks,
+        )
+
     return recommendations
+
+@router.post("/recommendations/what-if")
+async def what_if(body: WhatIfRequest, options: Annotated[RankingOptions, Query()]):
+    """
+    Compare context variants in one call. Every combination of the override
+    values is applied to `base` and all variants are scored in one batch call.
+    Returns the axes (in request order), the details of every crop that appears
+    once, and `matrix`: one list of {crop, confidence, score} per variant, in
+    row-major order over the axes (the last axis varies fastest).
+    """
+    axes = []
+    for field, values in body.overrides.items():
+        if field not in FarmerContext.model_fields:
+            raise HTTPException(status_code=400, detail=f"Unknown farmer context field: {field}")
+        if not values:
+            raise HTTPException(status_code=400, detail=f"No values to try for {field}")
+        try:
+            values = [getattr(FarmerContext.model_validate({field: value}), field) for value in values]
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+        axes.append((field, values))
+
+    variants = 1
+    for _, values in axes:
+        variants *= len(values)
+    if variants > MAX_WHAT_IF_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"{variants} variants requested; the limit is {MAX_WHAT_IF_VARIANTS}.")
+    if not body.base.soilType and "soilType" not in body.overrides:
+        raise HTTPException(status_code=400, detail="Soil Type is required for recommendations.")
+
+    engine = _current_engine()
+    fields = [field for field, _ in axes]
+    # Override values are validated once per axis above, so the copies skip validation
+    contexts = [body.base.model_copy(update=dict(zip(fields, combo))) for combo in itertools.product(*(v for _, v in axes))]
+    scored = engine.get_recommendations_batch(contexts, options)
+
+    crops = {}
+    matrix = []
+    for recs in scored:
+        for rec in recs:
+            if rec.cropName not in crops:
+                crops[rec.cropName] = {"waterRequirement": rec.waterRequirement, "riskLevel": rec.riskLevel, "imageUrl": rec.imageUrl}
+        matrix.append([{"crop": rec.cropName, "confidence": rec.confidence, "score": rec.score} for rec in recs])
+
+    return JSONResponse(
+        content={
+            "axes": [{"field": field, "values": values} for field, values in axes],
+            "crops": crops,
+            "matrix": matrix,
+        },
+        headers={MODEL_VERSION_HEADER: engine.version},
+    )
+
+@router.post("/recommendations/outcomes", status_code=201)
+async def report_outcome(report: OutcomeReport, user: User = Depends(get_current_user)):
+    """
+    Record the crop a signed-in farmer actually planted for a context. Logged
+    outcomes are training rows for the next model version (python
+    train_crop_model.py --incremental), which caps how many each user contributes.
+    """
+    engine = _current_engine()
+    if not report.context.soilType or report.context.soilType.strip().lower() not in engine.soil_index:
+        raise HTTPException(status_code=400, detail="A known Soil Type is required.")
+    if report.crop.strip().lower() not in (label.lower() for label in engine.crop_labels):
+        raise HTTPException(status_code=400, detail=f"Unknown crop: {report.crop}")
+
+    outcome_id = await log_outcome(report.context, report.crop, user.id, engine.version)
+    return {"id": outcome_id}
+
+async def _submit_shadow(*job):
+    # Runs on the event loop once the response is fully sent: waking the shadow
+    # thread earlier lets it take the GIL between the response's socket writes.
+    shadow_evaluator.submit(*job)
+
+@router.post("/recommendations/batch")
+async def get_recommendations_batch(request: Request, options: Annotated[RankingOptions, Query()]):
+    """
+    Score many farmer contexts in one call.
+    Accepts a JSON array of FarmerContext objects, or NDJSON (one context per line)
+    when sent as application/x-ndjson. Streams back one NDJSON line per input, in
+    input order: {"index": i, "recommendations": [...]} or {"index": i, "error": "..."}.
+    Every line is scored by the model version named in X-Model-Version, with the
+    same ranking query parameters as /recommendations.
+    """
+    engine = _current_engine()
+    # The body is read up front: StreamingResponse listens for client
+    # disconnects on the same receive channel while the response streams.
+    body = await _read_batch_body(request)
+    if "ndjson" in request.headers.get("content-type", ""):
+        items = [line for line in body.splitlines() if line.strip()]
+        lines = (_decode_line(line) for line in items)
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON.")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of farmer contexts.")
+        lines = iter(items)
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} contexts per batch.")
+
+    return StreamingResponse(_stream_batch(engine, lines, options), media_type="application/x-ndjson",
+                             headers={MODEL_VERSION_HEADER: engine.version})
+
+async def _read_batch_body(request: Request) -> bytes:
+    """The request body, refused with 413 as soon as it grows past MAX_BATCH_BYTES."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch body exceeds {MAX_BATCH_BYTES} bytes.")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail=f"Batch body exceeds {MAX_BATCH_BYTES} bytes.")
+    return bytes(body)
+
+def _decode_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+def _stream_batch(engine: RecommendationEngine, lines, options: Optional[RankingOptions] = None):
+    # Sync generator: Starlette iterates it in the threadpool, so scoring a
+    # chunk never blocks the event loop.
+    index = 0
+    chunk = []
+    for item in lines:
+        chunk.append((index, _parse_context(item)))
+        index += 1
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield _score_chunk(engine, chunk, options)
+            chunk = []
+    if chunk:
+        yield _score_chunk(engine, chunk, options)
+
+def _parse_context(item):
+    if isinstance(item, Exception):
+        return f"Invalid JSON: {item}"
+    try:
+        return FarmerContext.model_validate(item)
+    except ValidationError as e:
+        return f"Invalid farmer context: {e.errors(include_url=False)}"
+
+def _score_chunk(engine: RecommendationEngine, chunk: list, options: Optional[RankingOptions] = None) -> str:
+    contexts = [ctx for _, ctx in chunk if isinstance(ctx, FarmerContext)]
+    scored = iter(engine.get_recommendations_batch(contexts, options))
+
+    lines = []
+    for index, ctx in chunk:
+        if isinstance(ctx, FarmerContext):
+            recs = [rec.model_dump(mode="json") for rec in next(scored)]
+            lines.append(json.dumps({"index": index, "recommendations": recs}))
+        else:
+            lines.append(json.dumps({"index": index, "error": ctx}))
+    return "\n".join(lines) + "\n"
@@ -1,7 +1,8 @@
 from typing import Optional, List
 from enum import Enum
 from sqlmodel import SQLModel, Field
-from pydantic import BaseModel as PydanticBaseModel
+from pydantic import BaseModel as PydanticBaseModel, ConfigDict
+from pydantic import Field as PydanticField
 
 class RiskLevel(str, Enum):
     Low = "Low"
@@ -17,6 +18,41 @@ class User(SQLModel, table=True):
     language: str = "en"
     created_at: Optional[str] = None
 
+class ChatSessionRecord(SQLModel, table=True):
+    session_id: str = Field(primary_key=True)
+    state: str = "START"
+    district: Optional[str] = None
+    farm_state: Optional[str] = None
+    soil_type: Optional[str] = None
+    season: Optional[str] = None
+    land_area: Optional[float] = None
+    has_irrigation: Optional[bool] = None
+    updated_at: float = Field(default=0.0, index=True)  # Unix time of last write
+
+class PendingRegistrationRecord(SQLModel, table=True):
+    phone: str = Field(primary_key=True)
+    otp: str
+    full_name: Optional[str] = None
+    language: str = "en"
+    password_hash: Optional[str] = None  # Hashed at step 1, never stored in plain text
+    expires_at: float = Field(default=0.0, index=True)  # Unix time
+
+class RecommendationOutcome(SQLModel, table=True):
+    """A farmer context with the crop actually planted: a labelled row for train_crop_model.py."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_at: float = Field(default=0.0, index=True)  # Unix time
+    user_id: Optional[int] = None
+    model_version: Optional[str] = None  # Version that served the recommendation
+    soil_type: str
+    season: Optional[str] = None
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    moisture: Optional[float] = None
+    nitrogen: Optional[float] = None
+    potassium: Optional[float] = None
+    phosphorous: Optional[float] = None
+    crop: str  # Lower-case crop label, as in crop_encoder.pkl
+
 # --- API Request/Response Schemas ---
 class UserCreate(PydanticBaseModel):
     phone: str
@@ -40,6 +76,12 @@ class Token(PydanticBaseModel):
     token_type: str
     user_id: int
 
+class UserProfile(PydanticBaseModel):
+    user_id: int
+    phone: str
+    full_name: Optional[str] = None
+    language: str = "en"
+
 class FarmerContext(PydanticBaseModel):
     district: Optional[str] = None
     state: Optional[str] = None
@@ -47,11 +89,58 @@ class FarmerContext(PydanticBaseModel):
     season: Optional[str] = None
     landArea: Optional[float] = None
     hasIrrigation: Optional[bool] = None
+    # Optional field measurements; when any is given the multi-feature model is used
+    temperature: Optional[float] = None  # °C
+    humidity: Optional[float] = None  # %
+    moisture: Optional[float] = None  # soil moisture %
+    nitrogen: Optional[float] = None
+    potassium: Optional[float] = None
+    phosphorous: Optional[float] = None
 
 class Recommendation(PydanticBaseModel):
+    # Frozen: the lookup table hands the same instances to every request
+    model_config = ConfigDict(frozen=True)
+
     cropName: str
     suitabilityExplanation: str
     waterRequirement: str
     riskLevel: RiskLevel
     confidence: float
     imageUrl: Optional[str] = None
+    score: Optional[float] = None  # Ranking score: confidence after season/land-area weighting
+
+class OutcomeReport(PydanticBaseModel):
+    context: FarmerContext
+    crop: str  # Crop the farmer planted
+
+class FertilizerQuery(PydanticBaseModel):
+    nitrogen: float = PydanticField(ge=0)
+    phosphorous: float = PydanticField(ge=0)
+    potassium: float = PydanticField(ge=0)
+    # Optional filters; only profiles with this soil / crop are considered
+    soilType: Optional[str] = None
+    cropType: Optional[str] = None
+
+class FertilizerNeighbour(PydanticBaseModel):
+    fertilizer: str
+    soilType: str
+    cropType: str
+    nitrogen: float
+    phosphorous: float
+    potassium: float
+    distance: float
+
+class FertilizerRecommendation(PydanticBaseModel):
+    fertilizer: Optional[str] = None  # Most common label among the neighbours
+    confidence: float  # Share of neighbours with that label
+    neighbours: List[FertilizerNeighbour]
+
+class RankingOptions(PydanticBaseModel):
+    """How candidate crops are ranked; the defaults give the single best crop."""
+    model_config = ConfigDict(frozen=True)
+
+    k: int = PydanticField(1, ge=1, le=20)  # Recommendations to return
+    minProbability: float = PydanticField(0.05, ge=0.0, le=1.0)  # Crops at or below this are never recommended
+    # Weights of the rule modifiers (zaid season, small land area); 0 ranks on probability alone
+    seasonWeight: float = PydanticField(1.0, ge=0.0)
+    landWeight: float = PydanticField(1.0, ge=0.0)
@@ -1,12 +1,18 @@
+import hashlib
 import random
 import os
+import time
 import bcrypt
 from datetime import datetime, timedelta
-from jose import jwt
-from sqlmodel import Session, select
-from app.database import engine
+from jose import JWTError, jwt
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import async_engine
 from app.schemas import User
-from app.services.sms_service import send_otp
+from app.services.cache import TTLCache
+from app.services.otp_store import create_pending_store
+from app.services.sms_service import sms_queue
+from app.services.workers import BoundedExecutor
 
 # Monkey patch removed - using bcrypt directly
 # from passlib.context import CryptContext
@@ -16,11 +22,27 @@ SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey") # Change this in producti
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60 # 30 days
 
+# bcrypt is deliberately slow; it gets its own small pool so a login burst
+# cannot starve the threadpool that serves every other endpoint
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", min(4, os.cpu_count() or 1)))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 256))
+password_pool = BoundedExecutor("bcrypt", BCRYPT_WORKERS, BCRYPT_MAX_QUEUE)
+
 # pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Simple in-memory storage for pending registrations
-# {phone: {"otp": "1234", "full_name": "...", "language": "en", "password": "..."}}
-pending_registrations = {}
+# Decoded JWT claims keyed by sha256(token): repeat requests skip signature checks
+CLAIMS_CACHE_SIZE = int(os.getenv("CLAIMS_CACHE_SIZE", 50_000))
+CLAIMS_CACHE_TTL_SECONDS = float(os.getenv("CLAIMS_CACHE_TTL_SECONDS", 15 * 60))
+claims_cache = TTLCache(maxsize=CLAIMS_CACHE_SIZE, ttl=CLAIMS_CACHE_TTL_SECONDS)
+
+# Read-through cache of User rows under ("phone", phone) and ("id", id); writes go through create_user
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10_000))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 5 * 60))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+# Registrations awaiting OTP verification, shared by all workers and expiring after OTP_TTL_SECONDS
+# {phone: {"otp": "1234", "full_name": "...", "language": "en", "password_hash": "..."}}
+pending_store = create_pending_store()
 
 def generate_otp() -> str:
     return str(random.randint(1000, 9999))
@@ -48,37 +70,89 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
-def register_user_step1(phone: str, full_name: str, language: str, password: str = None):
+async def hash_password_async(password: str) -> str:
+    """hash_password on the bcrypt pool. Raises PoolSaturated when the pool is backed up."""
+    if password is None: return None
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt pool. Raises PoolSaturated when the pool is backed up."""
+    if not hashed_password: return False
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+def _cache_user(user: User):
+    user_cache.set(("phone", user.phone), user)
+    user_cache.set(("id", user.id), user)
+
+def invalidate_user(user: User):
+    user_cache.pop(("phone", user.phone))
+    user_cache.pop(("id", user.id))
+
+async def get_user_by_phone(phone: str):
+    """Cached User lookup. Misses are not cached, so a user created by another worker is found at once."""
+    user = user_cache.get(("phone", phone))
+    if user is not None:
+        return user
+    async with AsyncSession(async_engine) as session:
+        statement = select(User).where(User.phone == phone)
+        user = (await session.exec(statement)).first()
+    if user is not None:
+        _cache_user(user)
+    return user
+
+async def get_user_by_id(user_id: int):
+    user = user_cache.get(("id", user_id))
+    if user is not None:
+        return user
+    async with AsyncSession(async_engine) as session:
+        user = await session.get(User, user_id)
+    if user is not None:
+        _cache_user(user)
+    return user
+
+async def create_user(phone: str, full_name: str, password_hash: str, language: str) -> User:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        user = User(
+            phone=phone,
+            full_name=full_name,
+            password_hash=password_hash,
+            language=language
+        )
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+    _cache_user(user)
+    return user
+
+async def register_user_step1(phone: str, full_name: str, language: str, password: str = None):
     """
     Initiates registration.
     1. Generates OTP.
-    2. Stores temp registration data (NOT in DB yet).
-    3. Sends OTP.
+    2. Stores temp registration data (NOT in the users table yet).
+    3. Queues the OTP SMS (delivered in the background).
     """
     # Check if user already exists in DB
-    with Session(engine) as session:
-        statement = select(User).where(User.phone == phone)
-        existing_user = session.exec(statement).first()
-        if existing_user:
-            # User already exists - can't register again
-            return {"message": "User already registered. Please login.", "is_existing_user": True, "error": True}
+    existing_user = await get_user_by_phone(phone)
+    if existing_user:
+        # User already exists - can't register again
+        return {"message": "User already registered. Please login.", "is_existing_user": True, "error": True}
     
-    # New user - store temp data including password, don't create in DB yet
+    # New user - store temp data with the password already hashed, don't create in DB yet
     otp = generate_otp()
-    pending_registrations[phone] = {
+    password_hash = await hash_password_async(password) if password else None
+    await pending_store.save(phone, {
         "otp": otp,
         "full_name": full_name,
         "language": language,
-        "password": password,
-        "is_existing": False
-    }
+        "password_hash": password_hash,
+    })
     
     # Send OTP
-    send_otp(phone, otp)
+    sms_queue.enqueue(phone, otp)
             
     return {"message": "OTP sent successfully", "is_existing_user": False}
 
-def verify_otp_step2(phone: str, otp: str):
+async def verify_otp_step2(phone: str, otp: str):
     """
     Verifies OTP and returns access token.
     Only creates user in DB after successful OTP verification.
@@ -88,12 +162,11 @@ def verify_otp_step2(phone: str, otp: str):
     otp = otp.strip()
     
     print(f"DEBUG: Verifying OTP for {phone}. Input OTP: '{otp}'")
-    print(f"DEBUG: Current pending registrations: {list(pending_registrations.keys())}")
     
-    pending = pending_registrations.get(phone)
+    pending = await pending_store.get(phone)
     
     if not pending:
-        # No pending registration for this phone
+        # No pending registration for this phone, or it expired
         print(f"DEBUG: No pending registration found for {phone}")
         return None
     
@@ -105,70 +178,25 @@ def verify_otp_step2(phone: str, otp: str):
         print(f"DEBUG: OTP Mismatch! stored='{stored_otp}' vs input='{otp}'")
         return None  # Return None means "Invalid credentials" (401)
     
-    # OTP verified! Now create user with hashed password
+    # OTP verified! Now create user with the password hashed at step 1
     try:
-        with Session(engine) as session:
-            statement = select(User).where(User.phone == phone)
-            user = session.exec(statement).first()
-            
-            if not user:
-                # Create new user now that OTP is verified
-                password = pending.get("password")
-                print(f"DEBUG: Creating new user {phone}.")
-                password_hash = hash_password(password) if password else None
-                
-                user = User(
-                    phone=phone, 
-                    full_name=pending.get("full_name", "User"),
-                    password_hash=password_hash,
-                    language=pending.get("language", "en")
-                )
-                session.add(user)
-                session.commit()
-                session.refresh(user)
-                print(f"DEBUG: User created successfully with ID: {user.id}")
-            
-            # Clear pending registration
-            if phone in pending_registrations:
-                del pending_registrations[phone]
-                
-            # Create Access Token
-            access_token = create_access_token(data={"sub": user.phone, "user_id": user.id})
-            return {
-                "access_token": access_token, 
-                "token_type": "bearer", 
-                "user_id": user.id,
-                "full_name": user.full_name,
-                "phone": user.phone,
-                "language": user.language
-            }
-    except Exception as e:
-        print(f"DEBUG: Error during user creation: {e}")
-        # Raise exception to be caught by router
-        raise Exception(f"Database Error: {str(e)}")
+        user = await get_user_by_phone(phone)
 
-def login_user(phone: str, password: str):
-    """
-    Login with phone and password.
-    Returns access token if credentials are valid, None otherwise.
-    """
-    with Session(engine) as session:
-        statement = select(User).where(User.phone == phone)
-        user = session.exec(statement).first()
-        
         if not user:
-            # User not found
-            return {"error": "User not found. Please register first."}
-        
-        if not user.password_hash:
-            # User exists but no password set (legacy user)
-            return {"error": "Please register again to set a password."}
-        
-        # Verify password
-        if not verify_password(password, user.password_hash):
-            return {"error": "Invalid password."}
-        
-        # Password verified! Create token
+            # Create new user now that OTP is verified
+            print(f"DEBUG: Creating new user {phone}.")
+            user = await create_user(
+                phone,
+                pending.get("full_name") or "User",
+                pending.get("password_hash"),
+                pending.get("language", "en")
+            )
+            print(f"DEBUG: User created successfully with ID: {user.id}")
+
+        # Clear pending registration
+        await pending_store.delete(phone)
+
+        # Create Access Token
         access_token = create_access_token(data={"sub": user.phone, "user_id": user.id})
         return {
             "access_token": access_token, 
@@ -178,6 +206,40 @@ def login_user(phone: str, password: str):
             "phone": user.phone,
             "language": user.language
         }
+    except Exception as e:
+        print(f"DEBUG: Error during user creation: {e}")
+        # Raise exception to be caught by router
+        raise Exception(f"Database Error: {str(e)}")
+
+async def login_user(phone: str, password: str):
+    """
+    Login with phone and password.
+    Returns access token if credentials are valid, None otherwise.
+    """
+    user = await get_user_by_phone(phone)
+
+    if not user:
+        # User not found
+        return {"error": "User not found. Please register first."}
+
+    if not user.password_hash:
+        # User exists but no password set (legacy user)
+        return {"error": "Please register again to set a password."}
+
+    # Verify password
+    if not await verify_password_async(password, user.password_hash):
+        return {"error": "Invalid password."}
+
+    # Password verified! Create token
+    access_token = create_access_token(data={"sub": user.phone, "user_id": user.id})
+    return {
+        "access_token": access_token, 
+        "token_type": "bearer", 
+        "user_id": user.id,
+        "full_name": user.full_name,
+        "phone": user.phone,
+        "language": user.language
+    }
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -186,3 +248,22 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str):
+    """
+    Returns the claims of a token issued by create_access_token, or None if it is
+    invalid or expired. Verified claims are cached until the token's own expiry.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = claims_cache.get(key)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+    remaining = claims.get("exp", 0) - time.time()
+    if remaining > 0:
+        claims_cache.set(key, claims, ttl=min(remaining, CLAIMS_CACHE_TTL_SECONDS))
+    return claims
@@ -0,0 +1,198 @@
+import contextlib
+import csv
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from app.database import engine as db_engine
+from app.schemas import User
+from app.services.auth_service import hash_password
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", os.cpu_count() or 1))
+# Hashing processes the API server keeps for POST /auth/bulk-import (shared by every import)
+IMPORT_SERVER_WORKERS = int(os.getenv("IMPORT_SERVER_WORKERS", min(2, os.cpu_count() or 1)))
+# Row-level problems listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+REQUIRED_COLUMNS = ("phone", "full_name")
+
+def read_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Streams rows from CSV text with a header of phone, full_name and optionally
+    language and password. Column names are matched case-insensitively.
+    """
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return
+    missing = [c for c in REQUIRED_COLUMNS if c not in (f.strip().lower() for f in reader.fieldnames)]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+    for row in reader:
+        yield {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for line, row in enumerate(rows, start=2): # line 1 is the header
+        chunk.append((line, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class BulkImporter:
+    """
+    Imports users in chunks. Per chunk: one indexed `phone IN (...)` query drops
+    phones that are already registered, passwords are hashed across a process
+    pool, and the new users go in with one multi-row INSERT in one transaction.
+    Hashing of the next chunk overlaps with the insert of the current one.
+    """
+    def __init__(self, engine=db_engine, chunk_size: int = IMPORT_CHUNK_SIZE, workers: int = IMPORT_HASH_WORKERS,
+                 progress: Optional[Callable[[dict], None]] = None, pool: Optional[Executor] = None):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.workers = workers
+        # Without a pool, run() starts its own with `workers` processes for the import
+        self.pool = pool
+        self.progress = progress
+        self.report = {}
+        self._seen = set()
+
+    def _add_error(self, line: int, message: str):
+        self.report["invalid"] += 1
+        if len(self.report["errors"]) < MAX_REPORTED_ERRORS:
+            self.report["errors"].append({"line": line, "error": message})
+
+    def _existing_phones(self, phones: List[str]) -> set:
+        with Session(self.engine) as session:
+            return set(session.exec(select(User.phone).where(User.phone.in_(phones))).all())
+
+    def _prepare(self, chunk: List[tuple], pool: Executor):
+        """Validates and de-duplicates a chunk, then starts hashing its passwords."""
+        candidates = []
+        for line, row in chunk:
+            phone = row.get("phone", "")
+            if not phone or not row.get("full_name"):
+                self._add_error(line, "phone and full_name are required")
+            elif phone in self._seen:
+                self.report["duplicates"] += 1
+            else:
+                self._seen.add(phone)
+                candidates.append(row)
+
+        existing = self._existing_phones([row["phone"] for row in candidates]) if candidates else set()
+        self.report["existing"] += len(existing)
+        new_rows = [row for row in candidates if row["phone"] not in existing]
+
+        passwords = [row["password"] for row in new_rows if row.get("password")]
+        hashes = pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (self.workers * 4))) if passwords else iter(())
+        return new_rows, hashes
+
+    def _insert(self, new_rows: List[dict], hashes: Iterator[str]):
+        values = [
+            {
+                "phone": row["phone"],
+                "full_name": row["full_name"],
+                "language": row.get("language") or "en",
+                "password_hash": next(hashes) if row.get("password") else None,
+            }
+            for row in new_rows
+        ]
+        if not values:
+            return
+        try:
+            with Session(self.engine) as session:
+                session.exec(insert(User), params=values)
+                session.commit()
+        except IntegrityError:
+            # Another writer registered some of these phones since the IN query; retry without them
+            existing = self._existing_phones([v["phone"] for v in values])
+            values = [v for v in values if v["phone"] not in existing]
+            self.report["existing"] += len(existing)
+            with Session(self.engine) as session:
+                if values:
+                    session.exec(insert(User), params=values)
+                session.commit()
+        self.report["imported"] += len(values)
+
+    def run(self, rows: Iterable[dict]) -> dict:
+        """
+        Imports every row and returns {'rows', 'imported', 'existing', 'duplicates',
+        'invalid', 'errors', 'seconds', 'rows_per_second'}.
+        """
+        self.report = {"rows": 0, "imported": 0, "existing": 0, "duplicates": 0, "invalid": 0, "errors": []}
+        self._seen = set()
+        started = time.perf_counter()
+
+        with contextlib.ExitStack() as stack:
+            pool = self.pool or stack.enter_context(ProcessPoolExecutor(max_workers=self.workers))
+            pending = None
+            for chunk in _chunks(rows, self.chunk_size):
+                self.report["rows"] += len(chunk)
+                prepared = self._prepare(chunk, pool)
+                if pending is not None:
+                    self._insert(*pending)
+                    self._report_progress(started)
+                pending = prepared
+            if pending is not None:
+                self._insert(*pending)
+                self._report_progress(started)
+
+        self._finish(started)
+        return self.report
+
+    def _finish(self, started: float):
+        elapsed = time.perf_counter() - started
+        self.report["seconds"] = round(elapsed, 3)
+        self.report["rows_per_second"] = round(self.report["rows"] / elapsed, 1) if elapsed > 0 else 0.0
+
+    def _report_progress(self, started: float):
+        if self.progress:
+            self._finish(started)
+            self.progress(dict(self.report))
+
+def import_users_csv(lines: Iterable[str], **kwargs) -> dict:
+    return BulkImporter(**kwargs).run(read_csv(lines))
+
+class ImportInProgress(Exception):
+    """Raised when the server's import pool is already running an import."""
+
+class ImportPool:
+    """
+    The API server's process pool for bulk imports, started and stopped with the
+    app. Imports reuse its processes instead of starting their own, and only one
+    runs at a time so an import cannot take over the worker.
+    """
+    def __init__(self, workers: int = IMPORT_SERVER_WORKERS, engine=db_engine):
+        self.workers = workers
+        self.engine = engine
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._running = threading.Lock()
+
+    def start(self):
+        # Processes start on first use. Spawned, not forked: the server has threads running.
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def run(self, lines: Iterable[str]) -> dict:
+        """import_users_csv on the shared pool (blocking; call it from a thread)."""
+        if self.executor is None:
+            raise RuntimeError("Import pool is not running")
+        if not self._running.acquire(blocking=False):
+            raise ImportInProgress("A bulk import is already running")
+        try:
+            return import_users_csv(lines, engine=self.engine, workers=self.workers, pool=self.executor)
+        finally:
+            self._running.release()
+
+import_pool = ImportPool()
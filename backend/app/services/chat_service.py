@@ -1,8 +1,11 @@
 import uuid
-from typing import Dict, Optional, List
-from app.schemas import FarmerContext, Recommendation
-from app.services.recommendation_engine import engine
+from typing import AsyncIterator, Dict, Optional, List
+from app.schemas import Recommendation
+from app.services.model_registry import model_registry
 from app.services.map_service import map_service
+from app.services.geo_index import district_index
+from app.services.place_search import PlaceIndex
+from app.services.session_store import ChatSession, ChatState, SessionStore, create_session_store
 import re
 
 # Multi-language Dictionary corresponding to state machine messages
@@ -26,6 +29,7 @@ TRANSLATIONS = {
         'area_invalid': "I couldn't understand that number. Please enter a value like '5' or '2.5'.",
         'ask_irrigation': "Is irrigation available?",
         'analyzing': "Analyzing your farm profile...",
+        'locating': "Looking up your location...",
         'found_crops': "Found {count} suitable crops.",
         'no_crops': "No specific crops found for these exact conditions.",
         'error_recs': "Error generating recommendations.",
@@ -57,6 +61,7 @@ TRANSLATIONS = {
         'area_invalid': "मैं उस संख्या को समझ नहीं सका। कृपया '5' या '2.5' जैसा मान दर्ज करें।",
         'ask_irrigation': "क्या सिंचाई उपलब्ध है?",
         'analyzing': "आपके कृषि प्रोफ़ाइल का विश्लेषण कर रहा हूँ...",
+        'locating': "आपका स्थान खोज रहा हूँ...",
         'found_crops': "{count} उपयुक्त फसलें मिलीं।",
         'no_crops': "इन सटीक स्थितियों के लिए कोई विशेष फसल नहीं मिली।",
         'error_recs': "अनुशंसाएँ उत्पन्न करने में त्रुटि।",
@@ -88,6 +93,7 @@ TRANSLATIONS = {
         'area_invalid': "ఆ సంఖ్య నాకు అర్థం కాలేదు. దయచేసి '5' లేదా '2.5' వంటి విలువను నమోదు చేయండి.",
         'ask_irrigation': "నీటిపారుదల సౌకర్యం ఉందా?",
         'analyzing': "మీ వ్యవసాయ ప్రొఫైల్‌ను విశ్లేషిస్తున్నాను...",
+        'locating': "మీ స్థానాన్ని కనుగొంటున్నాను...",
         'found_crops': "{count} అనుకూలమైన పంటలు కనుగొనబడ్డాయి.",
         'no_crops': "ఈ పరిస్థితులకు తగిన పంటలు కనుగొనబడలేదు.",
         'error_recs': "సిఫార్సులను రూపొందించడంలో లోపం.",
@@ -123,31 +129,26 @@ INDIA_STATES_DISTRICTS = {
     "Haryana": ["Ambala", "Bhiwani", "Charkhi Dadri", "Faridabad", "Fatehabad", "Gurugram", "Hisar", "Jhajjar", "Jind", "Kaithal", "Karnal", "Kurukshetra", "Mahendragarh", "Nuh", "Palwal", "Panchkula", "Panipat", "Rewari", "Rohtak", "Sirsa", "Sonipat", "Yamunanagar"],
 }
 
+place_index = PlaceIndex(INDIA_STATES_DISTRICTS)
+
 # Reverse mapping for inputs: Translated text -> English Key
 INPUT_MAPPING = {}
 for lang in ['hi', 'te']:
     for en_key, trans_val in TRANSLATIONS[lang]['options'].items():
         INPUT_MAPPING[trans_val.lower()] = en_key
 
-class ChatSession:
-    def __init__(self, session_id: str):
-        self.session_id = session_id
-        self.context = FarmerContext()
-        self.state = "START" 
-        self.history = []
-
 class ChatService:
-    def __init__(self):
-        self.sessions: Dict[str, ChatSession] = {}
+    def __init__(self, store: Optional[SessionStore] = None):
+        self.sessions = store or create_session_store()
 
-    def get_or_create_session(self, session_id: Optional[str] = None) -> ChatSession:
-        if session_id and session_id in self.sessions:
-            return self.sessions[session_id]
+    async def get_or_create_session(self, session_id: Optional[str] = None) -> ChatSession:
+        if session_id:
+            session = await self.sessions.aget(session_id)
+            if session:
+                return session
         
-        new_id = str(uuid.uuid4())
-        session = ChatSession(new_id)
-        self.sessions[new_id] = session
-        return session
+        # New sessions are persisted by process_message once the turn is handled
+        return ChatSession(str(uuid.uuid4()))
     
     def _tr(self, key: str, lang: str, **kwargs) -> str:
         """Translate helper"""
@@ -165,8 +166,42 @@ class ChatService:
         lang_opts = TRANSLATIONS.get(lang, TRANSLATIONS['en']).get('options', {})
         return [lang_opts.get(opt, opt) for opt in opts]
 
-    def process_message(self, session_id: Optional[str], message: str, language: str = "en") -> dict:
-        session = self.get_or_create_session(session_id)
+    def state_reply(self, session: ChatSession, language: str = "en") -> dict:
+        """A "state" reply describing where the conversation stands, without handling a message."""
+        return self._reply(session, "", [], "text", None, language, "state")
+
+    def _reply(self, session: ChatSession, response_text: str, options: List[str], input_type: str,
+               recommendations, language: str, event: str = "message") -> dict:
+        return {
+            "event": event,
+            "session_id": session.session_id,
+            "response": response_text,
+            "state": session.state.name,
+            "options": self._tr_opts(options, language), # Translate options before sending
+            "input_type": input_type,
+            "recommendations": recommendations # Recommendations content is still raw English usually, but that's later
+        }
+
+    async def process_message(self, session_id: Optional[str], message: str, language: str = "en") -> dict:
+        """Handles one turn and returns the final reply (see stream_message)."""
+        reply = None
+        async for reply in self.stream_message(session_id, message, language):
+            pass
+        reply.pop("event")
+        return reply
+
+    async def stream_message(self, session_id: Optional[str], message: str, language: str = "en") -> AsyncIterator[dict]:
+        """
+        Handles one turn as a series of replies. Before a slow step (MapTiler
+        lookup, recommendations) a "progress" reply with the interim message is
+        yielded; the last reply is always the "message" that process_message
+        returns. The session is saved only once the turn completes.
+        """
+        async for reply in self.stream_turn(await self.get_or_create_session(session_id), message, language):
+            yield reply
+
+    async def stream_turn(self, session: ChatSession, message: str, language: str = "en") -> AsyncIterator[dict]:
+        """stream_message for a session the caller already holds (a WebSocket connection keeps its own)."""
         raw_msg = message.strip()
         user_msg = raw_msg # Default to raw
         
@@ -184,132 +219,150 @@ class ChatService:
 
         # --- KEYWORD RESET ---
         if user_msg.lower() in ["reset", "start over", "restart", "hi", "hello"]:
-            session.state = "START"
-            session.context = FarmerContext()
+            session.state = ChatState.START
+            session.reset()
 
         # --- STATE MACHINE ---
         
-        if session.state == "START":
-            session.state = "ASK_LOCATION"
+        if session.state == ChatState.START:
+            session.state = ChatState.ASK_LOCATION
             response_text = self._tr('intro', language)
             options = ["Use Current Location", "Search Manually"]
             input_type = "location"
 
-        elif session.state == "ASK_LOCATION":
+        elif session.state == ChatState.ASK_LOCATION:
             if user_msg.startswith("LOC:"):
                 # Geolocation used
                 try:
                     coords = user_msg.replace("LOC:", "").split(",")
                     lat = float(coords[0])
                     lon = float(coords[1])
-                    location_data = map_service.reverse_geocode(lat, lon)
+                    # Offline district index first; MapTiler only on a miss
+                    location_data = district_index.lookup(lat, lon)
+                    if not location_data:
+                        yield self._reply(session, self._tr('locating', language), [], "none", None, language, "progress")
+                        location_data = await map_service.reverse_geocode(lat, lon)
                     
                     if location_data:
-                        session.context.district = location_data.get('district', 'Unknown')
-                        session.context.state = location_data.get('state', 'Unknown')
-                        address = location_data.get('raw', f"{session.context.district}, {session.context.state}")
+                        session.set_location(location_data.get('district', 'Unknown'), location_data.get('state', 'Unknown'))
+                        address = location_data.get('raw', f"{session.district}, {session.farm_state}")
                         
                         response_text = self._tr('found_loc', language, address=address)
                         options = ["Yes", "No, Search Manually"]
                         input_type = "options"
-                        session.state = "CONFIRM_LOCATION"
+                        session.state = ChatState.CONFIRM_LOCATION
                     else:
                          response_text = self._tr('loc_fail', language)
                          input_type = "text"
-                         session.state = "ASK_LOCATION"
+                         session.state = ChatState.ASK_LOCATION
                 except Exception:
                      response_text = self._tr('loc_error', language)
                      input_type = "text"
-                     session.state = "ASK_LOCATION"
+                     session.state = ChatState.ASK_LOCATION
 
             elif user_msg == "Use Current Location":
                 response_text = self._tr('manual_loc_prompt', language)
                 options = ["Use Current Location", "Search Manually"]
                 input_type = "location"
-                session.state = "ASK_LOCATION"
+                session.state = ChatState.ASK_LOCATION
 
             elif user_msg == "Search Manually":
                 # Show state selection
                 response_text = self._tr('ask_state', language)
                 options = list(INDIA_STATES_DISTRICTS.keys())
                 input_type = "options"
-                session.state = "SELECT_STATE"
+                session.state = ChatState.SELECT_STATE
 
             else:
-                # Manual text Input Validation
-                place = map_service.search_place(user_msg)
-                if place:
-                     session.context.district = place['name']
-                     session.context.state = "Unknown"
+                # Manual text Input Validation: local fuzzy index first, remote geocoder when unsure
+                match = place_index.search(user_msg)
+                place = None
+                if not match:
+                    yield self._reply(session, self._tr('locating', language), [], "none", None, language, "progress")
+                    place = await map_service.search_place(user_msg)
+                if match and match['district']:
+                     session.set_location(match['district'], match['state'])
+                     response_text = self._tr('manual_verify', language, place=match['name'])
+                     options = ["Yes", "No"]
+                     input_type = "options"
+                     session.state = ChatState.CONFIRM_LOCATION
+                elif match:
+                     # Only a state was recognised, ask for the district
+                     session.set_location(None, match['state'])
+                     response_text = self._tr('ask_district', language)
+                     options = INDIA_STATES_DISTRICTS[match['state']]
+                     input_type = "options"
+                     session.state = ChatState.SELECT_DISTRICT
+                elif place:
+                     session.set_location(place['name'], "Unknown")
                      response_text = self._tr('manual_verify', language, place=place['name'])
                      options = ["Yes", "No"]
                      input_type = "options"
-                     session.state = "CONFIRM_LOCATION"
+                     session.state = ChatState.CONFIRM_LOCATION
                 else:
-                    session.context.district = user_msg
-                    session.context.state = "Unknown" 
+                    session.set_location(user_msg, "Unknown")
                     response_text = self._tr('manual_fail', language, input=user_msg)
                     options = ["Red", "Black", "Sandy", "Loam", "Clay"]
                     input_type = "options"
-                    session.state = "ASK_SOIL"
+                    session.state = ChatState.ASK_SOIL
 
-        elif session.state == "SELECT_STATE":
+        elif session.state == ChatState.SELECT_STATE:
             # User selected a state, show districts
             if user_msg in INDIA_STATES_DISTRICTS:
-                session.context.state = user_msg
+                session.set_location(session.district, user_msg)
                 response_text = self._tr('ask_district', language)
                 options = INDIA_STATES_DISTRICTS[user_msg]
                 input_type = "options"
-                session.state = "SELECT_DISTRICT"
+                session.state = ChatState.SELECT_DISTRICT
             else:
                 # Invalid state, show states again
                 response_text = self._tr('ask_state', language)
                 options = list(INDIA_STATES_DISTRICTS.keys())
                 input_type = "options"
-                session.state = "SELECT_STATE"
+                session.state = ChatState.SELECT_STATE
 
-        elif session.state == "SELECT_DISTRICT":
+        elif session.state == ChatState.SELECT_DISTRICT:
             # User selected a district
-            session.context.district = user_msg
+            session.set_location(user_msg, session.farm_state)
             response_text = self._tr('ask_soil', language)
             options = ["Red", "Black", "Sandy", "Loam", "Clay"]
             input_type = "options"
-            session.state = "ASK_SOIL"
+            session.state = ChatState.ASK_SOIL
 
-        elif session.state == "CONFIRM_LOCATION":
+        elif session.state == ChatState.CONFIRM_LOCATION:
              if user_msg.lower() == "yes" or user_msg == "Yes":
                  response_text = self._tr('ask_soil', language)
                  options = ["Red", "Black", "Sandy", "Loam", "Clay"]
                  input_type = "options"
-                 session.state = "ASK_SOIL"
+                 session.state = ChatState.ASK_SOIL
              else:
                  # Show state selection instead of text input
                  response_text = self._tr('ask_state', language)
                  options = list(INDIA_STATES_DISTRICTS.keys())
                  input_type = "options"
-                 session.state = "SELECT_STATE"
+                 session.state = ChatState.SELECT_STATE
 
-        elif session.state == "ASK_SOIL":
-            session.context.soilType = user_msg
+        elif session.state == ChatState.ASK_SOIL:
+            session.soil_type = user_msg
             response_text = self._tr('ask_season', language)
             options = ["Kharif", "Rabi", "Zaid"]
             input_type = "options"
-            session.state = "ASK_SEASON"
+            session.state = ChatState.ASK_SEASON
 
-        elif session.state == "ASK_SOIL_MANUAL":
-            session.context.soilType = raw_msg # Use raw input for manual soil
+        elif session.state == ChatState.ASK_SOIL_MANUAL:
+            session.soil_type = raw_msg # Use raw input for manual soil
             response_text = self._tr('ask_season', language)
             options = ["Kharif", "Rabi", "Zaid"]
             input_type = "options"
-            session.state = "ASK_SEASON"
+            session.state = ChatState.ASK_SEASON
 
-        elif session.state == "ASK_SEASON":
-            session.context.season = user_msg
+        elif session.state == ChatState.ASK_SEASON:
+            session.season = user_msg
             response_text = self._tr('ask_area', language)
             input_type = "text"
-            session.state = "ASK_AREA"
+            session.state = ChatState.ASK_AREA
 
-        elif session.state == "ASK_AREA":
+        elif session.state == ChatState.ASK_AREA:
             numbers = re.findall(r"[-+]?\d*\.?\d+", raw_msg) # Use raw_msg for safety
             
             if numbers:
@@ -319,11 +372,11 @@ class ChatService:
                         response_text = self._tr('area_error', language)
                         input_type = "text"
                     else:
-                        session.context.landArea = area
+                        session.land_area = area
                         response_text = self._tr('ask_irrigation', language)
                         options = ["Yes", "No"]
                         input_type = "options"
-                        session.state = "ASK_IRRIGATION"
+                        session.state = ChatState.ASK_IRRIGATION
                 except ValueError:
                     response_text = self._tr('area_invalid', language)
                     input_type = "text"
@@ -331,15 +384,16 @@ class ChatService:
                 response_text = self._tr('area_error', language)
                 input_type = "text"
 
-        elif session.state == "ASK_IRRIGATION":
-             session.context.hasIrrigation = (user_msg == "Yes")
+        elif session.state == ChatState.ASK_IRRIGATION:
+             session.has_irrigation = (user_msg == "Yes")
              
              response_text = self._tr('analyzing', language)
              input_type = "none"
-             session.state = "COMPLETE"
-             
+             session.state = ChatState.COMPLETE
+             yield self._reply(session, response_text, options, input_type, None, language, "progress")
+
              try:
-                recs = engine.get_recommendations(session.context)
+                recs = model_registry.active.recommend(session.soil_type, session.season, session.has_irrigation, session.land_area)
                 recommendations = recs
                 if recs:
                     response_text = self._tr('found_crops', language, count=len(recs))
@@ -349,17 +403,11 @@ class ChatService:
                 print(f"Error: {e}")
                 response_text = self._tr('error_recs', language)
 
-        elif session.state == "COMPLETE":
+        elif session.state == ChatState.COMPLETE:
              response_text = self._tr('reset_prompt', language)
              input_type = "text"
 
-        return {
-            "session_id": session.session_id,
-            "response": response_text,
-            "state": session.state,
-            "options": self._tr_opts(options, language), # Translate options before sending
-            "input_type": input_type,
-            "recommendations": recommendations # Recommendations content is still raw English usually, but that's later
-        }
+        await self.sessions.asave(session)
+        yield self._reply(session, response_text, options, input_type, recommendations, language)
 
 chat_service = ChatService()
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+
+# Arrays written by CompiledForest.save, one .npy file each
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "leaf_proba", "roots")
+
+class CompiledForest:
+    """
+    A fitted sklearn DecisionTreeClassifier or RandomForestClassifier flattened
+    into plain NumPy arrays, so prediction is a few array operations per tree
+    level instead of a pandas DataFrame and sklearn's validation per call.
+
+    All trees share flat node arrays (each tree's nodes start at an offset).
+    Leaves point at themselves with an infinite threshold, so every tree can be
+    walked for exactly `depth` steps in lock-step.
+
+    The arrays can be saved as .npy files and loaded back memory-mapped
+    read-only, so workers share one copy through the page cache.
+    """
+    def __init__(self, feature, threshold, left, right, leaf_proba, roots, depth, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.depth = depth
+        self.classes_ = classes
+        self.n_trees = len(roots)
+        self._nodes = None
+        self._roots = None
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        estimators = getattr(model, "estimators_", [model])
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left < 0
+            nodes = np.arange(n)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            values = tree.value[:, 0, :]
+            # sklearn >= 1.4 already stores leaf fractions; older pickles store class counts
+            sums = values.sum(axis=1, keepdims=True)
+            probas.append(values if np.allclose(sums, 1.0) else values / sums)
+            roots.append(offset)
+            offset += n
+            depth = max(depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            leaf_proba=np.concatenate(probas),
+            roots=np.array(roots, dtype=np.intp),
+            depth=depth,
+            classes=np.asarray(model.classes_),
+        )
+
+    def save(self, directory: str, name: str) -> dict:
+        """Writes the arrays as <name>.<array>.npy in `directory` and returns their manifest entry."""
+        arrays = {}
+        for array in ARRAY_NAMES:
+            arrays[array] = f"{name}.{array}.npy"
+            np.save(os.path.join(directory, arrays[array]), getattr(self, array))
+        return {"depth": int(self.depth), "classes": self.classes_.tolist(), "arrays": arrays}
+
+    @classmethod
+    def load(cls, directory: str, entry: dict, mmap: bool = True) -> "CompiledForest":
+        """Loads a forest saved by save(); with `mmap` the arrays are read-only views of the files."""
+        arrays = {
+            array: np.load(os.path.join(directory, entry["arrays"][array]), mmap_mode="r" if mmap else None)
+            for array in ARRAY_NAMES
+        }
+        return cls(**arrays, depth=entry["depth"], classes=np.asarray(entry["classes"]))
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities for a (n_rows, n_features) matrix, matching sklearn's predict_proba."""
+        # sklearn compares float32 inputs against the split thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.leaf_proba[nodes].mean(axis=1)
+
+    def predict_proba_one(self, x) -> np.ndarray:
+        """Class probabilities for a single feature vector."""
+        x = np.asarray(x, dtype=np.float32).tolist()
+        if self._nodes is None:
+            # Python lists for the single-row path: scalar indexing beats NumPy's per-call overhead there
+            self._roots = self.roots.tolist()
+            self._nodes = list(zip(self.feature.tolist(), self.threshold.tolist(), self.left.tolist(), self.right.tolist()))
+        nodes = self._nodes
+        leaves = []
+        for node in self._roots:
+            feature, threshold, left, right = nodes[node]
+            while left != node:
+                node = left if x[feature] <= threshold else right
+                feature, threshold, left, right = nodes[node]
+            leaves.append(node)
+        return self.leaf_proba[leaves].mean(axis=0)
@@ -0,0 +1,232 @@
+import contextlib
+import csv
+import glob
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Optional
+import numpy as np
+
+try:
+    import fcntl
+except ImportError: # Windows: builds are not serialised between processes
+    fcntl = None
+
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), "datasets")
+CROP_SOIL_DATASET = os.path.join(DATASETS_DIR, "Crop_and_Soil_Dataset.csv")
+# Columnar copy of <name>.csv lives next to it: <name>.columns is a symlink to
+# the current build, <name>.columns.<id>/, and <name>.columns.lock serialises builders
+CACHE_SUFFIX = ".columns"
+MANIFEST_FILE = "manifest.json"
+CACHE_FORMAT = 1
+# Times load_dataset re-resolves the cache when a concurrent rebuild removed the build it was opening
+LOAD_ATTEMPTS = 3
+
+# A NumPy array repr stored as text, e.g. "['cotton' 'oil seeds' ...]" (may span lines)
+_REPR_LIST = re.compile(r"^\[\s*('[^']*'\s*)*\]$", re.DOTALL)
+_REPR_ITEM = re.compile(r"'([^']*)'")
+
+def cache_dir_for(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + CACHE_SUFFIX
+
+def _source_stamp(csv_path: str) -> dict:
+    stat = os.stat(csv_path)
+    return {"file": os.path.basename(csv_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _codes_dtype(n: int):
+    return np.int8 if n <= 127 else np.int16 if n <= 32767 else np.int32
+
+def _parse_column(values: list):
+    """(kind, arrays, categories) for one column of CSV strings: numeric, categorical, or list of categories."""
+    for dtype in (np.int64, np.float64):
+        try:
+            return "numeric", {"values": np.array(values, dtype=dtype)}, None
+        except ValueError:
+            pass
+
+    if values and all(_REPR_LIST.match(v) for v in values):
+        lists = [_REPR_ITEM.findall(v) for v in values]
+        categories = sorted({item for items in lists for item in items})
+        index = {label: code for code, label in enumerate(categories)}
+        codes = np.array([index[item] for items in lists for item in items], dtype=_codes_dtype(len(categories)))
+        offsets = np.cumsum([0] + [len(items) for items in lists]).astype(np.int64)
+        return "list", {"codes": codes, "offsets": offsets}, categories
+
+    categories = sorted(set(values))
+    index = {label: code for code, label in enumerate(categories)}
+    return "categorical", {"codes": np.array([index[v] for v in values], dtype=_codes_dtype(len(categories)))}, categories
+
+@contextlib.contextmanager
+def _build_lock(cache_dir: str):
+    """Exclusive lock held while a cache is built and published, across processes."""
+    with open(f"{cache_dir}.lock", "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _publish(cache_dir: str, build_dir: str):
+    """Points cache_dir at build_dir with one atomic rename, then removes the builds it replaced."""
+    link = f"{cache_dir}.{os.getpid()}.link"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(build_dir), link) # relative, so the tree can move
+    if os.path.isdir(cache_dir) and not os.path.islink(cache_dir):
+        shutil.rmtree(cache_dir) # a cache written before builds were versioned
+    os.replace(link, cache_dir)
+    # Processes that mapped an old build keep its files until they close them;
+    # one that resolved the old link but has not opened it yet retries (see load_dataset)
+    for old in glob.glob(f"{glob.escape(cache_dir)}.*"):
+        if old != build_dir and os.path.isdir(old) and not os.path.islink(old):
+            shutil.rmtree(old, ignore_errors=True)
+
+def convert_csv(csv_path: str, cache_dir: Optional[str] = None, reuse_fresh: bool = False) -> str:
+    """
+    Parses `csv_path` once and writes each column as a .npy file plus a
+    manifest: numbers as int64/float64, strings as small-int codes into a sorted
+    category list, and NumPy-repr list cells as flat codes plus row offsets.
+    Every build gets its own directory and cache_dir is switched to it
+    atomically, so readers see the previous cache or the new one, never a
+    partial or deleted one. Builders take turns; with `reuse_fresh` one that
+    finds an up-to-date cache once it has the lock keeps it instead of rebuilding.
+    """
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    with _build_lock(cache_dir):
+        if reuse_fresh and is_fresh(csv_path, cache_dir):
+            return cache_dir
+        stamp = _source_stamp(csv_path)
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader)]
+            rows = [row for row in reader if row]
+
+        build_dir = tempfile.mkdtemp(prefix=os.path.basename(cache_dir) + ".", dir=os.path.dirname(cache_dir) or ".")
+        os.chmod(build_dir, 0o755) # mkdtemp makes it private; other service users read the cache too
+        try:
+            columns = []
+            for i, name in enumerate(header):
+                kind, arrays, categories = _parse_column([row[i].strip() for row in rows])
+                entry = {"name": name, "kind": kind, "files": {}}
+                for part, array in arrays.items():
+                    entry["files"][part] = f"{i:03d}.{part}.npy"
+                    np.save(os.path.join(build_dir, entry["files"][part]), array)
+                if categories is not None:
+                    entry["categories"] = categories
+                columns.append(entry)
+            with open(os.path.join(build_dir, MANIFEST_FILE), "w") as f:
+                json.dump({"format": CACHE_FORMAT, "source": stamp, "rows": len(rows), "columns": columns}, f, indent=2)
+            _publish(cache_dir, build_dir)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+    return cache_dir
+
+class ColumnarDataset:
+    """
+    A dataset cached by convert_csv, with every column memory-mapped read-only.
+    dataset[name] gives numbers as-is, category labels for string columns and a
+    list of label arrays for list columns; codes() and categories() expose the
+    encoded form without decoding.
+    """
+    def __init__(self, directory: str, manifest: dict, mmap: bool = True):
+        self.directory = directory
+        self.source = manifest["source"]
+        self.n_rows = manifest["rows"]
+        self._columns = {entry["name"]: entry for entry in manifest["columns"]}
+        self._arrays = {
+            (entry["name"], part): np.load(os.path.join(directory, file), mmap_mode="r" if mmap else None)
+            for entry in manifest["columns"] for part, file in entry["files"].items()
+        }
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "ColumnarDataset":
+        # Resolve the link once: the manifest and its columns must come from the same build
+        directory = os.path.realpath(directory)
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != CACHE_FORMAT:
+            raise ValueError(f"unsupported dataset cache format {manifest.get('format')}")
+        return cls(directory, manifest, mmap)
+
+    @property
+    def columns(self) -> list:
+        return list(self._columns)
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def kind(self, name: str) -> str:
+        return self._columns[name]["kind"]
+
+    def categories(self, name: str) -> list:
+        return self._columns[name]["categories"]
+
+    def codes(self, name: str) -> np.ndarray:
+        return self._arrays[(name, "codes")]
+
+    def __getitem__(self, name: str):
+        kind = self.kind(name)
+        if kind == "numeric":
+            return self._arrays[(name, "values")]
+        labels = np.array(self.categories(name), dtype=object)[self.codes(name)]
+        if kind == "categorical":
+            return labels
+        offsets = self._arrays[(name, "offsets")]
+        return [labels[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def to_pandas(self):
+        """A pandas DataFrame; string columns become pandas Categoricals over the cached codes (imports pandas)."""
+        import pandas as pd
+
+        data = {}
+        for name in self.columns:
+            kind = self.kind(name)
+            if kind == "categorical":
+                data[name] = pd.Categorical.from_codes(np.asarray(self.codes(name)), self.categories(name))
+            else:
+                data[name] = self[name] if kind == "numeric" else pd.Series([list(items) for items in self[name]], dtype=object)
+        return pd.DataFrame(data)
+
+def is_fresh(csv_path: str, cache_dir: Optional[str] = None) -> bool:
+    """True when the cache exists, is complete, and was built from the CSV as it is now."""
+    cache_dir = cache_dir or cache_dir_for(csv_path)
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    files = [file for entry in manifest.get("columns", []) for file in entry["files"].values()]
+    return (
+        manifest.get("format") == CACHE_FORMAT
+        and manifest.get("source") == _source_stamp(csv_path)
+        and all(os.path.isfile(os.path.join(cache_dir, file)) for file in files)
+    )
+
+def load_dataset(csv_path: str = CROP_SOIL_DATASET, mmap: bool = True, convert: bool = True) -> ColumnarDataset:
+    """
+    The columnar copy of `csv_path`, (re)built first when missing or older than
+    the CSV. With `convert` False a stale cache raises FileNotFoundError instead.
+    """
+    cache_dir = cache_dir_for(csv_path)
+    if not is_fresh(csv_path, cache_dir):
+        if not convert:
+            raise FileNotFoundError(f"No up-to-date columnar cache for {csv_path}")
+        try:
+            convert_csv(csv_path, cache_dir, reuse_fresh=True)
+        except OSError as e:
+            # Read-only checkout: build a private copy for this process
+            print(f"Cannot write columnar cache next to {csv_path} ({e}); using a temporary one")
+            cache_dir = convert_csv(csv_path, os.path.join(tempfile.mkdtemp(), os.path.basename(cache_dir)))
+        print(f"Built columnar cache {cache_dir}")
+    for attempt in range(LOAD_ATTEMPTS):
+        try:
+            return ColumnarDataset.load(cache_dir, mmap)
+        except FileNotFoundError:
+            # A newer build replaced the one we resolved before we opened it; the link now points at that build
+            if attempt == LOAD_ATTEMPTS - 1:
+                raise
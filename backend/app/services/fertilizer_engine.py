@@ -0,0 +1,124 @@
+import os
+from collections import Counter
+from typing import Optional
+import numpy as np
+from ..schemas import FertilizerNeighbour, FertilizerQuery, FertilizerRecommendation
+from .dataset_cache import CROP_SOIL_DATASET, load_dataset
+
+DATASET_PATH = os.getenv("FERTILIZER_DATASET", CROP_SOIL_DATASET)
+# Neighbours returned when the request does not say
+FERTILIZER_K = int(os.getenv("FERTILIZER_K", 5))
+# Queries compared against the index per distance-matrix call in query_batch (bounds its memory)
+BATCH_CHUNK_SIZE = 256
+
+def _key(label: Optional[str]) -> Optional[str]:
+    return label.strip().lower() if label else None
+
+def _nearest(dist: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k smallest distances of each row, nearest first (ties by dataset order)."""
+    k = min(k, dist.shape[1])
+    near = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    near.sort(axis=1)
+    order = np.argsort(np.take_along_axis(dist, near, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(near, order, axis=1)
+
+class FertilizerIndex:
+    """
+    In-memory nearest-neighbour index over the labelled N/P/K profiles of the
+    crop and soil dataset. Row numbers are grouped up front for every soil,
+    crop and soil x crop filter (from the dataset's columnar cache, see
+    dataset_cache.py), together with a contiguous copy of the group's
+    N/P/K columns, so a query measures squared distances over just its group
+    and picks the k nearest with argpartition.
+    The recommended fertilizer is the most common label among the neighbours.
+    """
+    def __init__(self, path: str = DATASET_PATH):
+        self.path = path
+        self.npk = np.empty((0, 3))
+        self.fertilizers = np.empty(0, dtype=object)
+        self.soils = np.empty(0, dtype=object)
+        self.crops = np.empty(0, dtype=object)
+        self.groups = {}
+        try:
+            self.load(path)
+        except Exception as e:
+            print(f"Error loading fertilizer dataset {path}: {e}")
+
+    @property
+    def loaded(self) -> bool:
+        return len(self.npk) > 0
+
+    def load(self, path: str):
+        dataset = load_dataset(path)
+        self.npk = np.column_stack([dataset["Nitrogen"], dataset["Phosphorous"], dataset["Potassium"]]).astype(float)
+        self.fertilizers = dataset["Fertilizer Name"]
+        self.soils = dataset["Soil Type"]
+        self.crops = dataset["Crop Type"]
+
+        soil_keys = np.array([_key(s) for s in self.soils])
+        crop_keys = np.array([_key(c) for c in self.crops])
+        groups = {(None, None): np.arange(len(dataset))}
+        for soil in np.unique(soil_keys):
+            groups[(soil, None)] = np.flatnonzero(soil_keys == soil)
+        for crop in np.unique(crop_keys):
+            groups[(None, crop)] = np.flatnonzero(crop_keys == crop)
+        for soil, crop in set(zip(soil_keys.tolist(), crop_keys.tolist())):
+            groups[(soil, crop)] = np.flatnonzero((soil_keys == soil) & (crop_keys == crop))
+        # (rows, 3 x len(rows) N/P/K array): copied once here, not gathered per query
+        self.groups = {key: (rows, np.ascontiguousarray(self.npk[rows].T)) for key, rows in groups.items()}
+        print(f"Fertilizer index: {len(dataset)} profiles, {len(groups)} filter groups")
+
+    def _result(self, rows: np.ndarray, dist: np.ndarray) -> FertilizerRecommendation:
+        if not len(rows):
+            return FertilizerRecommendation(fertilizer=None, confidence=0.0, neighbours=[])
+        # Counter keeps first-seen order, so a tied vote goes to the nearer neighbour's label
+        votes = Counter(self.fertilizers[rows].tolist())
+        fertilizer = votes.most_common(1)[0][0]
+        return FertilizerRecommendation(
+            fertilizer=fertilizer,
+            confidence=votes[fertilizer] / len(rows),
+            neighbours=[
+                FertilizerNeighbour(
+                    fertilizer=self.fertilizers[row],
+                    soilType=self.soils[row],
+                    cropType=self.crops[row],
+                    nitrogen=self.npk[row, 0],
+                    phosphorous=self.npk[row, 1],
+                    potassium=self.npk[row, 2],
+                    distance=float(np.sqrt(d)),
+                )
+                for row, d in zip(rows.tolist(), dist.tolist())
+            ],
+        )
+
+    def query(self, query: FertilizerQuery, k: int = FERTILIZER_K) -> FertilizerRecommendation:
+        """The k labelled profiles nearest in N/P/K, among rows matching the query's soil and crop (when given)."""
+        return self.query_batch([query], k)[0]
+
+    def query_batch(self, queries: list[FertilizerQuery], k: int = FERTILIZER_K) -> list[FertilizerRecommendation]:
+        """
+        Answers many queries, in input order. Queries are grouped by their
+        soil/crop filter and each group is measured with one distance-matrix
+        call per BATCH_CHUNK_SIZE queries. Unknown soils or crops get no neighbours.
+        """
+        results = [FertilizerRecommendation(fertilizer=None, confidence=0.0, neighbours=[]) for _ in queries]
+        by_group = {}
+        for i, q in enumerate(queries):
+            by_group.setdefault((_key(q.soilType), _key(q.cropType)), []).append(i)
+
+        for key, members in by_group.items():
+            if key not in self.groups:
+                continue
+            rows, points = self.groups[key]
+            for start in range(0, len(members), BATCH_CHUNK_SIZE):
+                chunk = members[start:start + BATCH_CHUNK_SIZE]
+                X = np.array([[queries[i].nitrogen, queries[i].phosphorous, queries[i].potassium] for i in chunk])
+                # One (queries x profiles) matrix per nutrient rather than a 3-D difference tensor
+                dist = sum((X[:, j:j + 1] - points[j]) ** 2 for j in range(3))
+                near = _nearest(dist, k)
+                near_dist = np.take_along_axis(dist, near, axis=1)
+                for i, cols, d in zip(chunk, near, near_dist):
+                    results[i] = self._result(rows[cols], d)
+        return results
+
+fertilizer_index = FertilizerIndex()
@@ -0,0 +1,95 @@
+import csv
+import math
+import os
+from typing import Optional
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+CENTROIDS_PATH = os.path.join(DATA_DIR, "district_centroids.csv")
+
+# Coordinates further than this from every district centre are treated as a miss
+MAX_DISTANCE_KM = float(os.getenv("GEO_INDEX_MAX_DISTANCE_KM", 60))
+# A centre in another state at most this many times the nearest one's distance makes the lookup a miss
+BORDER_RATIO = float(os.getenv("GEO_INDEX_BORDER_RATIO", 1.25))
+KM_PER_DEGREE = 111.2
+
+class DistrictIndex:
+    """
+    In-process reverse geocoder: resolves coordinates to the nearest (state, district)
+    centre from INDIA_STATES_DISTRICTS. Centres are bucketed into a grid of
+    `cell_size` degree cells, so a lookup only measures the handful of districts
+    in the surrounding cells.
+
+    The table also has uncovered centres (covered=0): places such as Delhi or
+    Puducherry that the chat does not offer. They only stop a neighbouring
+    district from claiming those coordinates; a lookup nearest to one misses.
+    """
+    def __init__(self, path: str = CENTROIDS_PATH, cell_size: float = 1.0, max_distance_km: float = MAX_DISTANCE_KM,
+                 border_ratio: float = BORDER_RATIO):
+        self.cell_size = cell_size
+        self.max_distance_km = max_distance_km
+        self.border_ratio = border_ratio
+        self.states = []
+        self.districts = []
+        self.covered = np.empty(0, dtype=bool)
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self.grid = {}
+        self.load(path)
+
+    def load(self, path: str):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+        self.states = [row["state"] for row in rows]
+        self.districts = [row["district"] for row in rows]
+        self.lats = np.array([float(row["lat"]) for row in rows])
+        self.lons = np.array([float(row["lon"]) for row in rows])
+        self.covered = np.array([row["covered"] == "1" for row in rows])
+
+        grid = {}
+        for idx, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            grid.setdefault(self._cell(lat, lon), []).append(idx)
+        self.grid = {cell: np.array(members) for cell, members in grid.items()}
+
+    def _cell(self, lat: float, lon: float) -> tuple:
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def lookup(self, lat: float, lon: float) -> Optional[dict]:
+        """
+        Returns {'district': str, 'state': str, 'raw': str} like MapService.reverse_geocode,
+        or None (leave it to the geocoder) when no district centre is within
+        max_distance_km, the nearest centre is uncovered, or a centre in another
+        state is nearly as close (a border, where the nearest centre is a poor guess).
+        """
+        row, col = self._cell(lat, lon)
+        # Enough neighbouring cells to cover max_distance_km in every direction
+        reach = math.ceil(self.max_distance_km / (KM_PER_DEGREE * self.cell_size * max(math.cos(math.radians(lat)), 0.1)))
+        candidates = [
+            self.grid[cell]
+            for cell in ((row + dr, col + dc) for dr in range(-reach, reach + 1) for dc in range(-reach, reach + 1))
+            if cell in self.grid
+        ]
+        if not candidates:
+            return None
+
+        idx = np.concatenate(candidates)
+        # Equirectangular distance is accurate enough at district scale
+        dy = self.lats[idx] - lat
+        dx = (self.lons[idx] - lon) * math.cos(math.radians(lat))
+        dist_sq = dx * dx + dy * dy
+        order = np.argsort(dist_sq)
+        best = math.sqrt(dist_sq[order[0]])
+        i = idx[order[0]]
+        if best * KM_PER_DEGREE > self.max_distance_km or not self.covered[i]:
+            return None
+        district, state = self.districts[i], self.states[i]
+        for j in order[1:]:
+            if math.sqrt(dist_sq[j]) > best * self.border_ratio:
+                break
+            if self.states[idx[j]] != state:
+                return None
+
+        return {"district": district, "state": state, "raw": f"{district}, {state}, India"}
+
+district_index = DistrictIndex()
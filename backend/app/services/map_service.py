@@ -1,66 +1,125 @@
-import requests
+import asyncio
+import os
+from urllib.parse import quote
+import httpx
+from app.services.cache import TTLCache
 
 MAPTILER_KEY = "YImAWWEWi6rTSIyvNnMW"
+MAPTILER_URL = os.getenv("MAPTILER_URL", "https://api.maptiler.com/geocoding")
+
+GEOCODE_TIMEOUT_SECONDS = float(os.getenv("GEOCODE_TIMEOUT_SECONDS", 5))
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", 10_000))
+GEOCODE_CACHE_TTL_SECONDS = float(os.getenv("GEOCODE_CACHE_TTL_SECONDS", 24 * 60 * 60))
+# Reverse lookups are cached per grid cell: 2 decimals is roughly a 1 km cell
+COORD_PRECISION = 2
+
+_MISSING = object()
 
 class MapService:
-    def reverse_geocode(self, lat: float, lon: float) -> dict:
+    """
+    Async MapTiler client with a pooled keep-alive connection, per-call timeouts,
+    an LRU/TTL result cache and singleflight de-duplication of concurrent lookups.
+    """
+    def __init__(self, base_url: str = MAPTILER_URL, api_key: str = MAPTILER_KEY,
+                 timeout: float = GEOCODE_TIMEOUT_SECONDS,
+                 cache_size: int = GEOCODE_CACHE_SIZE, cache_ttl: float = GEOCODE_CACHE_TTL_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.upstream_calls = 0
+        self._client = None
+        self._client_loop = None
+        self._inflight = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # httpx clients are bound to the event loop they were first used on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+            self._client_loop = loop
+            self._inflight = {}
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def reverse_geocode(self, lat: float, lon: float) -> dict:
         """
-        Returns {'district': str, 'state': str} or None
+        Returns {'district': str, 'state': str, 'raw': str} or None
         """
-        url = f"https://api.maptiler.com/geocoding/{lon},{lat}.json?key={MAPTILER_KEY}"
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                features = data.get("features", [])
-                if features:
-                    # Look for relevant context in the first feature
-                    # MapTiler returns Place, Region, Country etc usually in context or place_type
-                    
-                    # Heuristic: Try to find 'state' (region) and 'district' (county/unknown)
-                    district = "Unknown District"
-                    state_name = "Unknown State"
-                    
-                    # Often the most specific feature is at index 0
-                    place_name = features[0].get("place_name", "")
-                    
-                    # Let's try to parse from context if available
-                    # Example context: [{'id': 'region.123', 'text': 'Andhra Pradesh'}, ...]
-                    
-                    # Simplification: specific logic depends on MapTiler payload structure for India
-                    # Usually "place_name" is like "Anantapur, Andhra Pradesh, India"
-                    parts = place_name.split(",")
-                    if len(parts) >= 2:
-                        district = parts[0].strip()
-                        state_name = parts[1].strip()
-                    elif len(parts) == 1:
-                         district = parts[0].strip()
-                         
-                    return {"district": district, "state": state_name, "raw": place_name}
-            return None
-        except Exception as e:
-            print(f"MapTiler Error: {e}")
-            return None
+        lat, lon = round(lat, COORD_PRECISION), round(lon, COORD_PRECISION)
+        return await self._lookup(("reverse", lat, lon), f"{lon},{lat}", self._parse_reverse)
 
-    def search_place(self, query: str) -> dict:
+    async def search_place(self, query: str) -> dict:
         """
-        Validates if a place exists. Returns {'name': str, 'lat': float, 'lon': float}
+        Validates if a place exists. Returns {'name': str, 'center': [lon, lat]} or None
         """
-        url = f"https://api.maptiler.com/geocoding/{query}.json?key={MAPTILER_KEY}"
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                features = data.get("features", [])
-                if features:
-                    best = features[0]
-                    return {
-                        "name": best.get("place_name", query),
-                        "center": best.get("center", [0, 0]) # [lon, lat]
-                    }
+        normalized = " ".join(query.lower().split())
+        if not normalized:
             return None
-        except Exception as e:
-            print(f"MapTiler Search Error: {e}")
+        return await self._lookup(("search", normalized), quote(normalized, safe=""), lambda features: self._parse_search(features, query))
+
+    async def _lookup(self, key, path: str, parse):
+        hit = self.cache.get(key, _MISSING)
+        if hit is not _MISSING:
+            return hit
+
+        # Singleflight: concurrent callers for the same key share one upstream request
+        client = self._get_client()
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch(client, key, path, parse))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, client: httpx.AsyncClient, key, path: str, parse):
+        self.upstream_calls += 1
+        try:
+            response = await client.get(f"{self.base_url}/{path}.json", params={"key": self.api_key})
+            if response.status_code != 200:
+                print(f"MapTiler Error: HTTP {response.status_code}")
+                return None
+            features = response.json().get("features", [])
+        except (httpx.HTTPError, ValueError) as e:
+            # Network errors and timeouts are not cached, so the next call retries
+            print(f"MapTiler Error: {e!r}")
             return None
 
+        result = parse(features) if features else None
+        self.cache.set(key, result)
+        return result
+
+    @staticmethod
+    def _parse_reverse(features: list) -> dict:
+        # Heuristic: Try to find 'state' (region) and 'district' (county/unknown)
+        district = "Unknown District"
+        state_name = "Unknown State"
+
+        # Often the most specific feature is at index 0
+        # Usually "place_name" is like "Anantapur, Andhra Pradesh, India"
+        place_name = features[0].get("place_name", "")
+        parts = place_name.split(",")
+        if len(parts) >= 2:
+            district = parts[0].strip()
+            state_name = parts[1].strip()
+        elif len(parts) == 1:
+            district = parts[0].strip()
+
+        return {"district": district, "state": state_name, "raw": place_name}
+
+    @staticmethod
+    def _parse_search(features: list, query: str) -> dict:
+        best = features[0]
+        return {
+            "name": best.get("place_name", query),
+            "center": best.get("center", [0, 0]) # [lon, lat]
+        }
+
 map_service = MapService()
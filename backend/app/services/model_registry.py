@@ -0,0 +1,259 @@
+import asyncio
+import os
+import re
+import time
+from typing import Optional
+from .recommendation_engine import MODEL_DIR, MANIFEST_FILE, MODEL_FILE, FEATURE_MODEL_FILE, RecommendationEngine
+from .shadow_evaluator import ABSplit
+
+# Names the version every worker should serve; written on activation, polled by run_watcher
+ACTIVE_POINTER = os.path.join(MODEL_DIR, "ACTIVE")
+# Pins this process to one version and ignores the pointer file
+MODEL_VERSION = os.getenv("MODEL_VERSION")
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", 30))
+# Version to compare against the live one from startup (shadow scoring and A/B split)
+MODEL_CANDIDATE_VERSION = os.getenv("MODEL_CANDIDATE_VERSION")
+
+class UnknownModelVersion(LookupError):
+    """Raised when no directory under the model dir holds the requested version."""
+
+class ReloadInProgress(Exception):
+    """Raised when a version is already being loaded."""
+
+def _version_key(version: str):
+    # Natural order, so v10 sorts after v9
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", version)]
+
+class ModelRegistry:
+    """
+    Model versions are directories under `model_dir`, each holding the soil model
+    and encoders (and optionally the feature model). `active` is the engine serving
+    requests. A new version is loaded and smoke-tested in a worker thread, then
+    swapped in with a single reference assignment: requests already running keep
+    the engine they started with, new requests get the new one.
+
+    An optional `candidate` version is compared with the live one: route() sends
+    an A/B share of keyed traffic to it and names the other engine for shadow scoring.
+    """
+    def __init__(self, model_dir: str = MODEL_DIR, pointer: str = ACTIVE_POINTER, pinned: Optional[str] = MODEL_VERSION,
+                 ab_split: Optional[ABSplit] = None):
+        self.model_dir = model_dir
+        self.pointer = pointer
+        self.pinned = pinned
+        self.active: Optional[RecommendationEngine] = None
+        self.candidate: Optional[RecommendationEngine] = None
+        self.ab_split = ab_split or ABSplit()
+        self.loaded_at: Optional[float] = None
+        self.loading: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def versions(self) -> list:
+        if not os.path.isdir(self.model_dir):
+            return []
+        names = [
+            name for name in os.listdir(self.model_dir)
+            # Dot-prefixed directories are versions still being written
+            if not name.startswith(".") and self._has_models(os.path.join(self.model_dir, name))
+        ]
+        return sorted(names, key=_version_key)
+
+    @staticmethod
+    def _has_models(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, MANIFEST_FILE)) or os.path.isfile(os.path.join(path, MODEL_FILE))
+
+    def read_pointer(self) -> Optional[str]:
+        try:
+            with open(self.pointer) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_pointer(self, version: str):
+        # Write-then-rename so watchers never read a half-written file
+        tmp = f"{self.pointer}.tmp"
+        with open(tmp, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp, self.pointer)
+
+    def target_version(self) -> Optional[str]:
+        """The version this process should serve: MODEL_VERSION, else the pointer file, else the newest."""
+        if self.pinned:
+            return self.pinned
+        versions = self.versions()
+        return self.read_pointer() or (versions[-1] if versions else None)
+
+    def _load(self, version: str) -> RecommendationEngine:
+        if version not in self.versions():
+            raise UnknownModelVersion(f"No model version {version!r} in {self.model_dir}")
+        engine = RecommendationEngine(os.path.join(self.model_dir, version), version)
+        engine.smoke_test()
+        return engine
+
+    def _swap(self, engine: RecommendationEngine):
+        self.active = engine
+        self.loaded_at = time.time()
+        self.last_error = None
+        print(f"Serving model version {engine.version}")
+
+    def load_initial(self, candidate: Optional[str] = MODEL_CANDIDATE_VERSION):
+        """Synchronous startup load. A failing version is still installed so the app comes up (serving no recommendations)."""
+        if candidate:
+            try:
+                self.candidate = self._load(candidate)
+            except Exception as e:
+                print(f"Candidate model {candidate} not loaded: {e}")
+
+        version = self.target_version()
+        if version is None:
+            self.last_error = f"No model versions in {self.model_dir}"
+            print(self.last_error)
+            return
+        if version not in self.versions():
+            self.last_error = f"No model version {version!r} in {self.model_dir}"
+            print(self.last_error)
+            return
+        engine = RecommendationEngine(os.path.join(self.model_dir, version), version)
+        try:
+            engine.smoke_test()
+        except Exception as e:
+            print(f"Model smoke test failed: {e}")
+            self.active = engine
+            self.last_error = f"{version}: {e}"
+            return
+        self._swap(engine)
+
+    def _begin(self, version: str):
+        if self.loading:
+            raise ReloadInProgress(f"Model version {self.loading} is already loading")
+        if version not in self.versions():
+            raise UnknownModelVersion(f"No model version {version!r} in {self.model_dir}")
+        self.loading = version
+
+    async def _activate(self, version: str, persist: bool) -> RecommendationEngine:
+        try:
+            engine = await asyncio.to_thread(self._load, version)
+        except Exception as e:
+            self.last_error = f"{version}: {e}"
+            raise
+        finally:
+            self.loading = None
+        self._swap(engine)
+        if persist:
+            self._write_pointer(version)
+        return engine
+
+    async def activate(self, version: str, persist: bool = True) -> RecommendationEngine:
+        """
+        Loads and smoke-tests `version` off the event loop, then makes it active.
+        With `persist`, the pointer file is updated so other workers follow.
+        On any failure the current engine keeps serving.
+        """
+        self._begin(version)
+        return await self._activate(version, persist)
+
+    def activate_in_background(self, version: str, persist: bool = True) -> asyncio.Task:
+        """Like activate(), but returns once the load has started; failures end up in last_error."""
+        self._begin(version)
+
+        async def run():
+            try:
+                await self._activate(version, persist)
+            except Exception as e:
+                print(f"Model activation failed: {e}")
+
+        self._task = asyncio.create_task(run())
+        return self._task
+
+    async def _load_candidate(self, version: str) -> RecommendationEngine:
+        try:
+            engine = await asyncio.to_thread(self._load, version)
+        except Exception as e:
+            self.last_error = f"{version}: {e}"
+            raise
+        finally:
+            self.loading = None
+        self.candidate = engine
+        print(f"Candidate model version {version} loaded")
+        return engine
+
+    async def load_candidate(self, version: str) -> RecommendationEngine:
+        """Loads and smoke-tests `version` as the candidate; the live version is untouched."""
+        self._begin(version)
+        return await self._load_candidate(version)
+
+    def load_candidate_in_background(self, version: str) -> asyncio.Task:
+        self._begin(version)
+
+        async def run():
+            try:
+                await self._load_candidate(version)
+            except Exception as e:
+                print(f"Candidate model load failed: {e}")
+
+        self._task = asyncio.create_task(run())
+        return self._task
+
+    def clear_candidate(self):
+        self.candidate = None
+
+    def route(self, key: Optional[str] = None) -> tuple:
+        """
+        (engine to serve with, engine to shadow-score with or None, arm). Keys in
+        the A/B share are served by the candidate; every other request by the
+        live version. Read once per request, like `active`.
+        """
+        live, candidate = self.active, self.candidate
+        if candidate is None or live is None or candidate.version == live.version:
+            return live, None, "live"
+        if self.ab_split.in_candidate_arm(key):
+            return candidate, live, "candidate"
+        return live, candidate, "live"
+
+    async def sync_with_pointer(self):
+        """Activates the pointer's version if it differs from the one being served."""
+        if self.pinned or self.loading:
+            return
+        version = self.read_pointer()
+        if not version or (self.active and self.active.version == version):
+            return
+        if self.last_error and self.last_error.startswith(f"{version}:"):
+            return # Already failed; wait for the pointer to change
+        try:
+            await self.activate(version, persist=False)
+        except Exception as e:
+            print(f"Model watcher: could not load {version}: {e}")
+
+    def status(self) -> dict:
+        active = self.active.version if self.active else None
+        return {
+            "active": active,
+            "loaded_at": self.loaded_at,
+            "pointer": self.read_pointer(),
+            "pinned": self.pinned,
+            "candidate": self.candidate.version if self.candidate else None,
+            "ab_percent": self.ab_split.percent,
+            "loading": self.loading,
+            "last_error": self.last_error,
+            "versions": [
+                {
+                    "version": name,
+                    "active": name == active,
+                    "feature_model": os.path.isfile(os.path.join(self.model_dir, name, FEATURE_MODEL_FILE)),
+                    "mmap": os.path.isfile(os.path.join(self.model_dir, name, MANIFEST_FILE)),
+                }
+                for name in self.versions()
+            ],
+        }
+
+async def run_watcher(registry: ModelRegistry, interval: float = MODEL_WATCH_INTERVAL_SECONDS):
+    """Background task: follows the pointer file so every worker picks up a new version without a restart."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await registry.sync_with_pointer()
+        except Exception as e:
+            print(f"Model watcher error: {e}")
+
+model_registry = ModelRegistry()
+model_registry.load_initial()
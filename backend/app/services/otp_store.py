@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+from typing import Optional
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import async_engine as db_engine
+from app.schemas import PendingRegistrationRecord
+from app.services.cache import TTLCache
+
+# Which store holds registrations awaiting OTP: "sql" (shared by every worker via DATABASE_URL) or "memory"
+OTP_STORE = os.getenv("OTP_STORE", "sql")
+OTP_TTL_SECONDS = float(os.getenv("OTP_TTL_SECONDS", 10 * 60)) # 10 minutes
+OTP_MAX_PENDING = int(os.getenv("OTP_MAX_PENDING", 100_000))
+OTP_SWEEP_INTERVAL_SECONDS = float(os.getenv("OTP_SWEEP_INTERVAL_SECONDS", 60))
+
+class PendingRegistrationStore:
+    """
+    Interface for registrations waiting on OTP verification, keyed by phone.
+    Entries are dicts {"otp", "full_name", "language", "password_hash"} and
+    expire `ttl` seconds after they are saved. Methods are coroutines so the SQL
+    backend never blocks a threadpool thread.
+    """
+    async def get(self, phone: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def save(self, phone: str, pending: dict):
+        raise NotImplementedError
+
+    async def delete(self, phone: str):
+        raise NotImplementedError
+
+    async def purge_expired(self) -> int:
+        raise NotImplementedError
+
+class MemoryPendingStore(PendingRegistrationStore):
+    """Per-process store; only correct with a single uvicorn worker."""
+    def __init__(self, max_entries: int = OTP_MAX_PENDING, ttl: float = OTP_TTL_SECONDS):
+        self.cache = TTLCache(maxsize=max_entries, ttl=ttl)
+
+    async def get(self, phone: str) -> Optional[dict]:
+        return self.cache.get(phone)
+
+    async def save(self, phone: str, pending: dict):
+        self.cache.set(phone, dict(pending))
+
+    async def delete(self, phone: str):
+        self.cache.pop(phone)
+
+    async def purge_expired(self) -> int:
+        return self.cache.purge_expired()
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+class SQLPendingStore(PendingRegistrationStore):
+    """
+    Store backed by the SQLModel engine, so /auth/verify-otp can land on any
+    worker. Lookups go through the phone primary key.
+    """
+    def __init__(self, engine=db_engine, ttl: float = OTP_TTL_SECONDS):
+        self.engine = engine
+        self.ttl = ttl
+
+    async def get(self, phone: str) -> Optional[dict]:
+        async with AsyncSession(self.engine) as db:
+            record = await db.get(PendingRegistrationRecord, phone)
+        if not record or record.expires_at <= time.time():
+            return None
+        return {
+            "otp": record.otp,
+            "full_name": record.full_name,
+            "language": record.language,
+            "password_hash": record.password_hash,
+        }
+
+    async def save(self, phone: str, pending: dict):
+        record = PendingRegistrationRecord(
+            phone=phone,
+            otp=pending["otp"],
+            full_name=pending.get("full_name"),
+            language=pending.get("language", "en"),
+            password_hash=pending.get("password_hash"),
+            expires_at=time.time() + self.ttl,
+        )
+        async with AsyncSession(self.engine) as db:
+            await db.merge(record)
+            await db.commit()
+
+    async def delete(self, phone: str):
+        async with AsyncSession(self.engine) as db:
+            await db.exec(delete(PendingRegistrationRecord).where(PendingRegistrationRecord.phone == phone))
+            await db.commit()
+
+    async def purge_expired(self) -> int:
+        async with AsyncSession(self.engine) as db:
+            result = await db.exec(delete(PendingRegistrationRecord).where(PendingRegistrationRecord.expires_at <= time.time()))
+            await db.commit()
+            return result.rowcount
+
+def create_pending_store(kind: str = OTP_STORE) -> PendingRegistrationStore:
+    if kind == "sql":
+        return SQLPendingStore()
+    if kind == "memory":
+        return MemoryPendingStore()
+    raise ValueError(f"Unknown OTP store: {kind}")
+
+async def run_sweeper(store: PendingRegistrationStore, interval: float = OTP_SWEEP_INTERVAL_SECONDS):
+    """Background task: drops expired registrations every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await store.purge_expired()
+            if removed:
+                print(f"OTP sweeper: removed {removed} expired registrations")
+        except Exception as e:
+            print(f"OTP sweeper error: {e}")
@@ -0,0 +1,45 @@
+import os
+import time
+from typing import Iterator, Optional
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import async_engine, engine as db_engine
+from app.schemas import FarmerContext, RecommendationOutcome
+
+# Rows fetched per query when training reads the log back
+OUTCOME_CHUNK_SIZE = int(os.getenv("OUTCOME_CHUNK_SIZE", 5000))
+# RecommendationOutcome columns holding the feature model's measurements (same names as FarmerContext)
+MEASUREMENT_FIELDS = ("temperature", "humidity", "moisture", "nitrogen", "potassium", "phosphorous")
+
+async def log_outcome(context: FarmerContext, crop: str, user_id: Optional[int] = None,
+                      model_version: Optional[str] = None, engine=async_engine) -> int:
+    """Stores one labelled context and returns its id (ids only grow, so training resumes after the last one it saw)."""
+    record = RecommendationOutcome(
+        created_at=time.time(),
+        user_id=user_id,
+        model_version=model_version,
+        soil_type=context.soilType.strip().lower(),
+        season=context.season.strip().lower() if context.season else None,
+        crop=crop.strip().lower(),
+        **{field: getattr(context, field) for field in MEASUREMENT_FIELDS},
+    )
+    async with AsyncSession(engine) as db:
+        db.add(record)
+        await db.commit()
+        await db.refresh(record)
+    return record.id
+
+def iter_outcomes(after_id: int = 0, chunk_size: int = OUTCOME_CHUNK_SIZE, engine=db_engine) -> Iterator[list]:
+    """Yields logged outcomes with id > after_id in id order, one chunk per keyset-paginated query."""
+    while True:
+        with Session(engine) as session:
+            chunk = session.exec(
+                select(RecommendationOutcome)
+                .where(RecommendationOutcome.id > after_id)
+                .order_by(RecommendationOutcome.id)
+                .limit(chunk_size)
+            ).all()
+        if not chunk:
+            return
+        yield chunk
+        after_id = chunk[-1].id
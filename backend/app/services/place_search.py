@@ -0,0 +1,234 @@
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+# Matches scoring below this similarity are left to the remote geocoder
+MIN_MATCH_SCORE = float(os.getenv("PLACE_SEARCH_MIN_SCORE", 0.8))
+# Trigram candidates re-ranked by edit distance per query
+MAX_CANDIDATES = 12
+
+# Other common spellings of names in INDIA_STATES_DISTRICTS (renamed districts, old city names)
+PLACE_ALIASES = {
+    ("Karnataka", "Bangalore Urban"): ["Bengaluru", "Bangalore"],
+    ("Karnataka", "Belgaum"): ["Belagavi"],
+    ("Karnataka", "Bellary"): ["Ballari"],
+    ("Karnataka", "Bijapur"): ["Vijayapura"],
+    ("Karnataka", "Gulbarga"): ["Kalaburagi"],
+    ("Karnataka", "Mysore"): ["Mysuru"],
+    ("Karnataka", "Shimoga"): ["Shivamogga"],
+    ("Karnataka", "Tumkur"): ["Tumakuru"],
+    ("Karnataka", "Dakshina Kannada"): ["Mangalore", "Mangaluru"],
+    ("Andhra Pradesh", "YSR Kadapa"): ["Kadapa", "Cuddapah"],
+    ("Andhra Pradesh", "Anantapur"): ["Anantapuram"],
+    ("Andhra Pradesh", "Visakhapatnam"): ["Vizag"],
+    ("Andhra Pradesh", "Nellore"): ["Sri Potti Sriramulu Nellore"],
+    ("Tamil Nadu", "Thoothukudi"): ["Tuticorin"],
+    ("Tamil Nadu", "Tiruchirappalli"): ["Trichy"],
+    ("Tamil Nadu", "Nilgiris"): ["Ooty"],
+    ("Kerala", "Thiruvananthapuram"): ["Trivandrum"],
+    ("Kerala", "Kozhikode"): ["Calicut"],
+    ("Kerala", "Ernakulam"): ["Kochi", "Cochin"],
+    ("Kerala", "Alappuzha"): ["Alleppey"],
+    ("Maharashtra", "Aurangabad"): ["Chhatrapati Sambhajinagar"],
+    ("Maharashtra", "Osmanabad"): ["Dharashiv"],
+    ("Maharashtra", "Mumbai City"): ["Mumbai", "Bombay"],
+    ("Gujarat", "Vadodara"): ["Baroda"],
+    ("Madhya Pradesh", "Hoshangabad"): ["Narmadapuram"],
+    ("Uttar Pradesh", "Allahabad"): ["Prayagraj"],
+    ("Uttar Pradesh", "Faizabad"): ["Ayodhya"],
+    ("Uttar Pradesh", "Gautam Buddha Nagar"): ["Noida"],
+    ("West Bengal", "Kolkata"): ["Calcutta"],
+    ("Odisha", "Balasore"): ["Baleshwar"],
+    ("Punjab", "SAS Nagar"): ["Mohali"],
+    ("Haryana", "Gurugram"): ["Gurgaon"],
+    ("Haryana", "Nuh"): ["Mewat"],
+}
+
+# Words that carry no place information in manual entries
+STOP_WORDS = {"district", "dist", "distt", "zilla", "jilla", "state", "india"}
+
+# Devanagari (U+0900) and Telugu (U+0C00) share the ISCII-derived layout, so one
+# table of offsets romanizes both scripts.
+_INDIC_BLOCKS = (0x0900, 0x0C00)
+_INDEPENDENT_VOWELS = {
+    0x05: "a", 0x06: "a", 0x07: "i", 0x08: "i", 0x09: "u", 0x0A: "u", 0x0B: "ri",
+    0x0E: "e", 0x0F: "e", 0x10: "ai", 0x12: "o", 0x13: "o", 0x14: "au",
+}
+_CONSONANTS = {
+    0x15: "k", 0x16: "kh", 0x17: "g", 0x18: "gh", 0x19: "n", 0x1A: "ch", 0x1B: "chh", 0x1C: "j",
+    0x1D: "jh", 0x1E: "n", 0x1F: "t", 0x20: "th", 0x21: "d", 0x22: "dh", 0x23: "n", 0x24: "t",
+    0x25: "th", 0x26: "d", 0x27: "dh", 0x28: "n", 0x29: "n", 0x2A: "p", 0x2B: "ph", 0x2C: "b",
+    0x2D: "bh", 0x2E: "m", 0x2F: "y", 0x30: "r", 0x31: "r", 0x32: "l", 0x33: "l", 0x34: "l",
+    0x35: "v", 0x36: "sh", 0x37: "sh", 0x38: "s", 0x39: "h",
+}
+_VOWEL_SIGNS = {
+    0x3E: "a", 0x3F: "i", 0x40: "i", 0x41: "u", 0x42: "u", 0x43: "ri",
+    0x46: "e", 0x47: "e", 0x48: "ai", 0x4A: "o", 0x4B: "o", 0x4C: "au",
+}
+_NASALS = {0x01: "n", 0x02: "n", 0x03: "h"}
+_VIRAMA = 0x4D
+
+def transliterate(text: str, delete_schwa: bool = False) -> str:
+    """
+    Romanize Devanagari/Telugu text so it can be matched against English place names.
+    The implicit 'a' of a word-final consonant is always dropped; with delete_schwa,
+    Hindi's medial schwa deletion (VC_CV) is applied too, e.g. पटना -> patna.
+    """
+    tokens = [] # [text, kind]: C consonant, A implicit 'a', V vowel, X anything else
+    for ch in text:
+        code = ord(ch)
+        block = next((base for base in _INDIC_BLOCKS if base <= code < base + 0x80), None)
+        if block is None:
+            if tokens and tokens[-1][1] == "A" and not ch.isalnum():
+                tokens.pop() # drop the implicit 'a' at the end of a word
+            tokens.append([ch, "X"])
+            continue
+
+        offset = code - block
+        if offset in _VOWEL_SIGNS or offset == _VIRAMA:
+            if tokens and tokens[-1][1] == "A":
+                tokens.pop()
+            if offset != _VIRAMA:
+                tokens.append([_VOWEL_SIGNS[offset], "V"])
+        elif offset in _CONSONANTS:
+            tokens.append([_CONSONANTS[offset], "C"])
+            tokens.append(["a", "A"])
+        elif offset in _INDEPENDENT_VOWELS:
+            tokens.append([_INDEPENDENT_VOWELS[offset], "V"])
+        elif offset in _NASALS:
+            tokens.append([_NASALS[offset], "X"])
+    if tokens and tokens[-1][1] == "A":
+        tokens.pop()
+
+    if delete_schwa:
+        kinds = lambda i: tokens[i][1] if 0 <= i < len(tokens) else None
+        for i in range(len(tokens) - 3, 1, -1):
+            if kinds(i) == "A" and kinds(i - 1) == "C" and kinds(i - 2) in ("V", "A") \
+                    and kinds(i + 1) == "C" and kinds(i + 2) in ("V", "A"):
+                del tokens[i]
+    return "".join(t for t, _ in tokens)
+
+# Spelling variants that are common in romanized Indian place names
+_PHONETIC_RULES = [
+    ("oo", "u"), ("ee", "i"), ("aa", "a"), ("ou", "u"), ("w", "v"), ("ph", "f"), ("zh", "l"),
+    ("th", "t"), ("dh", "d"), ("kh", "k"), ("gh", "g"), ("bh", "b"), ("chh", "c"), ("ch", "c"), ("sh", "s"),
+]
+
+def phonetic(text: str) -> str:
+    for old, new in _PHONETIC_RULES:
+        text = text.replace(old, new)
+    return re.sub(r"(.)\1+", r"\1", text) # collapse doubled letters
+
+def normalize(text: str, delete_schwa: bool = False) -> str:
+    text = transliterate(text.lower(), delete_schwa)
+    words = re.sub(r"[^a-z0-9]+", " ", text).split()
+    return phonetic(" ".join(w for w in words if w not in STOP_WORDS))
+
+def _trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    return 1.0 - edit_distance(a, b) / max(len(a), len(b))
+
+class PlaceIndex:
+    """
+    Local fuzzy search over every state and district: a trigram index picks
+    candidates, which are ranked by edit-distance similarity.
+    """
+    def __init__(self, states_districts: Dict[str, List[str]], aliases: dict = PLACE_ALIASES):
+        self.places = [] # (state, district or None)
+        self.names = []  # normalized name -> place id, parallel lists
+        self.name_place = []
+        self.exact = {}
+        self.trigram_index = defaultdict(list)
+
+        for state, districts in states_districts.items():
+            self._add_place(state, None, [state])
+            for district in districts:
+                self._add_place(state, district, [district] + aliases.get((state, district), []))
+
+    def _add_place(self, state: str, district: Optional[str], names: List[str]):
+        place_id = len(self.places)
+        self.places.append((state, district))
+        for name in names:
+            key = normalize(name)
+            name_id = len(self.names)
+            self.names.append(key)
+            self.name_place.append(place_id)
+            self.exact.setdefault(key, place_id)
+            for gram in set(_trigrams(key)):
+                self.trigram_index[gram].append(name_id)
+
+    def _match(self, text: str):
+        """Best (score, place_id) for one normalized name, or (0.0, None)."""
+        if text in self.exact:
+            return 1.0, self.exact[text]
+
+        shared = Counter()
+        for gram in set(_trigrams(text)):
+            shared.update(self.trigram_index.get(gram, ()))
+
+        best_score, best_place = 0.0, None
+        for name_id, _ in shared.most_common(MAX_CANDIDATES):
+            name = self.names[name_id]
+            # The length difference bounds the edit distance from below
+            if 1.0 - abs(len(text) - len(name)) / max(len(text), len(name)) <= best_score:
+                continue
+            score = similarity(text, name)
+            if score > best_score:
+                best_score, best_place = score, self.name_place[name_id]
+        return best_score, best_place
+
+    def search(self, query: str, min_score: float = MIN_MATCH_SCORE) -> Optional[dict]:
+        """
+        Returns {'state': str, 'district': str or None, 'name': str, 'score': float}
+        for the best local match, or None when nothing scores at least min_score.
+        "District, State" entries are matched part by part.
+        """
+        parts = [p for p in (normalize(part) for part in query.split(",")) if p]
+        if not parts:
+            return None
+
+        score, place_id = self._match(parts[0])
+        if score < 1.0:
+            # Hindi input may be written without its medial schwas
+            alt = normalize(query.split(",")[0], delete_schwa=True)
+            if alt != parts[0]:
+                alt_score, alt_place = self._match(alt)
+                if alt_score > score:
+                    score, place_id = alt_score, alt_place
+        if place_id is not None and len(parts) > 1:
+            # A trailing state name picks between same-named districts
+            state_score, state_place = self._match(parts[1])
+            if state_place is not None and state_score >= min_score:
+                state = self.places[state_place][0]
+                district = self.places[place_id][1]
+                same_state = [i for i, p in enumerate(self.places) if p == (state, district)]
+                if same_state:
+                    place_id = same_state[0]
+
+        if place_id is None or score < min_score:
+            return None
+
+        state, district = self.places[place_id]
+        return {
+            "state": state,
+            "district": district,
+            "name": f"{district}, {state}" if district else state,
+            "score": round(score, 3),
+        }
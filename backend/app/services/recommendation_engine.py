@@ -1,15 +1,24 @@
-import joblib
-import pickle
+import itertools
+import json
 import os
-import pandas as pd
 import numpy as np
-from ..schemas import FarmerContext, Recommendation, RiskLevel
+from typing import Optional
+from ..schemas import FarmerContext, RankingOptions, Recommendation, RiskLevel
+from .compiled_model import CompiledForest
 
-# Model Paths
-MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "models")
-MODEL_PATH = os.path.join(MODEL_DIR, "crop_recommendation_model.pkl")
-SOIL_ENCODER_PATH = os.path.join(MODEL_DIR, "soil_encoder.pkl")
-CROP_ENCODER_PATH = os.path.join(MODEL_DIR, "crop_encoder.pkl")
+# Model versions live in MODEL_DIR/<version>/, see model_registry.py
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "models"))
+# Memory-mappable export of a version (see save_artifacts); preferred over the pickles below when present
+MANIFEST_FILE = "manifest.json"
+ARTIFACT_FORMAT = 1
+MODEL_FILE = "crop_recommendation_model.pkl"
+SOIL_ENCODER_FILE = "soil_encoder.pkl"
+CROP_ENCODER_FILE = "crop_encoder.pkl"
+# Optional multi-feature model, see train_crop_model.py
+FEATURE_MODEL_FILE = "crop_feature_model.pkl"
+
+# FarmerContext fields the feature model uses after the encoded soil type, in column order
+CLIMATE_FIELDS = ("temperature", "humidity", "moisture", "nitrogen", "potassium", "phosphorous")
 
 # Static Metadata (since model doesn't provide this)
 # Static Metadata (since model doesn't provide this)
@@ -30,125 +39,365 @@ CROP_METADATA = {
     "pulses": {"water": "Low", "risk": RiskLevel.Low, "reason": "Nitrogen fixing, good for soil health.", "image": "https://images.unsplash.com/photo-1515543904379-3d757afe9c6c?q=80&w=200"},
 }
 
+# Rule buckets: every context collapses onto one of these, so the whole
+# answer space can be precomputed at startup.
+SEASON_BUCKETS = (None, "kharif", "rabi", "zaid")
+SEASON_INDEX = {season: idx for idx, season in enumerate(SEASON_BUCKETS) if season}
+# Single best crop above a 5% probability, rule modifiers at full weight
+DEFAULT_RANKING = RankingOptions()
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column indices of the k highest scores of each row, best first. argpartition
+    finds them without sorting the whole row; only the k winners are sorted
+    (ties by crop index).
+    """
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top.sort(axis=1)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1)
+
 class RecommendationEngine:
-    def __init__(self):
+    """
+    Recommendations from one model version directory. Instances are never
+    mutated after loading, so a request keeps using the engine it started with
+    while the registry swaps in a new one. The .npy export is loaded when the
+    version has one (unless use_artifacts is False), else the joblib pickles.
+    """
+    def __init__(self, model_dir: str, version: Optional[str] = None, use_artifacts: bool = True):
+        self.model_dir = model_dir
+        self.use_artifacts = use_artifacts
+        self.version = version or os.path.basename(os.path.normpath(model_dir))
         self.model = None
-        self.soil_encoder = None
-        self.crop_encoder = None
+        self.soil_labels = None
+        self.soil_index = {}
+        self.crop_labels = []
+        self.lookup_table = {}
+        self.soil_probabilities = None
+        self.rejection_masks = None
+        self.season_modifiers = None
+        self.land_modifiers = None
+        self.feature_model = None
+        self.feature_defaults = None
         self.load_models()
 
     def load_models(self):
         try:
-            # Try loading with pickle first, fallback to joblib (based on inspection)
-            try:
-                with open(MODEL_PATH, 'rb') as f: self.model = pickle.load(f)
-            except:
-                self.model = joblib.load(MODEL_PATH)
-
-            try:
-                with open(SOIL_ENCODER_PATH, 'rb') as f: self.soil_encoder = pickle.load(f)
-            except:
-                self.soil_encoder = joblib.load(SOIL_ENCODER_PATH)
-                
-            try:
-                with open(CROP_ENCODER_PATH, 'rb') as f: self.crop_encoder = pickle.load(f)
-            except:
-                self.crop_encoder = joblib.load(CROP_ENCODER_PATH)
-                
-            print("Models loaded successfully.")
+            if self.use_artifacts and os.path.exists(os.path.join(self.model_dir, MANIFEST_FILE)):
+                self.load_artifacts()
+            else:
+                self.load_pickles()
+            print(f"Models {self.version} loaded successfully.")
         except Exception as e:
-            print(f"Error loading models: {e}")
+            print(f"Error loading models {self.version}: {e}")
             self.model = None
+            self.feature_model = None
 
-    def get_recommendations(self, context: FarmerContext) -> list[Recommendation]:
-        if not self.model or not context.soilType:
-            return []
+    def load_artifacts(self):
+        """
+        Loads the .npy export memory-mapped read-only: every worker maps the same
+        files, so the pages are shared through the OS page cache, and neither
+        sklearn nor pandas is imported.
+        """
+        with open(os.path.join(self.model_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"unsupported artifact format {manifest.get('format')}")
 
-        try:
-            # 1. Preprocess Input (Only Soil Type is used by this specific model)
-            soil_lower = context.soilType.lower()
-            
-            # 1. Encode Soil Type
+        self.model = CompiledForest.load(self.model_dir, manifest["soil_model"])
+        self.soil_labels = np.asarray(manifest["soil_labels"])
+        self.crop_labels = list(manifest["crop_labels"])
+        self.build_lookup_table()
+
+        if "feature_model" in manifest:
+            if tuple(manifest["features"]) != ("soil_enc",) + CLIMATE_FIELDS:
+                raise ValueError("feature model was trained on different features")
+            self.feature_model = CompiledForest.load(self.model_dir, manifest["feature_model"])
+            self.feature_defaults = [manifest["feature_defaults"][field] for field in CLIMATE_FIELDS]
+
+    def load_pickles(self):
+        """Loads the original sklearn/joblib artifacts and compiles them (imports sklearn and pandas)."""
+        import joblib
+        import pandas as pd
+
+        # The artifacts are joblib dumps; plain pickle.load always fails on them (see model_info.txt)
+        model = joblib.load(os.path.join(self.model_dir, MODEL_FILE))
+        soil_encoder = joblib.load(os.path.join(self.model_dir, SOIL_ENCODER_FILE))
+        crop_encoder = joblib.load(os.path.join(self.model_dir, CROP_ENCODER_FILE))
+
+        self.model = CompiledForest.from_sklearn(model)
+        self.soil_labels = np.asarray(soil_encoder.classes_)
+        self.crop_labels = list(crop_encoder.inverse_transform(model.classes_))
+        # Note: Model expects a DataFrame. Inspection showed feature name 'soil_enc'.
+        soil_codes = soil_encoder.transform(self.soil_labels)
+        if not np.allclose(self.model.predict_proba(soil_codes[:, None]), model.predict_proba(pd.DataFrame({'soil_enc': soil_codes}))):
+            raise ValueError("compiled soil model disagrees with sklearn")
+        self.build_lookup_table()
+
+        feature_model_path = os.path.join(self.model_dir, FEATURE_MODEL_FILE)
+        if os.path.exists(feature_model_path):
             try:
-                # Check if soilType is in encoder classes
-                # Note: Scikit-learn LabelEncoder might raise ValueError if label is unseen
-                # Standard encoders are strict.
-                encoded_soil = self.soil_encoder.transform([soil_lower])[0]
-            except (ValueError, AttributeError, Exception):
-                # Fallback for "Other" or unknown strings
-                # Ideally we might map "Red Soil" -> "Red" etc.
-                # For now, return empty or default? 
-                # Let's map "Other" to a generic one or just fail gracefully.
-                print(f"Unknown soil type: {context.soilType}")
-                return [] # No specific ML recommendation possible without valid soil
-            
-            # 2. Predict (Get probabilities to suggest top crops)
-            # Note: Model expects a DataFrame or 2D array. Inspection showed feature name 'soil_enc'.
-            input_data = pd.DataFrame({'soil_enc': [encoded_soil]}) 
-            
-            probs = self.model.predict_proba(input_data)[0]
-            
-            # Get indices of top 5 probabilities (fetching more to filter)
-            top_indices = probs.argsort()[-5:][::-1]
-            
-            recommendations = []
-            for idx in top_indices:
-                if probs[idx] > 0.05: # Threshold to ignore very unlikely crops
-                    crop_label = self.crop_encoder.inverse_transform([idx])[0]
-                    crop_key = crop_label.lower()
-                    meta = CROP_METADATA.get(crop_key, {
-                        "water": "Medium", "risk": RiskLevel.Medium, "reason": f"suitable for {context.soilType} soil."
-                    })
-
-                    # --- Hybrid Rule-Based Filtering ---
-                    score_modifier = 0
-                    rejection_reason = None
-
-                    # 1. Season Filter (Basic Logic)
-                    if context.season:
-                        season_lower = context.season.lower()
-                        # Example Rules (Expand based on agricultural knowledge)
-                        if season_lower == "kharif":
-                            if crop_key in ["wheat", "barley", "gram"]: rejection_reason = "Not suitable for Kharif season"
-                        elif season_lower == "rabi":
-                            if crop_key in ["rice", "cotton", "jute"]: rejection_reason = "Requires high water/warmth (Kharif mainly)"
-                        elif season_lower == "zaid":
-                            if crop_key not in ["watermelon", "muskmelon", "cucumber", "maize", "fodder"]: 
-                                score_modifier -= 0.5 # Discourage non-Zaid crops
-
-                    # 2. Irrigation Check
-                    if context.hasIrrigation is False:
-                        if meta["water"] == "High":
-                            rejection_reason = "Requires high water, but irrigation is unavailable."
-
-                    # 3. Land Area Check (Minimum viability, purely illustrative)
-                    if context.landArea and context.landArea < 1.0:
-                         if crop_key in ["sugarcane", "cotton"]: 
-                             score_modifier -= 0.2 # Cash crops might need more scale
-
-                    # Decision
-                    if rejection_reason:
-                        print(f"Skipping {crop_label}: {rejection_reason}")
-                        continue
-                    
-                    # Generate Recommendation
-                    rec = Recommendation(
-                        cropName=crop_label.capitalize(),
-                        suitabilityExplanation=f"{meta['reason']} (Match: {int(probs[idx]*100)}%)",
-                        waterRequirement=meta["water"],
-                        riskLevel=meta["risk"],
-                        confidence=float(probs[idx]),
-                        imageUrl=meta.get("image")
-                    )
-                    recommendations.append(rec)
-                    
-                    if len(recommendations) >= 1:
-                        break
-            
-            return recommendations
+                self.load_feature_model(joblib.load(feature_model_path))
+            except Exception as e:
+                print(f"Error loading feature model {self.version}: {e}")
+                self.feature_model = None
 
-        except Exception as e:
-            print(f"Prediction error: {e}")
+    def save_artifacts(self, directory: Optional[str] = None):
+        """
+        Exports the loaded models as .npy arrays plus manifest.json (the format
+        load_artifacts reads). The manifest is written last, so a reader never
+        sees a partial export.
+        """
+        directory = directory or self.model_dir
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "version": self.version,
+            "soil_labels": self.soil_labels.tolist(),
+            "crop_labels": list(self.crop_labels),
+            "soil_model": self.model.save(directory, "soil_model"),
+        }
+        if self.feature_model is not None:
+            manifest["features"] = ["soil_enc", *CLIMATE_FIELDS]
+            manifest["feature_defaults"] = dict(zip(CLIMATE_FIELDS, self.feature_defaults))
+            manifest["feature_model"] = self.feature_model.save(directory, "feature_model")
+
+        tmp = os.path.join(directory, MANIFEST_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(directory, MANIFEST_FILE))
+
+    def smoke_test(self):
+        """
+        Raises ValueError unless every soil type gets the same recommendations from
+        the single and batch paths, with at least one non-empty answer.
+        """
+        if not self.model:
+            raise ValueError(f"models {self.version} failed to load")
+        contexts = [FarmerContext(soilType=soil) for soil in self.soil_labels]
+        if self.feature_model is not None:
+            contexts += [FarmerContext(soilType=soil, temperature=self.feature_defaults[0]) for soil in self.soil_labels]
+        single = [self.get_recommendations(c) for c in contexts]
+        if not any(single):
+            raise ValueError(f"models {self.version} returned no recommendations")
+        if self.get_recommendations_batch(contexts) != single:
+            raise ValueError(f"models {self.version}: batch and single predictions disagree")
+
+    def load_feature_model(self, artifact: dict):
+        """
+        Compiles the sklearn forest from train_crop_model.py into NumPy arrays and
+        checks it reproduces sklearn's probabilities before serving it.
+        """
+        model = artifact["model"]
+        if tuple(artifact["features"]) != ("soil_enc",) + CLIMATE_FIELDS or not np.array_equal(model.classes_, self.model.classes_):
+            raise ValueError("feature model does not match the soil model's features/classes")
+
+        compiled = CompiledForest.from_sklearn(model)
+        rng = np.random.default_rng(0)
+        sample = np.column_stack([
+            rng.integers(0, len(self.soil_index), 64),
+            rng.uniform(0, 100, (64, len(CLIMATE_FIELDS))),
+        ])
+        if not np.allclose(compiled.predict_proba(sample), model.predict_proba(sample)):
+            raise ValueError("compiled feature model disagrees with sklearn")
+
+        self.feature_model = compiled
+        self.feature_defaults = [artifact["defaults"][field] for field in CLIMATE_FIELDS]
+
+    def build_lookup_table(self):
+        """
+        Precompute default-ranking recommendations for every soil x season x irrigation
+        x land-area bucket. The model only looks at the encoded soil type, so one
+        predict_proba call over all soil classes covers every possible request.
+        """
+        soil_labels = self.soil_labels.tolist()
+        n_crops = len(self.crop_labels)
+
+        # Soil codes are positions in the encoder's (sorted) class list
+        all_probs = self.model.predict_proba(np.arange(len(soil_labels))[:, None])
+
+        # The rules as arrays over the crop axis: rejection masks indexed by
+        # [season bucket, no_irrigation, small_land], score modifiers by season bucket and by small_land.
+        masks = np.zeros((len(SEASON_BUCKETS), 2, 2, n_crops), dtype=bool)
+        season_modifiers = np.zeros((len(SEASON_BUCKETS), n_crops))
+        land_modifiers = np.zeros((2, n_crops))
+        for crop_idx, crop_label in enumerate(self.crop_labels):
+            crop_key = crop_label.lower()
+            meta = self._metadata(crop_key, None)
+            for season_idx, season in enumerate(SEASON_BUCKETS):
+                for no_irrigation in (0, 1):
+                    for small_land in (0, 1):
+                        rejection_reason, season_modifier, land_modifier = self._apply_rules(
+                            crop_key, meta, season, bool(no_irrigation), bool(small_land))
+                        masks[season_idx, no_irrigation, small_land, crop_idx] = rejection_reason is not None
+                        season_modifiers[season_idx, crop_idx] = season_modifier
+                        land_modifiers[small_land, crop_idx] = land_modifier
+
+        self.soil_index = {label: idx for idx, label in enumerate(soil_labels)}
+        self.soil_probabilities = all_probs
+        self.rejection_masks = masks
+        self.season_modifiers = season_modifiers
+        self.land_modifiers = land_modifiers
+
+        # Every bucket ranked in one call
+        keys = list(itertools.product(range(len(soil_labels)), range(len(SEASON_BUCKETS)), (0, 1), (0, 1)))
+        soil_codes, season_idx, no_irrigation, small_land = (np.array(column) for column in zip(*keys))
+        ranked = self._rank(all_probs[soil_codes], soil_codes, season_idx, no_irrigation, small_land, DEFAULT_RANKING)
+        self.lookup_table = {
+            (soil, SEASON_BUCKETS[season], bool(no_irr), bool(small)): tuple(recs)
+            for (soil, season, no_irr, small), recs in zip(keys, ranked)
+        }
+
+    def _rank(self, probs, soil_codes, season_idx, no_irrigation, small_land, options: RankingOptions) -> list[list[Recommendation]]:
+        """
+        Ranks each row of a (n_rows, n_crops) probability matrix. A crop's score is
+        its probability scaled by 1 + the weighted season and land-area modifiers;
+        crops rejected by the rules or at/below the probability threshold are dropped.
+        """
+        multiplier = 1 + options.seasonWeight * self.season_modifiers[season_idx] + options.landWeight * self.land_modifiers[small_land]
+        scores = probs * np.maximum(multiplier, 0.0)
+        eligible = (probs > options.minProbability) & ~self.rejection_masks[season_idx, no_irrigation, small_land]
+        top = _top_k(np.where(eligible, scores, -np.inf), options.k)
+        selected = np.take_along_axis(eligible, top, axis=1)
+
+        results = [[] for _ in range(len(probs))]
+        for row, col in zip(*np.nonzero(selected)):
+            crop_idx = top[row, col]
+            results[row].append(self._build_recommendation(
+                self.crop_labels[crop_idx], probs[row, crop_idx], self.soil_labels[soil_codes[row]], scores[row, crop_idx]))
+        return results
+
+    def _metadata(self, crop_key: str, soil_label) -> dict:
+        return CROP_METADATA.get(crop_key, {
+            "water": "Medium", "risk": RiskLevel.Medium, "reason": f"suitable for {soil_label} soil."
+        })
+
+    def _build_recommendation(self, crop_label: str, prob, soil_label, score) -> Recommendation:
+        meta = self._metadata(crop_label.lower(), soil_label)
+        return Recommendation(
+            cropName=crop_label.capitalize(),
+            suitabilityExplanation=f"{meta['reason']} (Match: {int(prob*100)}%)",
+            waterRequirement=meta["water"],
+            riskLevel=meta["risk"],
+            confidence=float(prob),
+            imageUrl=meta.get("image"),
+            score=float(score)
+        )
+
+    def _apply_rules(self, crop_key: str, meta: dict, season, no_irrigation: bool, small_land: bool):
+        """Hybrid rule-based filtering. Returns (rejection_reason, season_modifier, land_modifier)."""
+        season_modifier = 0
+        land_modifier = 0
+        rejection_reason = None
+
+        # 1. Season Filter (Basic Logic)
+        # Example Rules (Expand based on agricultural knowledge)
+        if season == "kharif":
+            if crop_key in ["wheat", "barley", "gram"]: rejection_reason = "Not suitable for Kharif season"
+        elif season == "rabi":
+            if crop_key in ["rice", "cotton", "jute"]: rejection_reason = "Requires high water/warmth (Kharif mainly)"
+        elif season == "zaid":
+            if crop_key not in ["watermelon", "muskmelon", "cucumber", "maize", "fodder"]:
+                season_modifier -= 0.5 # Discourage non-Zaid crops
+
+        # 2. Irrigation Check
+        if no_irrigation:
+            if meta["water"] == "High":
+                rejection_reason = "Requires high water, but irrigation is unavailable."
+
+        # 3. Land Area Check (Minimum viability, purely illustrative)
+        if small_land:
+            if crop_key in ["sugarcane", "cotton"]:
+                land_modifier -= 0.2 # Cash crops might need more scale
+
+        return rejection_reason, season_modifier, land_modifier
+
+    def get_recommendations(self, context: FarmerContext, options: Optional[RankingOptions] = None) -> list[Recommendation]:
+        climate = {field: getattr(context, field) for field in CLIMATE_FIELDS}
+        return self.recommend(context.soilType, context.season, context.hasIrrigation, context.landArea, climate, options)
+
+    def _feature_row(self, soil_idx: int, climate: Optional[dict]) -> Optional[list]:
+        """Feature-model input, or None when no measurement was given. Missing ones take the training median."""
+        if self.feature_model is None or not climate:
+            return None
+        values = [climate.get(field) for field in CLIMATE_FIELDS]
+        if all(v is None for v in values):
+            return None
+        return [soil_idx] + [default if v is None else v for v, default in zip(values, self.feature_defaults)]
+
+    def recommend(self, soil_type: str, season: str = None, has_irrigation: bool = None, land_area: float = None,
+                  climate: Optional[dict] = None, options: Optional[RankingOptions] = None) -> list[Recommendation]:
+        """
+        Recommendations from plain values (no FarmerContext needed), best first.
+        Soil-only requests with the default ranking are served from the lookup
+        table; with any climate/NPK measurement the compiled feature model scores
+        the request.
+        """
+        if not self.model or not soil_type:
             return []
 
-engine = RecommendationEngine()
+        soil_idx = self.soil_index.get(soil_type.lower())
+        if soil_idx is None:
+            # Fallback for "Other" or unknown strings
+            # Ideally we might map "Red Soil" -> "Red" etc.
+            print(f"Unknown soil type: {soil_type}")
+            return [] # No specific ML recommendation possible without valid soil
+
+        season = season.lower() if season else None
+        if season not in SEASON_BUCKETS:
+            season = None
+        no_irrigation = has_irrigation is False
+        small_land = bool(land_area and land_area < 1.0)
+
+        options = options or DEFAULT_RANKING
+        row = self._feature_row(soil_idx, climate)
+        if row is None and options == DEFAULT_RANKING:
+            return list(self.lookup_table[(soil_idx, season, no_irrigation, small_land)])
+
+        probs = self.soil_probabilities[soil_idx] if row is None else self.feature_model.predict_proba_one(row)
+        return self._rank(probs[None, :], [soil_idx], [SEASON_INDEX.get(season, 0)], [int(no_irrigation)], [int(small_land)], options)[0]
+
+    def top_crops(self, context: FarmerContext, k: int) -> list[str]:
+        """The k most probable crops for a context, before season/irrigation/land rules."""
+        soil_idx = self.soil_index.get((context.soilType or "").lower())
+        if not self.model or soil_idx is None:
+            return []
+        row = self._feature_row(soil_idx, {field: getattr(context, field) for field in CLIMATE_FIELDS})
+        probs = self.soil_probabilities[soil_idx] if row is None else self.feature_model.predict_proba_one(row)
+        return [self.crop_labels[idx] for idx in probs.argsort()[-k:][::-1]]
+
+    def get_recommendations_batch(self, contexts: list[FarmerContext], options: Optional[RankingOptions] = None) -> list[list[Recommendation]]:
+        """
+        Score many contexts at once: one label lookup, one predict_proba matrix call
+        (plus one compiled feature-model call for rows with measurements),
+        and the season/irrigation/land-area rules applied as array masks and weights.
+        Results are returned in input order; unknown soils get an empty list.
+        """
+        results = [[] for _ in contexts]
+        if not self.model or not contexts:
+            return results
+
+        soils = np.array([(c.soilType or "").lower() for c in contexts])
+        rows = np.flatnonzero(np.isin(soils, self.soil_labels))
+        if not rows.size:
+            return results
+
+        # LabelEncoder classes are sorted, so a label's code is its sorted position
+        soil_codes = np.searchsorted(self.soil_labels, soils[rows])
+        probs = self.model.predict_proba(soil_codes[:, None])
+
+        # Rows with climate/NPK measurements are re-scored by the feature model in one call
+        feature_rows = [(i, self._feature_row(code, {f: getattr(contexts[r], f) for f in CLIMATE_FIELDS}))
+                        for i, (r, code) in enumerate(zip(rows, soil_codes))] if self.feature_model else []
+        feature_rows = [(i, row) for i, row in feature_rows if row is not None]
+        if feature_rows:
+            idx, X = zip(*feature_rows)
+            probs[list(idx)] = self.feature_model.predict_proba(np.array(X))
+
+        season_idx = np.array([SEASON_INDEX.get((contexts[r].season or "").lower(), 0) for r in rows])
+        no_irrigation = np.array([contexts[r].hasIrrigation is False for r in rows], dtype=np.intp)
+        small_land = np.array([bool(contexts[r].landArea and contexts[r].landArea < 1.0) for r in rows], dtype=np.intp)
+        ranked = self._rank(probs, soil_codes, season_idx, no_irrigation, small_land, options or DEFAULT_RANKING)
+        for row, recs in zip(rows, ranked):
+            results[row] = recs
+        return results
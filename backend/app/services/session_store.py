@@ -0,0 +1,220 @@
+import asyncio
+import os
+import sys
+import time
+from enum import IntEnum
+from typing import Optional
+from sqlmodel import Session, delete
+from app.database import engine as db_engine
+from app.schemas import ChatSessionRecord, FarmerContext
+from app.services.cache import TTLCache
+
+# Which store backs chat sessions: "memory" (per process) or "sql" (shared via DATABASE_URL)
+SESSION_STORE = os.getenv("CHAT_SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", 6 * 60 * 60)) # 6 hours
+SESSION_MAX_ENTRIES = int(os.getenv("CHAT_SESSION_MAX_ENTRIES", 100_000))
+
+class ChatState(IntEnum):
+    START = 0
+    ASK_LOCATION = 1
+    CONFIRM_LOCATION = 2
+    SELECT_STATE = 3
+    SELECT_DISTRICT = 4
+    ASK_SOIL = 5
+    ASK_SOIL_MANUAL = 6
+    ASK_SEASON = 7
+    ASK_AREA = 8
+    ASK_IRRIGATION = 9
+    COMPLETE = 10
+
+# Small-int codes for the chat's option values (index 0 means "not set").
+# Free-text soil types that are not in this table are kept as interned strings.
+SOIL_CODES = (None, "Red", "Black", "Sandy", "Loam", "Clay")
+SEASON_CODES = (None, "Kharif", "Rabi", "Zaid")
+IRRIGATION_CODES = (None, True, False)
+_SOIL_INDEX = {name: code for code, name in enumerate(SOIL_CODES)}
+_SEASON_INDEX = {name.lower(): code for code, name in enumerate(SEASON_CODES) if name}
+
+# Layout of ChatSession.packed: soil in bits 0-3, season in bits 4-5, irrigation in bits 6-7
+_SOIL_MASK, _SEASON_SHIFT, _IRRIGATION_SHIFT = 0xF, 4, 6
+_SOIL_OTHER = 0xF # soil is stored in soil_text
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+class ChatSession:
+    """
+    Compact per-conversation state. Context fields are stored as small codes
+    packed into one int; pydantic FarmerContext objects are only built at the
+    API boundary via to_context().
+    """
+    __slots__ = ("session_id", "state", "district", "farm_state", "land_area", "packed", "soil_text")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.state = ChatState.START
+        self.reset()
+
+    def reset(self):
+        self.district = None
+        self.farm_state = None
+        self.land_area = None
+        self.packed = 0
+        self.soil_text = None
+
+    def _set_field(self, shift: int, mask: int, code: int):
+        self.packed = (self.packed & ~(mask << shift)) | (code << shift)
+
+    @property
+    def soil_type(self) -> Optional[str]:
+        code = self.packed & _SOIL_MASK
+        return self.soil_text if code == _SOIL_OTHER else SOIL_CODES[code]
+
+    @soil_type.setter
+    def soil_type(self, value: Optional[str]):
+        code = _SOIL_INDEX.get(value)
+        self.soil_text = None if code is not None else _intern(value)
+        self._set_field(0, _SOIL_MASK, _SOIL_OTHER if code is None else code)
+
+    @property
+    def season(self) -> Optional[str]:
+        return SEASON_CODES[(self.packed >> _SEASON_SHIFT) & 0x3]
+
+    @season.setter
+    def season(self, value: Optional[str]):
+        # Seasons outside the chat options carry no rules, so they are not stored
+        code = _SEASON_INDEX.get(value.lower(), 0) if value else 0
+        self._set_field(_SEASON_SHIFT, 0x3, code)
+
+    @property
+    def has_irrigation(self) -> Optional[bool]:
+        return IRRIGATION_CODES[(self.packed >> _IRRIGATION_SHIFT) & 0x3]
+
+    @has_irrigation.setter
+    def has_irrigation(self, value: Optional[bool]):
+        code = 0 if value is None else (1 if value else 2)
+        self._set_field(_IRRIGATION_SHIFT, 0x3, code)
+
+    def set_location(self, district: Optional[str], farm_state: Optional[str]):
+        self.district = _intern(district)
+        self.farm_state = _intern(farm_state)
+
+    def to_context(self) -> FarmerContext:
+        return FarmerContext(
+            district=self.district,
+            state=self.farm_state,
+            soilType=self.soil_type,
+            season=self.season,
+            landArea=self.land_area,
+            hasIrrigation=self.has_irrigation,
+        )
+
+class SessionStore:
+    """
+    Interface for chat session persistence. Sessions not saved within the TTL expire.
+    Async callers use aget/asave, which stores doing blocking I/O override.
+    """
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        raise NotImplementedError
+
+    def save(self, session: ChatSession):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    async def aget(self, session_id: str) -> Optional[ChatSession]:
+        return self.get(session_id)
+
+    async def asave(self, session: ChatSession):
+        self.save(session)
+
+class MemorySessionStore(SessionStore):
+    """Per-process LRU + TTL store with a bounded number of sessions."""
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES, ttl: float = SESSION_TTL_SECONDS):
+        self.cache = TTLCache(maxsize=max_entries, ttl=ttl)
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        return self.cache.get(session_id)
+
+    def save(self, session: ChatSession):
+        self.cache.set(session.session_id, session)
+
+    def delete(self, session_id: str):
+        self.cache.pop(session_id)
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+class SQLSessionStore(SessionStore):
+    """
+    Store backed by the SQLModel engine, so every uvicorn worker and process
+    pointed at the same DATABASE_URL shares conversation state.
+    """
+    # Expired rows are purged once every this many saves
+    PURGE_EVERY = 1000
+
+    def __init__(self, engine=db_engine, ttl: float = SESSION_TTL_SECONDS):
+        self.engine = engine
+        self.ttl = ttl
+        self._saves = 0
+
+    # Database round trips run in a worker thread so chat turns never block the event loop
+    async def aget(self, session_id: str) -> Optional[ChatSession]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def asave(self, session: ChatSession):
+        await asyncio.to_thread(self.save, session)
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with Session(self.engine) as db:
+            record = db.get(ChatSessionRecord, session_id)
+        if not record or record.updated_at < time.time() - self.ttl:
+            return None
+
+        session = ChatSession(record.session_id)
+        session.state = ChatState[record.state]
+        session.set_location(record.district, record.farm_state)
+        session.soil_type = record.soil_type
+        session.season = record.season
+        session.land_area = record.land_area
+        session.has_irrigation = record.has_irrigation
+        return session
+
+    def save(self, session: ChatSession):
+        record = ChatSessionRecord(
+            session_id=session.session_id,
+            state=session.state.name,
+            district=session.district,
+            farm_state=session.farm_state,
+            soil_type=session.soil_type,
+            season=session.season,
+            land_area=session.land_area,
+            has_irrigation=session.has_irrigation,
+            updated_at=time.time(),
+        )
+        with Session(self.engine) as db:
+            db.merge(record)
+            db.commit()
+
+        self._saves += 1
+        if self._saves % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, session_id: str):
+        with Session(self.engine) as db:
+            db.exec(delete(ChatSessionRecord).where(ChatSessionRecord.session_id == session_id))
+            db.commit()
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with Session(self.engine) as db:
+            db.exec(delete(ChatSessionRecord).where(ChatSessionRecord.updated_at < cutoff))
+            db.commit()
+
+def create_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    if kind == "sql":
+        return SQLSessionStore()
+    if kind == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown chat session store: {kind}")
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+from typing import Optional
+from app.schemas import FarmerContext, RankingOptions
+
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", 1000))
+# Fraction of eligible requests scored in shadow; lower it to cap the CPU cost on saturated workers
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", 1.0))
+# Top-k overlap compares the k most probable crops of each model, before season/irrigation rules
+SHADOW_TOP_K = int(os.getenv("SHADOW_TOP_K", 3))
+MODEL_AB_PERCENT = float(os.getenv("MODEL_AB_PERCENT", 0))
+MODEL_AB_SALT = os.getenv("MODEL_AB_SALT", "farma-ab")
+
+class ABSplit:
+    """
+    Deterministic percentage split: a key (user id or session id) hashes to a
+    fixed bucket, so the same farmer always sees the same model. Requests
+    without a key stay on the live model.
+    """
+    def __init__(self, percent: float = MODEL_AB_PERCENT, salt: str = MODEL_AB_SALT):
+        self.percent = percent
+        self.salt = salt
+
+    def in_candidate_arm(self, key: Optional[str]) -> bool:
+        if not key or self.percent <= 0:
+            return False
+        digest = hashlib.sha256(f"{self.salt}:{key}".encode()).digest()
+        return int.from_bytes(digest[:8], "big") % 10000 < self.percent * 100
+
+class ShadowEvaluator:
+    """
+    Compares a candidate model with the live one on real traffic. The request
+    handler only drops a job into a bounded queue (dropped when full); a daemon
+    thread scores the request with the model that did not serve it and records
+    agreement, top-k overlap and latency per (live, candidate, soil, season)
+    segment. Nothing is scored until start() is called.
+    """
+    def __init__(self, maxsize: int = SHADOW_QUEUE_SIZE, top_k: int = SHADOW_TOP_K, sample_rate: float = SHADOW_SAMPLE_RATE):
+        self.maxsize = maxsize
+        self.top_k = top_k
+        self.sample_rate = sample_rate
+        self.submitted = 0
+        self.dropped = 0
+        self.processed = 0
+        self.errors = 0
+        self.segments = {}
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+
+    def start(self):
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        self._thread = threading.Thread(target=self._run, name="shadow-evaluator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        thread, self._thread = self._thread, None
+        # Jobs still queued are abandoned; the sentinel goes in even if the queue is full
+        with self._queue.mutex:
+            self._queue.queue.clear()
+        self._queue.put(None)
+        thread.join(timeout)
+        self._queue = None
+
+    def submit(self, context: FarmerContext, served, other, arm: str, served_recs: list, served_seconds: float,
+               options: Optional[RankingOptions] = None) -> bool:
+        """
+        Queues a comparison of `served` (the engine that answered, from `arm`
+        "live" or "candidate") with `other`, ranked with the request's `options`.
+        Never blocks; returns False when dropped or not sampled.
+        """
+        if self._thread is None or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return False
+        try:
+            self._queue.put_nowait((context, served, other, arm, served_recs, served_seconds, options))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._evaluate(*job)
+            except Exception as e:
+                self.errors += 1
+                print(f"Shadow evaluation error: {e}")
+
+    def _evaluate(self, context: FarmerContext, served, other, arm: str, served_recs: list, served_seconds: float,
+                  options: Optional[RankingOptions] = None):
+        started = time.perf_counter()
+        other_recs = other.get_recommendations(context, options)
+        other_seconds = time.perf_counter() - started
+
+        if arm == "live":
+            live, candidate = served, other
+            live_recs, candidate_recs, live_seconds, candidate_seconds = served_recs, other_recs, served_seconds, other_seconds
+        else:
+            live, candidate = other, served
+            live_recs, candidate_recs, live_seconds, candidate_seconds = other_recs, served_recs, other_seconds, served_seconds
+
+        live_top = set(live.top_crops(context, self.top_k))
+        candidate_top = set(candidate.top_crops(context, self.top_k))
+        agree = [r.cropName for r in live_recs] == [r.cropName for r in candidate_recs]
+        overlap = len(live_top & candidate_top) / max(len(live_top | candidate_top), 1)
+
+        key = (live.version, candidate.version, (context.soilType or "").lower(), (context.season or "any").lower())
+        with self._lock:
+            stats = self.segments.get(key)
+            if stats is None:
+                stats = self.segments[key] = {
+                    "requests": 0, "candidate_served": 0, "agreements": 0, "overlap_sum": 0.0,
+                    "live_seconds": 0.0, "candidate_seconds": 0.0,
+                }
+            stats["requests"] += 1
+            stats["candidate_served"] += arm == "candidate"
+            stats["agreements"] += agree
+            stats["overlap_sum"] += overlap
+            stats["live_seconds"] += live_seconds
+            stats["candidate_seconds"] += candidate_seconds
+            self.processed += 1
+
+    def reset(self):
+        with self._lock:
+            self.segments = {}
+
+    @staticmethod
+    def _summary(stats: dict) -> dict:
+        n = stats["requests"]
+        live_ms = 1000 * stats["live_seconds"] / n
+        candidate_ms = 1000 * stats["candidate_seconds"] / n
+        return {
+            "requests": n,
+            "candidate_served": stats["candidate_served"],
+            "agreement_rate": round(stats["agreements"] / n, 4),
+            "top_k_overlap": round(stats["overlap_sum"] / n, 4),
+            "live_ms_avg": round(live_ms, 4),
+            "candidate_ms_avg": round(candidate_ms, 4),
+            "latency_delta_ms": round(candidate_ms - live_ms, 4),
+        }
+
+    def snapshot(self) -> dict:
+        """Totals and per-segment metrics, grouped by live/candidate version pair."""
+        with self._lock:
+            segments = {key: dict(stats) for key, stats in self.segments.items()}
+
+        comparisons = {}
+        for (live, candidate, soil, season), stats in sorted(segments.items()):
+            pair = comparisons.setdefault((live, candidate), {"live": live, "candidate": candidate, "segments": [], "_total": None})
+            pair["segments"].append({"soil": soil, "season": season, **self._summary(stats)})
+            total = pair["_total"] or {k: 0 for k in stats}
+            pair["_total"] = {k: total[k] + stats[k] for k in stats}
+        for pair in comparisons.values():
+            pair["overall"] = self._summary(pair.pop("_total"))
+
+        return {
+            "top_k": self.top_k,
+            "sample_rate": self.sample_rate,
+            "running": self._thread is not None,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "comparisons": list(comparisons.values()),
+        }
+
+shadow_evaluator = ShadowEvaluator()
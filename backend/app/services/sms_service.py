@@ -1,3 +1,4 @@
+import asyncio
 import os
 import logging
 from twilio.rest import Client
@@ -13,6 +14,11 @@ account_sid = os.getenv("TWILIO_ACCOUNT_SID", "").strip('"')
 auth_token = os.getenv("TWILIO_AUTH_TOKEN", "").strip('"')
 twilio_number = os.getenv("TWILIO_PHONE_NUMBER", "").strip('"')
 
+SMS_WORKERS = int(os.getenv("SMS_WORKERS", 4))
+SMS_QUEUE_SIZE = int(os.getenv("SMS_QUEUE_SIZE", 10_000))
+SMS_MAX_ATTEMPTS = int(os.getenv("SMS_MAX_ATTEMPTS", 3))
+SMS_RETRY_DELAY_SECONDS = float(os.getenv("SMS_RETRY_DELAY_SECONDS", 2))
+
 # Validate credentials
 if not all([account_sid, auth_token, twilio_number]):
     logger.warning("Twilio credentials missing. SMS will fail.")
@@ -46,3 +52,111 @@ def send_otp(phone_number: str, otp: str):
         # For Hackathon/Dev purposes, print the OTP so we can proceed even if SMS fails
         print(f"DEV MODE (Send Failed): OTP for {phone_number} is {otp}")
         return False
+
+def deliver_otp(phone_number: str, otp: str):
+    """
+    Queue sender: like send_otp, but raises on failure so the job can be retried.
+    """
+    if not client:
+        print(f"DEV MODE (No Client): OTP for {phone_number} is {otp}")
+        return
+    message = client.messages.create(
+        body=f"Your FARMA Verification Code is: {otp}",
+        from_=twilio_number,
+        to=phone_number
+    )
+    logger.info(f"OTP sent to {phone_number}: SID {message.sid}")
+
+class SMSQueue:
+    """
+    Fire-and-forget OTP delivery. enqueue() only records the job; worker tasks on
+    the app's event loop hand each send to a thread and retry failures with
+    exponential backoff, so /auth/register never waits on Twilio.
+    """
+    def __init__(self, sender=deliver_otp, workers: int = SMS_WORKERS, maxsize: int = SMS_QUEUE_SIZE,
+                 max_attempts: int = SMS_MAX_ATTEMPTS, retry_delay: float = SMS_RETRY_DELAY_SECONDS):
+        self.sender = sender
+        self.workers = workers
+        self.maxsize = maxsize
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0):
+        """Gives queued messages up to `timeout` seconds to go out, then cancels the workers."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"SMS queue stopped with {self._queue.qsize()} messages unsent")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+
+    def enqueue(self, phone_number: str, otp: str):
+        """
+        Queues an OTP for delivery. Safe to call from worker threads. Without a
+        running queue (scripts, tests) the message is sent inline instead.
+        """
+        if self._loop is None or self._loop.is_closed():
+            send_otp(phone_number, otp)
+            return
+        self._loop.call_soon_threadsafe(self._put, (phone_number, otp))
+
+    def _put(self, job):
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"SMS queue full, dropping OTP for {job[0]}")
+            print(f"DEV MODE (Queue Full): OTP for {job[0]} is {job[1]}")
+
+    async def _worker(self):
+        while True:
+            phone_number, otp = await self._queue.get()
+            try:
+                await self._send(phone_number, otp)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, phone_number: str, otp: str):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await asyncio.to_thread(self.sender, phone_number, otp)
+                self.sent += 1
+                return
+            except Exception as e:
+                logger.error(f"Failed to send OTP to {phone_number} (attempt {attempt}/{self.max_attempts}): {e}")
+                if attempt < self.max_attempts:
+                    self.retried += 1
+                    await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+        self.failed += 1
+        # For Hackathon/Dev purposes, print the OTP so we can proceed even if SMS fails
+        print(f"DEV MODE (Send Failed): OTP for {phone_number} is {otp}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+        }
+
+sms_queue = SMSQueue()
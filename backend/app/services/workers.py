@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class PoolSaturated(Exception):
+    """Raised when a BoundedExecutor already has max_queue jobs waiting."""
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for CPU-heavy calls (bcrypt) that would otherwise compete
+    with request handlers for the shared threadpool. At most `max_workers` jobs run
+    at once and at most `max_queue` wait; beyond that callers get PoolSaturated
+    instead of an ever-growing backlog.
+    """
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.peak_queued = 0
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated(f"{self.name} pool has {self.queued} jobs waiting")
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+        future = self._executor.submit(self._call, fn, args)
+        # A job cancelled before it started never reaches _call
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _call(self, fn, args):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def _on_done(self, future):
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,106 @@
+"""
+Concurrent /auth/login throughput against each database, with the old engine
+setup (echo=True, default pool, rollback journal) and the tuned create_async_db_engine.
+
+Users are seeded with cheap bcrypt hashes and the user cache is disabled, so
+the numbers reflect the database path rather than password hashing.
+
+Run from backend/:
+    python -m benchmarks.bench_auth_login
+    python -m benchmarks.bench_auth_login --db sqlite:///./bench.db --db postgresql://localhost/farma_bench
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import bcrypt
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, Session, delete
+
+from app.database import async_url, create_async_db_engine, create_db_engine, pool_metrics
+from app.main import app
+from app.schemas import User
+from app.services import auth_service
+from app.services.cache import TTLCache
+
+PASSWORD = "bench-password"
+
+def legacy_engine(url: str):
+    """An engine set up the way app/database.py did before pooling/pragmas were configurable."""
+    engine = create_async_engine(async_url(url), echo=True)
+    # Keep the logging cost but not the terminal noise
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger("sqlalchemy.engine.Engine").handlers + logging.getLogger().handlers:
+        handler.setStream(devnull)
+    return engine
+
+def seed(url: str, users: int):
+    engine = create_db_engine(url, echo=False)
+    SQLModel.metadata.create_all(engine)
+    password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=4)).decode()
+    with Session(engine) as session:
+        session.exec(delete(User).where(User.phone.like("+bench%")))
+        session.add_all(User(phone=f"+bench{i:06d}", full_name="Bench", password_hash=password_hash) for i in range(users))
+        session.commit()
+    engine.dispose()
+
+async def drive(engine, requests: int, concurrency: int, users: int) -> list:
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                response = await client.post("/auth/login", json={"phone": f"+bench{i % users:06d}", "password": PASSWORD})
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    # Pooled connections belong to this event loop
+    await engine.dispose()
+    return latencies
+
+def percentile(values: list, pct: float) -> float:
+    return statistics.quantiles(values, n=100)[int(pct) - 1] if len(values) > 1 else values[0]
+
+def run(label: str, engine, args):
+    auth_service.async_engine = engine
+    for concurrency in args.concurrency:
+        started = time.perf_counter()
+        latencies = asyncio.run(drive(engine, args.requests, concurrency, args.users))
+        elapsed = time.perf_counter() - started
+        ms = [1000 * x for x in latencies]
+        print(f"{label:<34} c={concurrency:<4} {len(ms) / elapsed:8.1f} req/s   "
+              f"p50 {percentile(ms, 50):7.2f} ms   p95 {percentile(ms, 95):7.2f} ms   p99 {percentile(ms, 99):7.2f} ms")
+    if hasattr(engine.sync_engine, "pool_metrics"):
+        print(f"{'':<34} pool: {pool_metrics(engine)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", action="append", help="database URL (repeatable); default is a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    args = parser.parse_args()
+
+    # Every login must reach the database
+    auth_service.user_cache = TTLCache(maxsize=0)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        urls = args.db or [f"sqlite:///{tmp}/bench.db"]
+        for url in urls:
+            print(f"\n{url}")
+            seed(url, args.users)
+            run("before (echo, defaults)", legacy_engine(url), args)
+            run("after (create_async_db_engine)", create_async_db_engine(url), args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Worker cold start and memory with the joblib pickles versus the memory-mapped
+.npy export (see export_model_artifacts.py).
+
+For each format, N worker processes are started at once, like uvicorn --workers N.
+Each one imports app.main, loads the active model version and serves one
+recommendation, then stays alive while its memory is read from
+/proc/<pid>/smaps_rollup (Linux only). PSS splits shared pages between the
+processes mapping them, so it is the fair per-worker cost.
+
+Run from backend/:
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --workers 8 --version v1
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services.recommendation_engine import MANIFEST_FILE, MODEL_DIR
+
+WORKER = r"""
+import json, sys, time
+started = time.perf_counter()
+from app.main import app
+from app.services.model_registry import model_registry
+assert model_registry.active.recommend("loamy")
+print(json.dumps({
+    "import_and_load_s": time.perf_counter() - started,
+    "sklearn": "sklearn" in sys.modules,
+    "pandas": "pandas" in sys.modules,
+}), flush=True)
+sys.stdin.read()
+"""
+
+def model_dir_copy(tmp: str, version: str, fmt: str) -> str:
+    """A model dir holding only one artifact format, so the worker cannot fall back to the other."""
+    target = os.path.join(tmp, fmt)
+    if fmt == "pickle":
+        ignore = shutil.ignore_patterns(MANIFEST_FILE, "*.npy")
+    else:
+        ignore = shutil.ignore_patterns("*.pkl")
+    shutil.copytree(os.path.join(MODEL_DIR, version), os.path.join(target, version), ignore=ignore)
+    with open(os.path.join(target, "ACTIVE"), "w") as f:
+        f.write(version + "\n")
+    return target
+
+def smaps_kb(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return values
+
+def run(fmt: str, model_dir: str, workers: int) -> dict:
+    env = dict(os.environ, MODEL_DIR=model_dir, PYTHONWARNINGS="ignore")
+    started = time.perf_counter()
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WORKER], env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL, text=True)
+        for _ in range(workers)
+    ]
+    try:
+        reports = []
+        for proc in procs:
+            # Skip the app's own startup prints
+            line = proc.stdout.readline()
+            while line and not line.startswith("{"):
+                line = proc.stdout.readline()
+            if not line:
+                raise RuntimeError(f"{fmt} worker exited with {proc.wait()}")
+            report = json.loads(line)
+            report["ready_s"] = time.perf_counter() - started
+            reports.append(report)
+        memory = [smaps_kb(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+    return {
+        "format": fmt,
+        "workers": workers,
+        "import_and_load_s": statistics.median(r["import_and_load_s"] for r in reports),
+        "all_ready_s": max(r["ready_s"] for r in reports),
+        "rss_mb": statistics.median(m["Rss"] for m in memory) / 1024,
+        "pss_mb": statistics.median(m["Pss"] for m in memory) / 1024,
+        "private_mb": statistics.median(m["Private_Clean"] + m["Private_Dirty"] for m in memory) / 1024,
+        "total_pss_mb": sum(m["Pss"] for m in memory) / 1024,
+        "imports_sklearn": any(r["sklearn"] for r in reports),
+        "imports_pandas": any(r["pandas"] for r in reports),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--version", default="v1")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(MODEL_DIR, args.version, MANIFEST_FILE)):
+        sys.exit(f"{args.version} has no .npy export; run python export_model_artifacts.py {args.version}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("pickle", "mmap"):
+            r = run(fmt, model_dir_copy(tmp, args.version, fmt), args.workers)
+            print(f"{fmt:<7} x{r['workers']}  start {r['import_and_load_s']:6.2f} s/worker  all ready {r['all_ready_s']:6.2f} s   "
+                  f"RSS {r['rss_mb']:6.1f} MB  PSS {r['pss_mb']:6.1f} MB  private {r['private_mb']:6.1f} MB  "
+                  f"total PSS {r['total_pss_mb']:7.1f} MB   sklearn={r['imports_sklearn']} pandas={r['imports_pandas']}")
+
+if __name__ == "__main__":
+    main()
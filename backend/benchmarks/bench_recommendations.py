@@ -0,0 +1,308 @@
+"""
+Offline evaluation and throughput of the recommendation path.
+
+Replays rows of datasets/Crop_and_Soil_Dataset.csv through:
+    engine.soil    RecommendationEngine.get_recommendations, soil type only (lookup table)
+    engine.full    the same with the row's climate/NPK measurements (feature model)
+    engine.batch   get_recommendations_batch over all rows, in chunks of 1000
+    api            POST /recommendations through an in-process ASGI client
+    chat           a full /chat conversation per row (location, soil, season, area, irrigation)
+
+For each target it reports p50/p95/p99 latency, calls/sec, tracemalloc peak bytes
+and retained blocks per call, and accuracy against the row's crop: "served" is
+the first returned recommendation, top1/3/5 use the model's raw probability
+ranking. The shipped feature model was refitted on the whole dataset, so
+engine.full/api/batch accuracy here is in-sample; train_crop_model.py reports
+the held-out figure. Results are written as JSON; --compare flags regressions
+against an earlier run and exits non-zero.
+
+Run from backend/:
+    python -m benchmarks.bench_recommendations
+    python -m benchmarks.bench_recommendations --rows 2000 --targets engine.full api
+    python -m benchmarks.bench_recommendations --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import httpx
+
+from app.main import app
+from app.schemas import FarmerContext
+from app.services.dataset_cache import load_dataset
+from app.services.model_registry import model_registry
+from train_crop_model import DATASET_COLUMNS, DATASET_PATH
+
+TARGETS = ("engine.soil", "engine.full", "engine.batch", "api", "chat")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BATCH_SIZE = 1000
+# Calls traced with tracemalloc per target (tracing is slow, so it is a separate pass)
+ALLOCATION_SAMPLE = 300
+# Chat answers that keep the season/irrigation/land rules from filtering crops
+CHAT_STATE = "Andhra Pradesh"
+CHAT_SEASON, CHAT_AREA, CHAT_IRRIGATION = "Zaid", "2", "Yes"
+
+def load_rows(path: str, limit: int) -> list:
+    """(FarmerContext without measurements, FarmerContext with them, ground-truth crop) per row."""
+    dataset = load_dataset(path)
+    soils, crops = dataset["Soil Type"][:limit], dataset["Crop Type"][:limit]
+    columns = {field: dataset[column][:limit].tolist() for field, column in DATASET_COLUMNS.items()}
+    rows = []
+    for i, (soil, crop) in enumerate(zip(soils, crops)):
+        measurements = {field: float(values[i]) for field, values in columns.items()}
+        rows.append((FarmerContext(soilType=soil), FarmerContext(soilType=soil, **measurements), crop.lower()))
+    return rows
+
+def percentile(values: list, pct: int) -> float:
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else values[0]
+
+def summarize(latencies: list, seconds: float, calls: int) -> dict:
+    ms = [1000 * x for x in latencies]
+    return {
+        "calls": calls,
+        "seconds": round(seconds, 4),
+        "calls_per_second": round(calls / seconds, 1),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+    }
+
+def accuracy(served: list, truth: list, rankings: list = None) -> dict:
+    n = len(truth)
+    result = {"served": round(sum(s == t for s, t in zip(served, truth)) / n, 4)}
+    if rankings is not None:
+        for k in (1, 3, 5):
+            result[f"top{k}"] = round(sum(t in r[:k] for r, t in zip(rankings, truth)) / n, 4)
+    return result
+
+def first_crop(recs: list):
+    return (recs[0]["cropName"] if isinstance(recs[0], dict) else recs[0].cropName).lower() if recs else None
+
+def measure_allocations(call, args: list) -> dict:
+    """tracemalloc peak per call, and blocks still allocated afterwards (leaks/caches) per call."""
+    tracemalloc.start()
+    peaks = []
+    blocks = sys.getallocatedblocks()
+    for arg in args:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        call(arg)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    retained = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+    return {
+        "peak_bytes_per_call": round(statistics.fmean(peaks)),
+        "retained_blocks_per_call": round(retained / len(args), 3),
+    }
+
+def bench_engine(rows: list, full: bool) -> dict:
+    engine = model_registry.active
+    contexts = [row[1] if full else row[0] for row in rows]
+    truth = [row[2] for row in rows]
+
+    latencies, served = [], []
+    started = time.perf_counter()
+    for context in contexts:
+        t = time.perf_counter()
+        recs = engine.get_recommendations(context)
+        latencies.append(time.perf_counter() - t)
+        served.append(first_crop(recs))
+    result = summarize(latencies, time.perf_counter() - started, len(contexts))
+
+    rankings = [engine.top_crops(context, 5) for context in contexts]
+    result["accuracy"] = accuracy(served, truth, rankings)
+    result["allocations"] = measure_allocations(engine.get_recommendations, contexts[:ALLOCATION_SAMPLE])
+    return result
+
+def bench_batch(rows: list) -> dict:
+    engine = model_registry.active
+    contexts = [row[1] for row in rows]
+    chunks = [contexts[i:i + BATCH_SIZE] for i in range(0, len(contexts), BATCH_SIZE)]
+
+    latencies, served = [], []
+    started = time.perf_counter()
+    for chunk in chunks:
+        t = time.perf_counter()
+        results = engine.get_recommendations_batch(chunk)
+        latencies.append(time.perf_counter() - t)
+        served.extend(first_crop(recs) for recs in results)
+    result = summarize(latencies, time.perf_counter() - started, len(chunks))
+    result["rows_per_second"] = round(len(contexts) / result["seconds"], 1)
+    result["accuracy"] = accuracy(served, [row[2] for row in rows])
+    result["allocations"] = measure_allocations(engine.get_recommendations_batch, chunks[:3])
+    return result
+
+async def _chat_conversation(client: httpx.AsyncClient, soil: str, latencies: list) -> list:
+    session_id = None
+    recs = []
+    for message in ("hi", "Search Manually", CHAT_STATE, None, soil, CHAT_SEASON, CHAT_AREA, CHAT_IRRIGATION):
+        if message is None:
+            message = options[0] # first district of the state
+        t = time.perf_counter()
+        response = await client.post("/chat/", json={"message": message, "session_id": session_id})
+        latencies.append(time.perf_counter() - t)
+        body = response.json()
+        session_id, options, recs = body["session_id"], body.get("options"), body.get("recommendations") or []
+    return recs
+
+async def _bench_http(target: str, rows: list) -> dict:
+    truth = [row[2] for row in rows]
+    latencies, served = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def call(row):
+            if target == "api":
+                t = time.perf_counter()
+                response = await client.post("/recommendations", json=row[1].model_dump(exclude_none=True))
+                latencies.append(time.perf_counter() - t)
+                return response.json() if response.status_code == 200 else []
+            return await _chat_conversation(client, row[0].soilType, latencies)
+
+        started = time.perf_counter()
+        for row in rows:
+            served.append(first_crop(await call(row)))
+        elapsed = time.perf_counter() - started
+        timed = list(latencies)
+
+        # Allocation pass: same calls, traced one at a time
+        tracemalloc.start()
+        peaks = []
+        blocks = sys.getallocatedblocks()
+        sample = rows[:ALLOCATION_SAMPLE // (8 if target == "chat" else 1)]
+        for row in sample:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await call(row)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        retained = sys.getallocatedblocks() - blocks
+        tracemalloc.stop()
+
+    result = summarize(timed, elapsed, len(rows))
+    if target == "chat":
+        # Latency is per message; calls/sec counts whole conversations
+        result["messages_per_conversation"] = len(timed) // len(rows)
+    result["accuracy"] = accuracy(served, truth)
+    result["allocations"] = {
+        "peak_bytes_per_call": round(statistics.fmean(peaks)),
+        "retained_blocks_per_call": round(retained / len(sample), 3),
+    }
+    return result
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(targets: list, rows: list) -> dict:
+    results = {}
+    for target in targets:
+        if target == "engine.soil":
+            results[target] = bench_engine(rows, full=False)
+        elif target == "engine.full":
+            results[target] = bench_engine(rows, full=True)
+        elif target == "engine.batch":
+            results[target] = bench_batch(rows)
+        else:
+            results[target] = asyncio.run(_bench_http(target, rows))
+        print_result(target, results[target])
+    return results
+
+def print_result(target: str, r: dict):
+    acc = "  ".join(f"{k} {v:.3f}" for k, v in r["accuracy"].items())
+    print(f"{target:<13} {r['calls_per_second']:>10,.1f} calls/s   p50 {r['p50_ms']:8.3f} ms   p95 {r['p95_ms']:8.3f} ms   "
+          f"p99 {r['p99_ms']:8.3f} ms   {r['allocations']['peak_bytes_per_call']:>9,} B peak/call   {acc}")
+
+# Metric -> True when higher is better
+COMPARED = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "calls_per_second": True}
+# Latency changes below this are timer/scheduler noise, whatever the relative change
+MIN_LATENCY_DELTA_MS = 0.002
+
+def compare(current: dict, previous: dict, tolerance: float) -> list:
+    """
+    Metrics that got worse than `tolerance` (relative). Accuracy is compared only
+    when both runs replayed the same rows with the same model version, and any drop counts.
+    """
+    same_input = all(current["meta"][k] == previous["meta"].get(k) for k in ("dataset", "rows", "model_version"))
+    if not same_input:
+        print("  (different dataset, row count or model version: accuracy not compared)")
+    regressions = []
+    for target, result in current["results"].items():
+        before = previous["results"].get(target)
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            noise = not higher_is_better and abs(new - old) < MIN_LATENCY_DELTA_MS
+            flag = "  REGRESSION" if worse > tolerance and not noise else ""
+            print(f"  {target:<13} {metric:<17} {old:>12.4f} -> {new:>12.4f}  ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((target, metric))
+        for metric, new in (result["accuracy"].items() if same_input else ()):
+            old = before["accuracy"].get(metric)
+            if old is not None and new < old - 1e-9:
+                print(f"  {target:<13} accuracy.{metric:<8} {old:>12.4f} -> {new:>12.4f}  REGRESSION")
+                regressions.append((target, f"accuracy.{metric}"))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--rows", type=int, default=8000, help="dataset rows to replay (chat uses a tenth of them)")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--output", help="results file (default: benchmarks/results/recommendations-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    rows = load_rows(args.dataset, args.rows)
+    engine = model_registry.active
+    print(f"Model {engine.version}, {len(rows)} rows from {args.dataset}")
+
+    results = {}
+    for target in args.targets:
+        target_rows = rows[:max(1, len(rows) // 10)] if target == "chat" else rows
+        results.update(run([target], target_rows))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "model_version": engine.version,
+            "feature_model": engine.feature_model is not None,
+            "dataset": os.path.basename(args.dataset),
+            "rows": len(rows),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"recommendations-{report['meta']['git_commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\nCompared with {args.compare} ({previous['meta']['git_commit']}, {previous['meta']['timestamp']}):")
+        regressions = compare(report, previous, args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} regression(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Memory per chat session, before and after the compact ChatSession.
+
+Run from backend/:  python -m benchmarks.bench_session_memory [count]
+"""
+import gc
+import sys
+import tracemalloc
+import uuid
+
+from app.schemas import FarmerContext
+from app.services.session_store import ChatSession, ChatState
+
+class LegacyChatSession:
+    """The pre-compaction session: per-instance __dict__, pydantic context, unused history."""
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.context = FarmerContext()
+        self.state = "START"
+        self.history = []
+
+DISTRICTS = [("Guntur", "Andhra Pradesh"), ("Nashik", "Maharashtra"), ("Patna", "Bihar"), ("Karnal", "Haryana")]
+SOILS = ["Red", "Black", "Sandy", "Loam", "Clay"]
+SEASONS = ["Kharif", "Rabi", "Zaid"]
+
+def fill_legacy(i: int, session_id: str):
+    session = LegacyChatSession(session_id)
+    district, state = DISTRICTS[i % len(DISTRICTS)]
+    session.context.district = district
+    session.context.state = state
+    session.context.soilType = SOILS[i % len(SOILS)]
+    session.context.season = SEASONS[i % len(SEASONS)]
+    session.context.landArea = float(i % 20 + 1)
+    session.context.hasIrrigation = i % 2 == 0
+    session.state = "ASK_IRRIGATION"
+    return session
+
+def fill_compact(i: int, session_id: str):
+    session = ChatSession(session_id)
+    session.set_location(*DISTRICTS[i % len(DISTRICTS)])
+    session.soil_type = SOILS[i % len(SOILS)]
+    session.season = SEASONS[i % len(SEASONS)]
+    session.land_area = float(i % 20 + 1)
+    session.has_irrigation = i % 2 == 0
+    session.state = ChatState.ASK_IRRIGATION
+    return session
+
+def measure(factory, session_ids) -> float:
+    """Bytes allocated per session, excluding the session id strings themselves."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = {sid: factory(i, sid) for i, sid in enumerate(session_ids)}
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return (after - before) / len(session_ids)
+
+def main(count: int = 100_000):
+    session_ids = [str(uuid.uuid4()) for _ in range(count)]
+    legacy = measure(fill_legacy, session_ids)
+    compact = measure(fill_compact, session_ids)
+
+    print(f"Sessions: {count:,}")
+    print(f"Before (dict + FarmerContext): {legacy:8.1f} bytes/session  ({legacy * count / 2**20:7.1f} MiB)")
+    print(f"After  (__slots__ + packed):   {compact:8.1f} bytes/session  ({compact * count / 2**20:7.1f} MiB)")
+    print(f"Reduction: {legacy / compact:.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,109 @@
+"""
+/recommendations latency with and without a shadow candidate model.
+
+Starts uvicorn twice on a copy of one model version (served as "v1" and, the
+second time, also loaded as candidate "v2" via MODEL_CANDIDATE_VERSION), then
+measures client-side latency over real HTTP. Half the requests carry
+measurements, so both the lookup table and the feature model are exercised.
+
+Run from backend/:
+    python -m benchmarks.bench_shadow_overhead
+    python -m benchmarks.bench_shadow_overhead --requests 5000 --concurrency 1 8
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from app.dependencies import OPERATOR_KEY_HEADER
+from app.services.recommendation_engine import MODEL_DIR
+
+BODIES = [
+    {"soilType": soil, "season": season, **({"temperature": 24.0 + i, "humidity": 55.0} if i % 2 else {})}
+    for i, (soil, season) in enumerate((s, t) for s in ("Black", "Red", "Loamy", "Sandy", "Clayey") for t in ("Kharif", "Rabi"))
+]
+
+# Passed to the server so /models/evaluation can be read
+OPERATOR_KEY = "bench"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(model_dir: str, candidate: bool):
+    port = free_port()
+    env = dict(os.environ, MODEL_DIR=model_dir, MODEL_VERSION="v1", PYTHONWARNINGS="ignore", OPERATOR_API_KEY=OPERATOR_KEY)
+    if candidate:
+        env["MODEL_CANDIDATE_VERSION"] = "v2"
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            httpx.get(url + "/models").raise_for_status()
+            return proc, url
+        except httpx.HTTPError:
+            if time.monotonic() > deadline or proc.poll() is not None:
+                proc.kill()
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.2)
+
+async def drive(url: str, requests: int, concurrency: int) -> list:
+    latencies = []
+    async with httpx.AsyncClient(base_url=url) as client:
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                response = await client.post("/recommendations", json=BODIES[i % len(BODIES)])
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code in (200, 404), response.text
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+def percentile(values: list, pct: int) -> float:
+    return statistics.quantiles(values, n=100)[pct - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--version", default="v1", help="model version to copy as v1 and v2")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("v1", "v2"):
+            shutil.copytree(os.path.join(MODEL_DIR, args.version), os.path.join(tmp, name))
+        for candidate in (False, True):
+            proc, url = start_server(tmp, candidate)
+            try:
+                asyncio.run(drive(url, 500, 1)) # warm-up
+                for concurrency in args.concurrency:
+                    started = time.perf_counter()
+                    ms = [1000 * x for x in asyncio.run(drive(url, args.requests, concurrency))]
+                    elapsed = time.perf_counter() - started
+                    print(f"{'shadow v2' if candidate else 'no candidate':<13} c={concurrency:<3} {len(ms) / elapsed:8.1f} req/s   "
+                          f"p50 {percentile(ms, 50):6.3f} ms   p95 {percentile(ms, 95):6.3f} ms   p99 {percentile(ms, 99):6.3f} ms")
+                if candidate:
+                    evaluation = httpx.get(url + "/models/evaluation", headers={OPERATOR_KEY_HEADER: OPERATOR_KEY}).json()
+                    overall = evaluation["comparisons"][0]["overall"] if evaluation["comparisons"] else {}
+                    print(f"{'':<13} shadow: processed {evaluation['processed']}, dropped {evaluation['dropped']}, "
+                          f"agreement {overall.get('agreement_rate')}, latency delta {overall.get('latency_delta_ms')} ms")
+            finally:
+                proc.terminate()
+                proc.wait()
+
+if __name__ == "__main__":
+    main()
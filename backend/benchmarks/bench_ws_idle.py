@@ -0,0 +1,82 @@
+"""
+Server memory per idle /chat/ws connection.
+
+Starts uvicorn, opens the connections from this process (each reads its
+"state" frame, then sits idle), and reports the server's RSS and PSS growth
+from /proc divided by the connection count. Both processes need a file
+descriptor per connection: raise `ulimit -n` above the count first.
+Clients offer permessage-deflate as browsers do; --no-compression shows what
+the server's per-connection zlib state costs.
+
+Run from backend/:
+    python -m benchmarks.bench_ws_idle
+    python -m benchmarks.bench_ws_idle --connections 2000 5000 10000
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks.bench_shadow_overhead import start_server
+from app.services.recommendation_engine import MODEL_DIR
+
+def server_memory(pid: int) -> dict:
+    """Resident and proportional set size in bytes (smaps_rollup needs Linux 4.14+)."""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key] = int(value.split()[0]) * 1024
+    return memory
+
+async def hold(url: str, pid: int, count: int, batch: int, settle: float, compression: bool = True) -> tuple:
+    """Opens count connections batch at a time; returns (memory with them open, seconds to open)."""
+    sockets = []
+    options = dict(open_timeout=60, ping_interval=None, compression="deflate" if compression else None)
+    started = time.perf_counter()
+    try:
+        for start in range(0, count, batch):
+            opened = await asyncio.gather(*(connect(url, **options) for _ in range(min(batch, count - start))))
+            await asyncio.gather(*(ws.recv() for ws in opened)) # the "state" frame: the handler is running
+            sockets.extend(opened)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(settle)
+        return server_memory(pid), elapsed
+    finally:
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, nargs="+", default=[10000])
+    parser.add_argument("--batch", type=int, default=500, help="connections opened concurrently")
+    parser.add_argument("--no-compression", action="store_true", help="do not offer permessage-deflate")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait before reading memory")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard)) # uvicorn inherits it
+    if max(args.connections) + 100 > hard:
+        parser.error(f"open file limit is {hard}; lower --connections or raise ulimit -n")
+
+    proc, url = start_server(MODEL_DIR, candidate=False)
+    ws_url = url.replace("http", "ws", 1) + "/chat/ws"
+    try:
+        asyncio.run(hold(ws_url, proc.pid, 100, 100, 0)) # warm-up: import and allocator pools
+        for count in args.connections:
+            httpx.get(url + "/models").raise_for_status()
+            base = server_memory(proc.pid)
+            memory, elapsed = asyncio.run(hold(ws_url, proc.pid, count, args.batch, args.settle, not args.no_compression))
+            rss, pss = ((memory[k] - base[k]) / count for k in ("Rss", "Pss"))
+            print(f"{count:>6} idle connections   opened in {elapsed:5.1f} s   "
+                  f"server RSS +{(memory['Rss'] - base['Rss']) / 2**20:6.1f} MiB ({rss / 1024:5.1f} KiB/conn)   "
+                  f"PSS {pss / 1024:5.1f} KiB/conn")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Bulk-enroll farmers from a CSV file (phone, full_name, optional language and password).
+The same import is served, with the operator key, as POST /auth/bulk-import.
+
+Usage: python bulk_import.py farmers.csv [--chunk-size 1000] [--workers 4]
+"""
+import argparse
+from app.database import create_db_and_tables, engine
+from app.services.bulk_import import IMPORT_CHUNK_SIZE, IMPORT_HASH_WORKERS, BulkImporter, read_csv
+
+def print_progress(report: dict):
+    print(f"  {report['rows']:>8,} rows  {report['imported']:>8,} imported  {report['rows_per_second']:>10,.1f} rows/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-enroll farmers from a CSV file")
+    parser.add_argument("csv_path")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=IMPORT_HASH_WORKERS, help="password hashing processes")
+    args = parser.parse_args()
+
+    print(f"Importing {args.csv_path} into {engine.url}")
+    create_db_and_tables()
+    importer = BulkImporter(chunk_size=args.chunk_size, workers=args.workers, progress=print_progress)
+    with open(args.csv_path, encoding="utf-8-sig", newline="") as f:
+        report = importer.run(read_csv(f))
+
+    print(f"✅ Imported {report['imported']:,} of {report['rows']:,} rows in {report['seconds']}s ({report['rows_per_second']:,} rows/s)")
+    print(f"   Already registered: {report['existing']:,}  Duplicates in file: {report['duplicates']:,}  Invalid: {report['invalid']:,}")
+    for error in report["errors"]:
+        print(f"   line {error['line']}: {error['error']}")
+
+if __name__ == "__main__":
+    main()
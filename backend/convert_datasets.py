@@ -0,0 +1,40 @@
+"""
+Convert CSV datasets to the columnar cache that services load memory-mapped
+(see app/services/dataset_cache.py): typed .npy columns, string columns as
+categorical codes, NumPy-repr list cells (crop_recommendation_table.csv) as
+flat codes plus offsets. Services also build a missing or stale cache on first
+load; running this at deploy time keeps that cost out of process start.
+
+Usage: python convert_datasets.py [csv ...]   (default: the crop/soil dataset and every model version's table)
+"""
+import argparse
+import glob
+import os
+import time
+from app.services.dataset_cache import CROP_SOIL_DATASET, convert_csv, is_fresh, load_dataset
+from app.services.recommendation_engine import MODEL_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert CSV datasets to the memory-mappable columnar cache")
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--force", action="store_true", help="rebuild caches that are already up to date")
+    args = parser.parse_args()
+
+    paths = args.paths or [CROP_SOIL_DATASET] + sorted(glob.glob(os.path.join(MODEL_DIR, "*", "crop_recommendation_table.csv")))
+    for path in paths:
+        if is_fresh(path) and not args.force:
+            print(f"✅ {path} is up to date")
+            continue
+        started = time.perf_counter()
+        cache_dir = convert_csv(path)
+        converted = time.perf_counter() - started
+
+        started = time.perf_counter()
+        dataset = load_dataset(path, convert=False)
+        loaded = time.perf_counter() - started
+        kinds = ", ".join(f"{name}: {dataset.kind(name)}" for name in dataset.columns)
+        print(f"✅ {path} -> {cache_dir} ({len(dataset):,} rows, converted in {converted:.3f}s, loads in {1000 * loaded:.1f}ms)")
+        print(f"   {kinds}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Export model versions to the memory-mappable format: NumPy .npy arrays plus a
+manifest.json, written next to the joblib pickles in models/<version>/. Workers
+then map the arrays read-only (shared through the page cache) and never import
+sklearn or pandas.
+
+Usage: python export_model_artifacts.py [version ...]   (default: every version with pickles)
+"""
+import argparse
+import os
+from app.services.recommendation_engine import MODEL_DIR, MODEL_FILE, RecommendationEngine
+
+def export_version(path: str, version: str) -> RecommendationEngine:
+    """Loads the pickles in `path`, exports them, and checks the export answers identically."""
+    source = RecommendationEngine(path, version, use_artifacts=False)
+    if source.model is None:
+        raise ValueError(f"could not load {path}")
+    source.save_artifacts()
+
+    exported = RecommendationEngine(path, version)
+    exported.smoke_test()
+    if exported.lookup_table != source.lookup_table:
+        raise ValueError(f"exported {version} answers differently from its pickles")
+    return exported
+
+def main():
+    parser = argparse.ArgumentParser(description="Export model versions as memory-mappable .npy artifacts")
+    parser.add_argument("versions", nargs="*")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+
+    versions = args.versions or sorted(
+        name for name in os.listdir(args.model_dir)
+        if not name.startswith(".") and os.path.isfile(os.path.join(args.model_dir, name, MODEL_FILE))
+    )
+    for version in versions:
+        export_version(os.path.join(args.model_dir, version), version)
+        print(f"✅ Exported {version}")
+
+if __name__ == "__main__":
+    main()
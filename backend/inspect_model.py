@@ -3,7 +3,7 @@ import pandas as pd
 import os
 import joblib
 
-model_path = 'backend/models/crop_recommendation_model.pkl'
+model_path = 'backend/models/v1/crop_recommendation_model.pkl'
 output_file = 'backend/model_info.txt'
 
 def inspect(obj, name="Model", f_out=None):
@@ -34,9 +34,9 @@ with open(output_file, 'w', encoding='utf-8') as f_out:
 
     # Also check encoders
     f_out.write("\n--- Encoders ---\n")
-    for filename in os.listdir('backend/models'):
+    for filename in os.listdir('backend/models/v1'):
         if 'encoder' in filename:
-            path = os.path.join('backend/models', filename)
+            path = os.path.join('backend/models/v1', filename)
             try:
                 with open(path, 'rb') as f:
                     encoder = pickle.load(f)
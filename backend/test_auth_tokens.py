@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from app.main import app
+from app.services import auth_service
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    asyncio.run(create_tables())
+    queries = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    monkeypatch.setattr(auth_service, "async_engine", engine)
+    auth_service.user_cache.clear()
+    auth_service.claims_cache.clear()
+    yield queries
+    auth_service.user_cache.clear()
+
+def test_user_lookups_are_read_through(db):
+    async def run():
+        user = await auth_service.create_user("+914444444444", "Ravi", None, "hi")
+        db.clear()
+        assert (await auth_service.get_user_by_phone("+914444444444")).id == user.id
+        assert (await auth_service.get_user_by_id(user.id)).phone == "+914444444444"
+        assert db == []
+
+        auth_service.invalidate_user(user)
+        assert (await auth_service.get_user_by_id(user.id)).full_name == "Ravi"
+        assert len(db) == 1
+        # Misses are not cached
+        assert await auth_service.get_user_by_phone("+910000000000") is None
+        assert await auth_service.get_user_by_phone("+910000000000") is None
+        assert len(db) == 3
+
+    asyncio.run(run())
+
+def test_token_claims_are_verified_and_cached(db):
+    token = auth_service.create_access_token({"sub": "+914444444444", "user_id": 1})
+    assert auth_service.decode_access_token(token)["user_id"] == 1
+    assert len(auth_service.claims_cache) == 1
+    assert auth_service.decode_access_token(token)["sub"] == "+914444444444"
+
+    expired = jwt.encode({"sub": "x", "user_id": 1, "exp": datetime.utcnow() - timedelta(minutes=1)},
+                         auth_service.SECRET_KEY, algorithm=auth_service.ALGORITHM)
+    forged = jwt.encode({"sub": "x", "user_id": 1}, "not-the-secret", algorithm=auth_service.ALGORITHM)
+    assert auth_service.decode_access_token(expired) is None
+    assert auth_service.decode_access_token(forged) is None
+    assert auth_service.decode_access_token("garbage") is None
+
+def test_me_costs_no_queries_when_cached(db):
+    user = asyncio.run(auth_service.create_user("+915555555555", "Lakshmi", None, "te"))
+    token = auth_service.create_access_token({"sub": user.phone, "user_id": user.id})
+    client = TestClient(app)
+    db.clear()
+
+    for _ in range(3):
+        response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+    assert response.json() == {"user_id": user.id, "phone": "+915555555555", "full_name": "Lakshmi", "language": "te"}
+    assert db == []
+
+    assert client.get("/auth/me").status_code == 401
+    assert client.get("/auth/me", headers={"Authorization": "Bearer garbage"}).status_code == 401
+    stale = auth_service.create_access_token({"sub": "+910000000000", "user_id": 999})
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {stale}"}).status_code == 401
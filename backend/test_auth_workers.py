@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services import auth_service
+from app.services.otp_store import MemoryPendingStore
+from app.services.sms_service import SMSQueue
+from app.services.workers import BoundedExecutor, PoolSaturated
+
+class FakeSMSSink:
+    """Local stand-in for Twilio: records deliveries, can block on a gate or fail the first N sends."""
+    def __init__(self, gate: threading.Event = None, failures: int = 0):
+        self.gate = gate
+        self.failures = failures
+        self.attempts = 0
+        self.delivered = []
+
+    def __call__(self, phone_number: str, otp: str):
+        self.attempts += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.attempts <= self.failures:
+            raise ConnectionError("twilio unavailable")
+        self.delivered.append((phone_number, otp))
+
+def test_sms_queue_retries_until_delivered():
+    sink = FakeSMSSink(failures=2)
+    queue = SMSQueue(sender=sink, workers=1, max_attempts=3, retry_delay=0)
+
+    async def run():
+        await queue.start()
+        queue.enqueue("+911234567890", "1234")
+        await queue.stop()
+
+    asyncio.run(run())
+    assert sink.delivered == [("+911234567890", "1234")]
+    assert queue.stats()["retried"] == 2
+    assert queue.sent == 1 and queue.failed == 0
+
+def test_sms_queue_gives_up_after_max_attempts():
+    sink = FakeSMSSink(failures=10)
+    queue = SMSQueue(sender=sink, workers=1, max_attempts=3, retry_delay=0)
+
+    async def run():
+        await queue.start()
+        queue.enqueue("+911234567890", "1234")
+        await queue.stop()
+
+    asyncio.run(run())
+    assert sink.attempts == 3
+    assert sink.delivered == []
+    assert queue.failed == 1
+
+def test_register_returns_before_sms_is_sent(monkeypatch):
+    gate = threading.Event()
+    sink = FakeSMSSink(gate=gate)
+    queue = SMSQueue(sender=sink, workers=2, retry_delay=0)
+    store = MemoryPendingStore()
+    monkeypatch.setattr(auth_service, "sms_queue", queue)
+    monkeypatch.setattr(auth_service, "pending_store", store)
+    async def no_user(phone):
+        return None
+
+    monkeypatch.setattr(auth_service, "get_user_by_phone", no_user)
+
+    async def run():
+        await queue.start()
+        try:
+            # Twilio is stuck, yet registration completes
+            result = await asyncio.wait_for(auth_service.register_user_step1("+919999900000", "Ravi", "en", "secret"), 3)
+            assert sink.delivered == []
+        finally:
+            gate.set()
+        await queue.stop()
+        return result
+
+    result = asyncio.run(run())
+    assert result == {"message": "OTP sent successfully", "is_existing_user": False}
+    pending = asyncio.run(store.get("+919999900000"))
+    assert sink.delivered == [("+919999900000", pending["otp"])]
+    assert auth_service.verify_password("secret", pending["password_hash"])
+
+def test_bounded_executor_rejects_when_queue_is_full():
+    pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+    block = lambda: release.wait(5)
+
+    async def run():
+        # One job running, one waiting: the third is turned away
+        jobs = [asyncio.ensure_future(pool.run(block)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(PoolSaturated):
+                await pool.run(block)
+            stats = pool.stats()
+        finally:
+            release.set()
+        await asyncio.gather(*jobs)
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 1 and stats["rejected"] == 1
+    assert pool.stats()["completed"] == 2 and pool.stats()["queued"] == 0
+
+def test_password_pool_round_trip():
+    async def run():
+        hashed = await auth_service.hash_password_async("secret")
+        return hashed, await auth_service.verify_password_async("secret", hashed), await auth_service.verify_password_async("wrong", hashed)
+
+    hashed, ok, bad = asyncio.run(run())
+    assert hashed.startswith("$2") and ok and not bad
+    assert auth_service.password_pool.stats()["completed"] >= 3
@@ -0,0 +1,83 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, select
+
+from app import dependencies
+from app.database import create_db_engine
+from app.dependencies import OPERATOR_KEY_HEADER
+from app.main import app
+from app.schemas import User
+from app.services.auth_service import verify_password
+from app.services.bulk_import import BulkImporter, import_pool, import_users_csv, read_csv
+
+CSV = """Phone,Full_Name,Language,Password
++911000000001,Ravi,te,secret
++911000000002,Lakshmi,,
++911000000001,Ravi again,te,
+,No Phone,en,
++911000000003,Existing,hi,
++911000000004,Sita,hi,
+"""
+
+def make_engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/import.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(phone="+911000000003", full_name="Already here"))
+        session.commit()
+    return engine
+
+def test_import_dedupes_and_hashes(tmp_path):
+    engine = make_engine(tmp_path)
+    progress = []
+    report = BulkImporter(engine=engine, chunk_size=2, workers=2, progress=progress.append).run(read_csv(io.StringIO(CSV)))
+
+    assert report["rows"] == 6
+    assert report["imported"] == 3
+    assert report["existing"] == 1 and report["duplicates"] == 1 and report["invalid"] == 1
+    assert report["errors"] == [{"line": 5, "error": "phone and full_name are required"}]
+    assert report["rows_per_second"] > 0
+    assert len(progress) == 3
+
+    with Session(engine) as session:
+        users = {u.phone: u for u in session.exec(select(User)).all()}
+    assert set(users) == {"+911000000001", "+911000000002", "+911000000003", "+911000000004"}
+    assert users["+911000000001"].full_name == "Ravi" and users["+911000000001"].language == "te"
+    assert verify_password("secret", users["+911000000001"].password_hash)
+    assert users["+911000000002"].password_hash is None and users["+911000000002"].language == "en"
+    assert users["+911000000003"].full_name == "Already here"
+
+def test_reimport_is_idempotent(tmp_path):
+    engine = make_engine(tmp_path)
+    import_users_csv(io.StringIO(CSV), engine=engine, workers=1)
+    report = import_users_csv(io.StringIO(CSV), engine=engine, workers=1)
+    assert report["imported"] == 0 and report["existing"] == 4
+
+def test_missing_columns_are_rejected():
+    with pytest.raises(ValueError, match="phone"):
+        list(read_csv(io.StringIO("name,mobile\nRavi,+911\n")))
+
+def test_endpoint_requires_operator_key(monkeypatch):
+    monkeypatch.setattr(dependencies, "OPERATOR_API_KEY", "ops-secret")
+    client = TestClient(app)
+    upload = {"file": ("farmers.csv", CSV)}
+    assert client.post("/auth/bulk-import", files=upload).status_code == 403
+    assert client.post("/auth/bulk-import", files=upload, headers={"Authorization": "Bearer farmer"}).status_code == 403
+    assert client.post("/auth/bulk-import", files=upload, headers={OPERATOR_KEY_HEADER: "wrong"}).status_code == 403
+
+def test_endpoint_imports_on_the_shared_pool(monkeypatch, tmp_path):
+    monkeypatch.setattr(dependencies, "OPERATOR_API_KEY", "ops-secret")
+    engine = make_engine(tmp_path)
+    monkeypatch.setattr(import_pool, "engine", engine)
+    operator = {OPERATOR_KEY_HEADER: "ops-secret"}
+    with TestClient(app) as client: # the lifespan starts the pool
+        executor = import_pool.executor
+        response = client.post("/auth/bulk-import", files={"file": ("farmers.csv", CSV)}, headers=operator)
+        assert response.status_code == 200
+        assert response.json()["imported"] == 3
+        assert client.post("/auth/bulk-import", files={"file": ("f.csv", "name\nRavi\n")}, headers=operator).status_code == 400
+        assert import_pool.executor is executor # one pool for every import
+    with Session(engine) as session:
+        assert verify_password("secret", session.exec(select(User).where(User.phone == "+911000000001")).one().password_hash)
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.chat_service import ChatService
+from app.services.session_store import MemorySessionStore
+
+ANSWERS = ["hi", "Search Manually", "Andhra Pradesh", "Guntur", "Black", "Kharif", "2"]
+
+def test_stream_sends_analyzing_before_recommendations():
+    client = TestClient(app)
+    session_id = None
+    for answer in ANSWERS:
+        session_id = client.post("/chat/", json={"message": answer, "session_id": session_id}).json()["session_id"]
+
+    with client.stream("POST", "/chat/stream", json={"message": "Yes", "session_id": session_id}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = response.read().decode()
+    events = [block.split("\n") for block in body.strip().split("\n\n")]
+    assert [lines[0] for lines in events] == ["event: progress", "event: message"]
+    progress, final = (json.loads(lines[1][len("data: "):]) for lines in events)
+    assert progress["state"] == final["state"] == "COMPLETE"
+    assert progress["response"] == "Analyzing your farm profile..." and progress["recommendations"] is None
+    assert final["recommendations"]
+
+def test_ndjson_stream_and_plain_endpoint_agree():
+    client = TestClient(app)
+    response = client.post("/chat/stream", json={"message": "hi"}, headers={"Accept": "application/x-ndjson"})
+    (event,) = [json.loads(line) for line in response.text.splitlines()]
+    assert event["event"] == "message" and event["state"] == "ASK_LOCATION"
+
+def test_progress_is_yielded_before_the_geocoder_is_called(monkeypatch):
+    service = ChatService(MemorySessionStore())
+    session_id = asyncio.run(service.process_message(None, "hi"))["session_id"]
+    calls = []
+
+    async def reverse_geocode(lat, lon):
+        calls.append((lat, lon))
+        return {"district": "Atlantis", "state": "Sea", "raw": "Atlantis, Sea"}
+    monkeypatch.setattr("app.services.chat_service.map_service.reverse_geocode", reverse_geocode)
+
+    async def run():
+        replies = service.stream_message(session_id, "LOC:0.0,-30.0") # mid-Atlantic: no district centre nearby
+        progress = await replies.__anext__()
+        assert progress["event"] == "progress" and not calls
+        final = await replies.__anext__()
+        return final
+    final = asyncio.run(run())
+    assert calls and final["state"] == "CONFIRM_LOCATION" and "Atlantis" in final["response"]
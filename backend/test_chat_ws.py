@@ -0,0 +1,52 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import app
+from app.routers import chat
+
+ANSWERS = ["hi", "Search Manually", "Andhra Pradesh", "Guntur", "Black", "Kharif", "2"]
+
+def test_turns_share_the_connection_session():
+    client = TestClient(app)
+    with client.websocket_connect("/chat/ws") as ws:
+        hello = ws.receive_json()
+        assert hello["event"] == "state" and hello["state"] == "START" and not hello["resumed"]
+        for answer in ANSWERS:
+            ws.send_text(answer)
+            reply = ws.receive_json()
+        assert reply["event"] == "message" and reply["state"] == "ASK_IRRIGATION"
+        ws.send_json({"message": "Yes"})
+        progress, final = ws.receive_json(), ws.receive_json()
+    assert progress["event"] == "progress" and final["event"] == "message"
+    assert final["session_id"] == hello["session_id"] and final["recommendations"]
+
+def test_reconnect_resumes_the_session():
+    client = TestClient(app)
+    with client.websocket_connect("/chat/ws") as ws:
+        session_id = ws.receive_json()["session_id"]
+        ws.send_json({"message": "hi", "language": "hi"})
+        assert ws.receive_json()["state"] == "ASK_LOCATION"
+
+    with client.websocket_connect(f"/chat/ws?session_id={session_id}") as ws:
+        hello = ws.receive_json()
+        assert hello["resumed"] and hello["session_id"] == session_id and hello["state"] == "ASK_LOCATION"
+        ws.send_json({"type": "ping"})
+        assert ws.receive_json() == {"event": "pong"}
+        ws.send_json({"text": "hi"})
+        assert ws.receive_json()["event"] == "error"
+
+    with client.websocket_connect("/chat/ws?session_id=gone") as ws:
+        hello = ws.receive_json()
+        assert not hello["resumed"] and hello["session_id"] != "gone"
+
+def test_silent_connections_are_pinged_then_closed(monkeypatch):
+    monkeypatch.setattr(chat, "WS_HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(chat, "WS_IDLE_TIMEOUT_SECONDS", 0.1)
+    client = TestClient(app)
+    with client.websocket_connect("/chat/ws") as ws:
+        ws.receive_json()
+        assert ws.receive_json() == {"event": "ping"}
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1001
@@ -0,0 +1,42 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import create_async_db_engine, create_db_engine, pool_metrics
+from app.main import app
+
+def test_sqlite_file_engine_uses_wal_and_metered_pool(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/farma.db", echo=False, pool_size=2)
+    with Session(engine) as session:
+        assert session.exec(text("PRAGMA journal_mode")).one()[0] == "wal"
+        assert session.exec(text("PRAGMA synchronous")).one()[0] == 1 # NORMAL
+        assert session.exec(text("PRAGMA mmap_size")).one()[0] > 0
+
+    metrics = pool_metrics(engine)
+    assert metrics["checkouts"] == 1 and metrics["checked_out"] == 0
+    assert metrics["timeouts"] == 0
+    assert not engine.echo
+    engine.dispose()
+
+def test_in_memory_engine_keeps_default_pool():
+    engine = create_db_engine("sqlite://")
+    with Session(engine) as session:
+        assert session.exec(text("select 1")).one()[0] == 1
+    assert pool_metrics(engine)["checkouts"] == 1
+
+def test_async_engine_pool_is_metered(tmp_path):
+    engine = create_async_db_engine(f"sqlite:///{tmp_path}/farma.db", pool_size=2)
+
+    async def query():
+        async with AsyncSession(engine) as session:
+            assert (await session.exec(text("select 1"))).one()[0] == 1
+        await engine.dispose()
+    asyncio.run(query())
+    assert pool_metrics(engine)["checkouts"] == 1
+
+def test_metrics_endpoint_reports_both_engines():
+    metrics = TestClient(app).get("/metrics/db").json()
+    assert set(metrics) == {"sync", "async"}
+    assert "wait_ms_max" in metrics["async"]
@@ -0,0 +1,75 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.services.dataset_cache import cache_dir_for, convert_csv, is_fresh, load_dataset
+
+CSV = """Soil Type,Crop Type,Nitrogen,Moisture,Ranked
+Sandy ,Maize,37,38.5,"['maize' 'oil seeds'
+ 'wheat']"
+Loamy,Wheat,12,45.0,['wheat']
+Sandy,Paddy,7,60.25,[]
+"""
+
+def test_columns_are_typed_and_memory_mapped(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV)
+    dataset = load_dataset(str(path))
+
+    assert dataset.columns == ["Soil Type", "Crop Type", "Nitrogen", "Moisture", "Ranked"]
+    assert len(dataset) == 3
+    assert dataset["Nitrogen"].dtype == np.int64 and isinstance(dataset["Nitrogen"], np.memmap)
+    assert dataset["Moisture"].tolist() == [38.5, 45.0, 60.25]
+    assert dataset.categories("Soil Type") == ["Loamy", "Sandy"]
+    assert dataset.codes("Soil Type").tolist() == [1, 0, 1]
+    assert dataset["Soil Type"].tolist() == ["Sandy", "Loamy", "Sandy"]
+    assert [items.tolist() for items in dataset["Ranked"]] == [["maize", "oil seeds", "wheat"], ["wheat"], []]
+
+    df = dataset.to_pandas()
+    assert str(df["Crop Type"].dtype) == "category"
+    assert df["Ranked"][0] == ["maize", "oil seeds", "wheat"]
+
+def test_stale_cache_is_rebuilt(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV)
+    load_dataset(str(path))
+    assert is_fresh(str(path))
+
+    path.write_text(CSV + "Red,Cotton,20,30.0,['cotton']\n")
+    assert not is_fresh(str(path))
+    with pytest.raises(FileNotFoundError):
+        load_dataset(str(path), convert=False)
+    assert len(load_dataset(str(path))) == 4
+
+    # A cache missing a column file is not used
+    os.remove(os.path.join(cache_dir_for(str(path)), "002.values.npy"))
+    assert not is_fresh(str(path))
+    convert_csv(str(path))
+    assert load_dataset(str(path), convert=False)["Nitrogen"].tolist() == [37, 12, 7, 20]
+
+def test_rebuilds_are_published_atomically(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV)
+    held = load_dataset(str(path))
+    first = held.directory
+
+    # A fresh cache is kept; a forced rebuild switches the link to a new build and drops the old one
+    convert_csv(str(path), reuse_fresh=True)
+    assert os.path.realpath(cache_dir_for(str(path))) == first
+    convert_csv(str(path))
+    assert os.path.islink(cache_dir_for(str(path))) and os.path.realpath(cache_dir_for(str(path))) != first
+    assert [d for d in glob.glob(cache_dir_for(str(path)) + ".*") if os.path.isdir(d) and not os.path.islink(d)] == \
+        [os.path.realpath(cache_dir_for(str(path)))]
+    assert held["Nitrogen"].tolist() == [37, 12, 7] # already mapped columns stay readable
+
+def _load_rows(path: str) -> int:
+    return len(load_dataset(path))
+
+def test_concurrent_first_loads_all_succeed(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV)
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(_load_rows, [str(path)] * 8)) == [3] * 8
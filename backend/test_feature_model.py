@@ -0,0 +1,45 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from app.schemas import FarmerContext
+from app.services.compiled_model import CompiledForest
+from app.services.model_registry import model_registry
+
+def make_data(rows: int = 2000):
+    rng = np.random.default_rng(7)
+    X = np.column_stack([rng.integers(0, 5, rows), rng.uniform(0, 100, (rows, 6))])
+    y = (X[:, 0] + (X[:, 1] > 50) * 3 + (X[:, 4] > 30)).astype(int) % 6
+    return X, y
+
+def test_compiled_forest_matches_sklearn():
+    X, y = make_data()
+    for model in (DecisionTreeClassifier(max_depth=6).fit(X, y), RandomForestClassifier(10, max_depth=6, random_state=0).fit(X, y)):
+        compiled = CompiledForest.from_sklearn(model)
+        np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-12)
+        for row in X[:50]:
+            np.testing.assert_allclose(compiled.predict_proba_one(row), model.predict_proba(row[None])[0], atol=1e-12)
+
+def test_measurements_switch_to_feature_model():
+    engine = model_registry.active
+    assert engine.feature_model is not None
+    soil_only = FarmerContext(soilType="Black", season="Kharif")
+    # No season/irrigation rules apply, so the top crop is the model's argmax
+    measured = FarmerContext(soilType="Black", temperature=31, humidity=60, nitrogen=20)
+
+    assert engine.get_recommendations(soil_only) == engine.recommend("black", "kharif")
+    expected = engine.feature_model.predict_proba_one(
+        [engine.soil_index["black"], 31, 60, *engine.feature_defaults[2:3], 20, *engine.feature_defaults[4:]])
+    recs = engine.get_recommendations(measured)
+    assert recs and recs[0].confidence == expected.max()
+
+def test_batch_matches_single_with_measurements():
+    contexts = [
+        FarmerContext(soilType=soil, season=season, hasIrrigation=irrigation, temperature=temp, moisture=moisture)
+        for soil in ("Red", "sandy", "Clayey")
+        for season in (None, "Rabi", "zaid")
+        for irrigation in (None, False)
+        for temp, moisture in ((None, None), (35.0, None), (22.5, 61.0))
+    ]
+    engine = model_registry.active
+    assert engine.get_recommendations_batch(contexts) == [engine.get_recommendations(c) for c in contexts]
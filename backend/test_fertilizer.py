@@ -0,0 +1,66 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import fertilizer
+from app.schemas import FertilizerQuery
+from app.services.fertilizer_engine import FertilizerIndex, fertilizer_index
+
+ROWS = [
+    # Temparature,Humidity,Moisture,Soil Type,Crop Type,Nitrogen,Potassium,Phosphorous,Fertilizer Name
+    "26,52,38,Sandy,Maize,37,0,0,Urea",
+    "26,52,38,Sandy,Maize,35,0,2,Urea",
+    "26,52,38,Sandy,Maize,10,5,40,DAP",
+    "29,52,45,Loamy,Maize,36,0,0,28-28",
+    "29,52,45,Loamy,Wheat,12,0,36,DAP",
+]
+
+def make_index(tmp_path) -> FertilizerIndex:
+    path = tmp_path / "dataset.csv"
+    path.write_text("Temparature,Humidity,Moisture,Soil Type,Crop Type,Nitrogen,Potassium,Phosphorous,Fertilizer Name\n" + "\n".join(ROWS) + "\n")
+    return FertilizerIndex(str(path))
+
+def test_nearest_with_filters(tmp_path):
+    index = make_index(tmp_path)
+    result = index.query(FertilizerQuery(nitrogen=36, phosphorous=0, potassium=0), k=3)
+    assert [n.nitrogen for n in result.neighbours[:2]] == [36, 37]
+    assert result.fertilizer == "Urea" and np.isclose(result.confidence, 2 / 3)
+    assert [n.distance for n in result.neighbours] == sorted(n.distance for n in result.neighbours)
+
+    sandy = index.query(FertilizerQuery(nitrogen=36, phosphorous=0, potassium=0, soilType="SANDY", cropType="maize"), k=1)
+    assert sandy.fertilizer == "Urea" and sandy.neighbours[0].soilType == "Sandy"
+    wheat = index.query(FertilizerQuery(nitrogen=36, phosphorous=0, potassium=0, cropType="Wheat"), k=5)
+    assert wheat.fertilizer == "DAP" and len(wheat.neighbours) == 1
+    assert index.query(FertilizerQuery(nitrogen=1, phosphorous=1, potassium=1, soilType="Red")).neighbours == []
+
+def test_batch_matches_single():
+    rng = np.random.default_rng(3)
+    queries = [
+        FertilizerQuery(nitrogen=n, phosphorous=p, potassium=k, soilType=soil, cropType=crop)
+        for n, p, k, soil, crop in zip(
+            rng.integers(0, 45, 300), rng.integers(0, 45, 300), rng.uniform(0, 20, 300),
+            rng.choice(["Sandy", "clayey", None], 300), rng.choice(["Maize", "Paddy", None, "Rye"], 300),
+        )
+    ]
+    assert fertilizer_index.query_batch(queries, 4) == [fertilizer_index.query(q, 4) for q in queries]
+
+def test_endpoints():
+    client = TestClient(app)
+    query = {"nitrogen": 37, "phosphorous": 0, "potassium": 0, "soilType": "Sandy", "cropType": "Maize"}
+    response = client.post("/fertilizer", params={"k": 3}, json=query)
+    assert response.status_code == 200
+    assert len(response.json()["neighbours"]) == 3
+    assert client.post("/fertilizer", json={**query, "cropType": "Rye"}).status_code == 404
+    assert client.post("/fertilizer", json={**query, "nitrogen": -1}).status_code == 422
+
+    batch = client.post("/fertilizer/batch", json=[query, {**query, "cropType": "Rye"}]).json()
+    assert batch[0]["fertilizer"] and batch[1] == {"fertilizer": None, "confidence": 0.0, "neighbours": []}
+
+def test_oversized_batch_is_413_whether_or_not_loaded(monkeypatch, tmp_path):
+    monkeypatch.setattr(fertilizer, "MAX_FERTILIZER_BATCH", 2)
+    client = TestClient(app)
+    queries = [{"nitrogen": 37, "phosphorous": 0, "potassium": 0}] * 3
+    assert client.post("/fertilizer/batch", json=queries).status_code == 413
+    monkeypatch.setattr(fertilizer, "fertilizer_index", FertilizerIndex(str(tmp_path / "missing.csv")))
+    assert client.post("/fertilizer/batch", json=queries).status_code == 413
+    assert client.post("/fertilizer/batch", json=queries[:2]).status_code == 503
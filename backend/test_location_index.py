@@ -0,0 +1,45 @@
+from app.services.chat_service import INDIA_STATES_DISTRICTS, place_index
+from app.services.geo_index import district_index
+
+def test_every_district_has_a_centre():
+    indexed = {(state, district) for state, district, covered in
+               zip(district_index.states, district_index.districts, district_index.covered) if covered}
+    expected = {(state, district) for state, districts in INDIA_STATES_DISTRICTS.items() for district in districts}
+    assert indexed == expected
+
+def test_reverse_lookup_resolves_nearby_coordinates():
+    assert district_index.lookup(16.30, 80.45)["district"] == "Guntur"
+    assert district_index.lookup(14.70, 77.58) == {
+        "district": "Anantapur", "state": "Andhra Pradesh", "raw": "Anantapur, Andhra Pradesh, India"
+    }
+    # Same district name in two states
+    assert district_index.lookup(19.90, 75.30)["state"] == "Maharashtra"
+    assert district_index.lookup(24.70, 84.40)["state"] == "Bihar"
+
+def test_reverse_lookup_misses_far_from_any_district():
+    assert district_index.lookup(51.5, -0.12) is None # London
+    assert district_index.lookup(15.0, 88.0) is None  # Bay of Bengal
+
+def test_reverse_lookup_leaves_uncovered_places_and_borders_to_the_geocoder():
+    assert district_index.lookup(28.61, 77.21) is None  # New Delhi, not Ghaziabad
+    assert district_index.lookup(30.73, 76.78) is None  # Chandigarh, not SAS Nagar
+    assert district_index.lookup(11.94, 79.81) is None  # Pondicherry, not Cuddalore
+    assert district_index.lookup(28.54, 77.39) is None  # Noida: Faridabad (Haryana) is nearly as close
+    assert district_index.lookup(28.46, 77.03)["district"] == "Gurugram"
+    assert district_index.lookup(16.51, 80.65)["state"] == "Andhra Pradesh" # a tie within one state is fine
+
+def test_place_search_tolerates_spelling_and_script():
+    assert place_index.search("Guntoor")["district"] == "Guntur"
+    assert place_index.search("Anantpur")["district"] == "Anantapur"
+    assert place_index.search("Bengaluru")["district"] == "Bangalore Urban"
+    assert place_index.search("गुंटूर")["district"] == "Guntur"
+    assert place_index.search("पटना")["district"] == "Patna"
+
+def test_place_search_uses_state_to_pick_between_districts():
+    assert place_index.search("Aurangabad, Bihar")["state"] == "Bihar"
+    assert place_index.search("Aurangabad district, Maharashtra")["state"] == "Maharashtra"
+    assert place_index.search("Telangana") == {"state": "Telangana", "district": None, "name": "Telangana", "score": 1.0}
+
+def test_place_search_leaves_unknown_places_to_the_geocoder():
+    assert place_index.search("xyzzy") is None
+    assert place_index.search("  ,  ") is None
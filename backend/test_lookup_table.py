@@ -0,0 +1,25 @@
+import itertools
+
+import pytest
+from pydantic import ValidationError
+
+from app.services.model_registry import model_registry
+from app.services.recommendation_engine import DEFAULT_RANKING, SEASON_BUCKETS, SEASON_INDEX
+
+def test_table_matches_ranking_on_the_fly():
+    engine = model_registry.active
+    for soil, season, has_irrigation, land_area in itertools.product(
+            engine.soil_labels, SEASON_BUCKETS, (None, True, False), (None, 0.5, 5.0)):
+        soil_idx = engine.soil_index[soil]
+        expected = engine._rank(engine.soil_probabilities[[soil_idx]], [soil_idx], [SEASON_INDEX.get(season, 0)],
+                                [int(has_irrigation is False)], [int(land_area == 0.5)], DEFAULT_RANKING)[0]
+        assert engine.recommend(soil, season, has_irrigation, land_area) == expected, (soil, season, has_irrigation, land_area)
+
+def test_cached_recommendations_cannot_be_modified():
+    engine = model_registry.active
+    recs = engine.recommend(engine.soil_labels[0])
+    assert recs
+    with pytest.raises(ValidationError):
+        recs[0].confidence = 0.0
+    recs.clear()
+    assert engine.recommend(engine.soil_labels[0])
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+import pytest
+
+from app.services.map_service import MapService
+
+class FakeGeocoder(BaseHTTPRequestHandler):
+    """Local stand-in for the MapTiler geocoding API."""
+    delay = 0.0
+    requests = []
+
+    def do_GET(self):
+        path = unquote(urlparse(self.path).path)
+        FakeGeocoder.requests.append(path)
+        time.sleep(FakeGeocoder.delay)
+
+        query = path.rsplit("/", 1)[-1].removesuffix(".json")
+        if query == "nowhere":
+            features = []
+        elif "," in query and query.replace(",", "").replace(".", "").replace("-", "").isdigit():
+            features = [{"place_name": "Guntur, Andhra Pradesh, India"}]
+        else:
+            features = [{"place_name": f"{query.title()}, India", "center": [80.4, 16.3]}]
+
+        body = json.dumps({"features": features}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def geocoder_url():
+    FakeGeocoder.delay = 0.0
+    FakeGeocoder.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGeocoder)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/geocoding"
+    server.shutdown()
+
+def test_reverse_geocode_is_cached_per_cell(geocoder_url):
+    service = MapService(base_url=geocoder_url)
+
+    async def run():
+        first = await service.reverse_geocode(16.3067, 80.4365)
+        second = await service.reverse_geocode(16.3071, 80.4362) # same ~1 km cell
+        await service.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == {"district": "Guntur", "state": "Andhra Pradesh", "raw": "Guntur, Andhra Pradesh, India"}
+    assert second == first
+    assert len(FakeGeocoder.requests) == 1
+
+def test_concurrent_searches_share_one_request(geocoder_url):
+    FakeGeocoder.delay = 0.2
+    service = MapService(base_url=geocoder_url)
+
+    async def run():
+        results = await asyncio.gather(*[service.search_place(q) for q in ["Anantapur", " anantapur ", "ANANTAPUR"] * 5])
+        await service.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert all(r["name"] == "Anantapur, India" for r in results)
+    assert len(FakeGeocoder.requests) == 1
+
+def test_timeouts_return_none_and_are_not_cached(geocoder_url):
+    FakeGeocoder.delay = 0.5
+    service = MapService(base_url=geocoder_url, timeout=0.1)
+
+    async def run():
+        result = await service.search_place("Guntoor")
+        await service.aclose()
+        return result
+
+    assert asyncio.run(run()) is None
+    assert len(service.cache) == 0
+
+def test_missing_place_is_cached(geocoder_url):
+    service = MapService(base_url=geocoder_url)
+
+    async def run():
+        results = [await service.search_place("nowhere") for _ in range(3)]
+        await service.aclose()
+        return results
+
+    assert asyncio.run(run()) == [None, None, None]
+    assert len(FakeGeocoder.requests) == 1
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import shutil
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import dependencies
+from app.dependencies import OPERATOR_KEY_HEADER
+from app.main import app
+from app.schemas import FarmerContext
+from app.services.model_registry import ModelRegistry, ReloadInProgress, UnknownModelVersion, model_registry
+from app.services.recommendation_engine import MANIFEST_FILE, MODEL_DIR, MODEL_FILE, RecommendationEngine
+
+@pytest.fixture
+def registry(tmp_path):
+    for version in ("v1", "v2"):
+        shutil.copytree(os.path.join(MODEL_DIR, "v1"), tmp_path / version)
+    # A version whose model file is corrupt
+    shutil.copytree(os.path.join(MODEL_DIR, "v1"), tmp_path / "v10")
+    os.remove(tmp_path / "v10" / MANIFEST_FILE)
+    with open(tmp_path / "v10" / MODEL_FILE, "wb") as f:
+        f.write(b"not a model")
+    (tmp_path / "ACTIVE").write_text("v1\n")
+
+    registry = ModelRegistry(model_dir=str(tmp_path), pointer=str(tmp_path / "ACTIVE"), pinned=None)
+    registry.load_initial()
+    return registry
+
+def test_versions_and_initial_load(registry):
+    assert registry.versions() == ["v1", "v2", "v10"]
+    assert registry.active.version == "v1"
+    assert registry.status()["versions"][0] == {"version": "v1", "active": True, "feature_model": True, "mmap": True}
+
+def test_mmap_artifacts_match_pickles(tmp_path):
+    source = RecommendationEngine(os.path.join(MODEL_DIR, "v1"), use_artifacts=False)
+    source.save_artifacts(str(tmp_path))
+    # Only the export is present, so the pickles cannot be used
+    exported = RecommendationEngine(str(tmp_path), "v1")
+
+    assert isinstance(exported.model.leaf_proba, np.memmap)
+    assert not exported.model.leaf_proba.flags.writeable
+    assert exported.lookup_table == source.lookup_table
+    contexts = [FarmerContext(soilType=soil, temperature=t) for soil in ("Red", "black") for t in (None, 18.0, 33.5)]
+    assert exported.get_recommendations_batch(contexts) == source.get_recommendations_batch(contexts)
+
+def test_activate_swaps_engine_and_updates_pointer(registry):
+    old = registry.active
+    context = FarmerContext(soilType="Loamy")
+
+    new = asyncio.run(registry.activate("v2"))
+
+    assert registry.active is new and new.version == "v2"
+    assert registry.read_pointer() == "v2"
+    # An in-flight request holding the old engine is unaffected
+    assert old.get_recommendations(context) == new.get_recommendations(context)
+
+def test_failed_smoke_test_keeps_current_version(registry):
+    current = registry.active
+    with pytest.raises(ValueError):
+        asyncio.run(registry.activate("v10"))
+    assert registry.active is current
+    assert registry.read_pointer() == "v1"
+    assert registry.last_error.startswith("v10:")
+    assert registry.loading is None
+
+    with pytest.raises(UnknownModelVersion):
+        asyncio.run(registry.activate("v99"))
+
+def test_one_load_at_a_time(registry):
+    async def scenario():
+        task = registry.activate_in_background("v2")
+        with pytest.raises(ReloadInProgress):
+            registry.activate_in_background("v1")
+        await task
+
+    asyncio.run(scenario())
+    assert registry.active.version == "v2"
+
+def test_watcher_follows_pointer(registry):
+    with open(registry.pointer, "w") as f:
+        f.write("v2\n")
+    asyncio.run(registry.sync_with_pointer())
+    assert registry.active.version == "v2"
+
+    # A version that fails is not retried until the pointer changes
+    with open(registry.pointer, "w") as f:
+        f.write("v10\n")
+    asyncio.run(registry.sync_with_pointer())
+    assert registry.active.version == "v2"
+
+def test_responses_name_the_serving_version(registry, monkeypatch):
+    client = TestClient(app)
+    body = {"soilType": "Loamy"}
+    assert client.post("/recommendations", json=body).headers["X-Model-Version"] == model_registry.active.version
+
+    asyncio.run(registry.activate("v2"))
+    monkeypatch.setattr(model_registry, "active", registry.active)
+    response = client.post("/recommendations/batch", json=[body])
+    assert response.status_code == 200
+    assert response.headers["X-Model-Version"] == "v2"
+
+def test_activate_endpoint(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(dependencies, "OPERATOR_API_KEY", "ops-secret")
+    operator = {OPERATOR_KEY_HEADER: "ops-secret"}
+    assert client.post("/models/nope/activate", headers=operator).status_code == 404
+    monkeypatch.setattr(model_registry, "loading", "v1")
+    assert client.post("/models/v1/activate", headers=operator).status_code == 409
+    assert client.get("/models").json()["active"] == model_registry.active.version
+
+def test_operator_endpoints_reject_farmers(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(dependencies, "OPERATOR_API_KEY", "")
+    # A farmer's bearer token is not an operator key
+    assert client.post("/models/v1/activate", headers={"Authorization": "Bearer farmer"}).status_code == 403
+    assert client.put("/models/ab-split", json={"percent": 50}).status_code == 403
+    assert client.get("/models/evaluation").status_code == 403
+    assert client.get("/auth/workers").status_code == 403
+    # Without OPERATOR_API_KEY configured there is no key that works
+    assert client.get("/auth/workers", headers={OPERATOR_KEY_HEADER: ""}).status_code == 403
+    monkeypatch.setattr(dependencies, "OPERATOR_API_KEY", "ops-secret")
+    assert client.get("/models/evaluation", headers={OPERATOR_KEY_HEADER: "wrong"}).status_code == 403
+    assert client.get("/auth/workers", headers={OPERATOR_KEY_HEADER: "ops-secret"}).status_code == 200
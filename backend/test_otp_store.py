@@ -0,0 +1,77 @@
+import asyncio
+
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.services import auth_service
+from app.services.otp_store import MemoryPendingStore, SQLPendingStore
+
+def make_async_sqlite_engine():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    asyncio.run(create_tables())
+    return engine
+
+PENDING = {"otp": "4321", "full_name": "Ravi", "language": "te", "password_hash": "$2b$12$hash"}
+
+def test_sql_store_round_trip_and_expiry():
+    engine = make_async_sqlite_engine()
+    store = SQLPendingStore(engine=engine, ttl=60)
+    expired = SQLPendingStore(engine=engine, ttl=-1)
+
+    async def run():
+        await store.save("+911111111111", PENDING)
+        assert await store.get("+911111111111") == PENDING
+
+        await expired.save("+912222222222", PENDING)
+        assert await expired.get("+912222222222") is None
+        assert await store.purge_expired() == 1
+        assert await store.get("+911111111111") == PENDING
+
+        await store.delete("+911111111111")
+        assert await store.get("+911111111111") is None
+
+    asyncio.run(run())
+
+def test_memory_store_is_bounded_and_expires():
+    store = MemoryPendingStore(max_entries=2, ttl=60)
+    expired = MemoryPendingStore(ttl=0)
+
+    async def run():
+        for phone in ["a", "b", "c"]:
+            await store.save(phone, PENDING)
+        assert len(store) == 2 and await store.get("a") is None
+
+        await expired.save("a", PENDING)
+        assert await expired.purge_expired() == 1
+
+    asyncio.run(run())
+
+def test_otp_verified_by_another_worker(monkeypatch):
+    # Two workers: separate processes would share nothing but the database
+    engine = make_async_sqlite_engine()
+    monkeypatch.setattr(auth_service, "pending_store", SQLPendingStore(engine=engine))
+    monkeypatch.setattr(auth_service, "async_engine", engine)
+    monkeypatch.setattr(auth_service.sms_queue, "enqueue", lambda phone, otp: None)
+    auth_service.user_cache.clear()
+
+    async def run():
+        await auth_service.register_user_step1("+913333333333", "Ravi", "te", "secret")
+        otp = (await SQLPendingStore(engine=engine).get("+913333333333"))["otp"]
+        monkeypatch.setattr(auth_service, "pending_store", SQLPendingStore(engine=engine))
+        wrong = await auth_service.verify_otp_step2("+913333333333", "0000" if otp != "0000" else "1111")
+        token = await auth_service.verify_otp_step2("+913333333333", otp)
+        reused = await auth_service.verify_otp_step2("+913333333333", otp)
+        auth_service.user_cache.clear()
+        user = await auth_service.get_user_by_phone("+913333333333")
+        return wrong, token, reused, user
+
+    wrong, token, reused, user = asyncio.run(run())
+    assert wrong is None and reused is None
+    assert token["user_id"] == user.id and token["language"] == "te"
+    assert auth_service.verify_password("secret", user.password_hash)
@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import recommendations
+from app.schemas import FarmerContext, RankingOptions
+from app.services.model_registry import model_registry
+from app.services.recommendation_engine import _top_k
+
+def test_top_k_orders_best_first():
+    scores = np.array([[0.1, 0.5, -np.inf, 0.5, 0.3], [0.9, 0.2, 0.4, 0.1, 0.3]])
+    assert _top_k(scores, 3).tolist() == [[1, 3, 4], [0, 2, 4]]
+    assert _top_k(scores, 10).shape == (2, 5)
+
+def test_k_and_threshold():
+    engine = model_registry.active
+    context = FarmerContext(soilType="Loamy")
+    recs = engine.get_recommendations(context, RankingOptions(k=5))
+    assert len(recs) == 5
+    assert recs[0] == engine.get_recommendations(context)[0]
+    assert [r.score for r in recs] == sorted((r.score for r in recs), reverse=True)
+
+    everything = engine.get_recommendations(context, RankingOptions(k=20, minProbability=0.0))
+    assert len(everything) == len(engine.crop_labels)
+    assert engine.get_recommendations(context, RankingOptions(k=20, minProbability=0.99)) == []
+
+def test_weights_rerank():
+    engine = model_registry.active
+    context = FarmerContext(soilType="Loamy", season="Zaid", landArea=0.5)
+    weighted = engine.get_recommendations(context, RankingOptions(k=11, minProbability=0.0))
+    unweighted = engine.get_recommendations(context, RankingOptions(k=11, minProbability=0.0, seasonWeight=0, landWeight=0))
+
+    # Maize is the only zaid crop, so the season modifier lifts it to the top
+    assert weighted[0].cropName == "Maize"
+    assert all(r.score == r.confidence for r in unweighted)
+    assert [r.confidence for r in unweighted] == sorted((r.confidence for r in unweighted), reverse=True)
+    cotton = next(r for r in weighted if r.cropName == "Cotton")
+    assert np.isclose(cotton.score, cotton.confidence * (1 - 0.5 - 0.2))
+
+def test_batch_matches_single_with_options():
+    contexts = [
+        FarmerContext(soilType=soil, season=season, hasIrrigation=irrigation, landArea=land, temperature=temp)
+        for soil in ("Red", "Black")
+        for season in (None, "rabi", "zaid")
+        for irrigation in (None, False)
+        for land in (None, 0.4)
+        for temp in (None, 30.0)
+    ]
+    engine = model_registry.active
+    for options in (RankingOptions(k=3), RankingOptions(k=4, minProbability=0.09, seasonWeight=2.0, landWeight=0.5)):
+        assert engine.get_recommendations_batch(contexts, options) == [engine.get_recommendations(c, options) for c in contexts]
+
+def test_endpoint_ranking_parameters():
+    client = TestClient(app)
+    body = {"soilType": "Sandy", "season": "Zaid"}
+    response = client.post("/recommendations", params={"k": 3, "seasonWeight": 0}, json=body)
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert all(r["score"] == r["confidence"] for r in response.json())
+
+    assert client.post("/recommendations", params={"k": 0}, json=body).status_code == 422
+
+    lines = client.post("/recommendations/batch", params={"k": 2}, json=[body, body]).text.splitlines()
+    assert [len(json.loads(line)["recommendations"]) for line in lines] == [2, 2]
+
+def test_batch_size_is_capped(monkeypatch):
+    monkeypatch.setattr(recommendations, "MAX_BATCH_ITEMS", 2)
+    monkeypatch.setattr(recommendations, "MAX_BATCH_BYTES", 200)
+    client = TestClient(app)
+    body = {"soilType": "Black"}
+    assert client.post("/recommendations/batch", json=[body] * 2).status_code == 200
+    assert client.post("/recommendations/batch", json=[body] * 3).status_code == 413
+    ndjson = "\n".join([json.dumps(body)] * 3)
+    assert client.post("/recommendations/batch", content=ndjson, headers={"Content-Type": "application/x-ndjson"}).status_code == 413
+    assert client.post("/recommendations/batch", json=[{"soilType": "Black" * 50}]).status_code == 413
+
+def test_what_if_grid():
+    client = TestClient(app)
+    body = {
+        "base": {"soilType": "Loamy", "landArea": 2.0},
+        "overrides": {"season": ["Kharif", "Rabi", "Zaid"], "hasIrrigation": [True, False]},
+    }
+    response = client.post("/recommendations/what-if", params={"k": 2}, json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert [axis["field"] for axis in data["axes"]] == ["season", "hasIrrigation"]
+    assert len(data["matrix"]) == 6
+
+    engine = model_registry.active
+    # Row-major: (Rabi, False) is variant 1 * 2 + 1
+    expected = engine.get_recommendations(FarmerContext(soilType="Loamy", landArea=2.0, season="Rabi", hasIrrigation=False), RankingOptions(k=2))
+    assert [cell["crop"] for cell in data["matrix"][3]] == [r.cropName for r in expected]
+    assert all(cell["crop"] in data["crops"] for row in data["matrix"] for cell in row)
+
+def test_what_if_rejects_bad_overrides():
+    client = TestClient(app)
+    base = {"soilType": "Loamy"}
+    assert client.post("/recommendations/what-if", json={"base": base, "overrides": {"colour": ["red"]}}).status_code == 400
+    assert client.post("/recommendations/what-if", json={"base": base, "overrides": {"landArea": ["big"]}}).status_code == 422
+    too_many = {"landArea": list(range(40)), "temperature": list(range(40))}
+    assert client.post("/recommendations/what-if", json={"base": base, "overrides": too_many}).status_code == 400
+    assert client.post("/recommendations/what-if", json={"base": {}, "overrides": {"season": ["rabi"]}}).status_code == 400
@@ -0,0 +1,42 @@
+import itertools
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import recommendations
+from app.schemas import FarmerContext
+from app.services.model_registry import model_registry
+
+CONTEXTS = [
+    {"soilType": soil, "season": season, "hasIrrigation": irrigation, "landArea": land}
+    for soil, season, irrigation, land in itertools.product(
+        ("Black", "Red", "Loamy", "Sandy", "Clayey", "Mars"), (None, "Kharif", "Rabi", "Zaid"), (None, False), (None, 0.5))
+]
+
+def test_batch_matches_single_requests():
+    engine = model_registry.active
+    contexts = [FarmerContext(**body) for body in CONTEXTS]
+    assert engine.get_recommendations_batch(contexts) == [engine.get_recommendations(c) for c in contexts]
+
+def test_endpoint_streams_single_results_in_order(monkeypatch):
+    monkeypatch.setattr(recommendations, "BATCH_CHUNK_SIZE", 7) # several chunks
+    client = TestClient(app)
+    expected = []
+    for body in CONTEXTS:
+        response = client.post("/recommendations", json=body)
+        expected.append(response.json() if response.status_code == 200 else [])
+
+    for content, headers in (
+        (json.dumps(CONTEXTS), {"Content-Type": "application/json"}),
+        ("\n".join(json.dumps(body) for body in CONTEXTS) + "\n", {"Content-Type": "application/x-ndjson"}),
+    ):
+        lines = [json.loads(line) for line in client.post("/recommendations/batch", content=content, headers=headers).text.splitlines()]
+        assert [line["index"] for line in lines] == list(range(len(CONTEXTS)))
+        assert [line["recommendations"] for line in lines] == expected
+
+def test_invalid_lines_do_not_stop_the_batch():
+    body = "\n".join([json.dumps(CONTEXTS[0]), "{not json", json.dumps({"landArea": "big"})])
+    lines = TestClient(app).post("/recommendations/batch", content=body, headers={"Content-Type": "application/x-ndjson"}).text.splitlines()
+    first, broken, invalid = (json.loads(line) for line in lines)
+    assert "recommendations" in first and "error" in broken and "error" in invalid
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from sqlmodel import SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.services.session_store import ChatSession, ChatState, MemorySessionStore, SQLSessionStore
+from app.services.chat_service import ChatService
+
+def make_sqlite_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+def test_memory_store_is_bounded():
+    store = MemorySessionStore(max_entries=2, ttl=60)
+    for sid in ["a", "b", "c"]:
+        store.save(ChatSession(sid))
+
+    assert len(store) == 2
+    assert store.get("a") is None
+    assert store.get("c").session_id == "c"
+
+def test_memory_store_expires_sessions():
+    store = MemorySessionStore(max_entries=10, ttl=0)
+    store.save(ChatSession("a"))
+    assert store.get("a") is None
+
+def test_compact_session_fields():
+    session = ChatSession("abc")
+    session.soil_type = "Black"
+    session.season = "kharif"
+    session.has_irrigation = True
+    session.soil_type = "Clay"
+
+    ctx = session.to_context()
+    assert (ctx.soilType, ctx.season, ctx.hasIrrigation, ctx.landArea) == ("Clay", "Kharif", True, None)
+    assert not hasattr(session, "__dict__")
+
+def test_sql_store_round_trip():
+    store = SQLSessionStore(engine=make_sqlite_engine())
+    session = ChatSession("abc")
+    session.state = ChatState.ASK_SEASON
+    session.set_location("Guntur", "Andhra Pradesh")
+    session.soil_type = "black cotton"
+    session.land_area = 2.5
+    session.has_irrigation = False
+    store.save(session)
+
+    loaded = store.get("abc")
+    assert loaded.state == ChatState.ASK_SEASON
+    assert loaded.district == "Guntur"
+    assert loaded.soil_type == "black cotton"
+    assert loaded.land_area == 2.5
+    assert loaded.has_irrigation is False
+
+    store.delete("abc")
+    assert store.get("abc") is None
+
+def test_chat_state_is_shared_between_services():
+    # Two services on one SQL store behave like two uvicorn workers
+    engine = make_sqlite_engine()
+    worker_a = ChatService(SQLSessionStore(engine=engine))
+    worker_b = ChatService(SQLSessionStore(engine=engine))
+
+    first = asyncio.run(worker_a.process_message(None, "hi"))
+    second = asyncio.run(worker_b.process_message(first["session_id"], "Search Manually"))
+
+    assert second["session_id"] == first["session_id"]
+    assert second["state"] == "SELECT_STATE"
+
+def test_sql_store_does_not_block_the_event_loop():
+    store = SQLSessionStore(engine=make_sqlite_engine())
+    threads = []
+    save = store.save
+    store.save = lambda session: threads.append(threading.get_ident()) or save(session)
+
+    async def turn():
+        await ChatService(store).process_message(None, "hi")
+        return threading.get_ident()
+    loop_thread = asyncio.run(turn())
+    assert threads and threads[0] != loop_thread
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas import FarmerContext
+from app.services.model_registry import ModelRegistry, model_registry
+from app.services.recommendation_engine import MODEL_DIR, RecommendationEngine
+from app.services.shadow_evaluator import ABSplit, ShadowEvaluator
+
+V1 = os.path.join(MODEL_DIR, "v1")
+
+def wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_ab_split_is_deterministic_and_proportional():
+    split = ABSplit(percent=20, salt="test")
+    keys = [f"user-{i}" for i in range(10000)]
+    arms = [split.in_candidate_arm(k) for k in keys]
+    assert arms == [split.in_candidate_arm(k) for k in keys]
+    assert 0.18 < sum(arms) / len(arms) < 0.22
+    assert not split.in_candidate_arm(None)
+    assert not any(ABSplit(percent=0).in_candidate_arm(k) for k in keys[:100])
+
+def test_identical_models_agree_per_segment():
+    live = RecommendationEngine(V1, "v1")
+    candidate = RecommendationEngine(V1, "v2")
+    evaluator = ShadowEvaluator(maxsize=100, top_k=3)
+    contexts = [FarmerContext(soilType=soil, season=season) for soil in ("Black", "red") for season in (None, "Rabi")] * 5
+
+    assert not evaluator.submit(contexts[0], live, candidate, "live", [], 0.0) # not started
+    evaluator.start()
+    try:
+        for i, context in enumerate(contexts):
+            arm, served, other = ("candidate", candidate, live) if i % 2 else ("live", live, candidate)
+            assert evaluator.submit(context, served, other, arm, served.get_recommendations(context), 1e-5)
+        wait_for(lambda: evaluator.processed == len(contexts))
+    finally:
+        evaluator.stop()
+
+    snapshot = evaluator.snapshot()
+    (comparison,) = snapshot["comparisons"]
+    assert (comparison["live"], comparison["candidate"]) == ("v1", "v2")
+    assert comparison["overall"]["requests"] == len(contexts)
+    assert comparison["overall"]["candidate_served"] == len(contexts) // 2
+    assert comparison["overall"]["agreement_rate"] == 1.0
+    assert comparison["overall"]["top_k_overlap"] == 1.0
+    assert [(s["soil"], s["season"]) for s in comparison["segments"]] == [
+        ("black", "any"), ("black", "rabi"), ("red", "any"), ("red", "rabi")]
+    assert snapshot["dropped"] == snapshot["errors"] == 0
+
+class BlockingEngine:
+    version = "slow"
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def get_recommendations(self, context, options=None):
+        self.started.set()
+        self.release.wait(5)
+        return []
+
+def test_full_queue_drops_without_blocking():
+    live = RecommendationEngine(V1, "v1")
+    slow = BlockingEngine()
+    evaluator = ShadowEvaluator(maxsize=1)
+    evaluator.start()
+    context = FarmerContext(soilType="Loamy")
+    try:
+        assert evaluator.submit(context, live, slow, "live", [], 0.0)
+        assert slow.started.wait(5) # the worker holds job 1
+        assert evaluator.submit(context, live, slow, "live", [], 0.0) # job 2 waits in the queue
+
+        started = time.perf_counter()
+        assert not evaluator.submit(context, live, slow, "live", [], 0.0)
+        assert time.perf_counter() - started < 0.01
+        assert evaluator.dropped == 1
+    finally:
+        slow.release.set()
+        evaluator.stop()
+
+def test_route_splits_by_key():
+    registry = ModelRegistry(model_dir=MODEL_DIR, pinned="v1", ab_split=ABSplit(percent=0))
+    registry.active = RecommendationEngine(V1, "v1")
+    assert registry.route("farmer-1") == (registry.active, None, "live")
+
+    registry.candidate = RecommendationEngine(V1, "v2")
+    assert registry.route("farmer-1") == (registry.active, registry.candidate, "live")
+    registry.ab_split.percent = 100
+    assert registry.route("farmer-1") == (registry.candidate, registry.active, "candidate")
+    assert registry.route(None) == (registry.active, registry.candidate, "live")
+
+def test_candidate_arm_serves_candidate_version(monkeypatch):
+    monkeypatch.setattr(model_registry, "candidate", RecommendationEngine(V1, "v2"))
+    monkeypatch.setattr(model_registry, "ab_split", ABSplit(percent=100))
+    client = TestClient(app)
+    body = {"soilType": "Loamy"}
+
+    assert client.post("/recommendations", json=body, headers={"X-Session-Id": "s-1"}).headers["X-Model-Version"] == "v2"
+    assert client.post("/recommendations", json=body).headers["X-Model-Version"] == model_registry.active.version
+    assert client.get("/models").json()["candidate"] == "v2"
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel
+
+from app.database import create_async_db_engine, create_db_engine
+from app.dependencies import get_current_user
+from app.main import app
+from app.schemas import FarmerContext, User
+from app.services.outcome_log import iter_outcomes, log_outcome
+from app.services.recommendation_engine import CROP_ENCODER_FILE, FEATURE_MODEL_FILE, MODEL_DIR, RecommendationEngine
+from train_crop_model import outcome_chunks, train, train_incremental
+
+@pytest.fixture
+def engines(tmp_path):
+    url = f"sqlite:///{tmp_path}/outcomes.db"
+    engine = create_db_engine(url)
+    SQLModel.metadata.create_all(engine)
+    return engine, create_async_db_engine(url)
+
+def log(async_engine, rows):
+    """Rows are (context, crop) or (context, crop, user_id)."""
+    async def run():
+        ids = [await log_outcome(*row, engine=async_engine) for row in rows]
+        await async_engine.dispose()
+        return ids
+    return asyncio.run(run())
+
+def test_outcomes_are_read_back_in_chunks(engines):
+    engine, async_engine = engines
+    ids = log(async_engine, [(FarmerContext(soilType=" Black", season="Rabi", nitrogen=i), "Wheat ") for i in range(5)])
+    chunks = list(iter_outcomes(after_id=ids[0], chunk_size=2, engine=engine))
+    assert [len(c) for c in chunks] == [2, 2]
+    assert chunks[0][0].soil_type == "black" and chunks[0][0].crop == "wheat" and chunks[0][0].nitrogen == 1
+
+def test_incremental_adds_trees_fit_on_new_rows(engines, tmp_path):
+    engine, async_engine = engines
+    base = tmp_path / "v1"
+    shutil.copytree(os.path.join(MODEL_DIR, "v1"), base)
+    before = joblib.load(base / FEATURE_MODEL_FILE)
+    trees = len(before["model"].estimators_)
+
+    rows = [(FarmerContext(soilType="Black", temperature=40 + i % 3, nitrogen=5), "Maize", i) for i in range(200)]
+    rows.append((FarmerContext(soilType="Black"), "Rye", 200)) # unknown to the crop encoder
+    ids = log(async_engine, rows)
+
+    artifact = train_incremental(str(base), engine=engine, n_jobs=1)
+    model = artifact["model"]
+    assert len(model.estimators_) == trees + artifact["metrics"]["incremental"]["trees_added"]
+    assert np.array_equal(model.classes_, before["model"].classes_)
+    assert artifact["outcome_id"] == ids[-1]
+    assert artifact["metrics"]["incremental"]["skipped"] == 1
+    # Old trees are untouched: the new forest's output is a weighted mix of old and new
+    X = np.array([[0, 41, 50, 40, 5, 10, 10]])
+    new_trees = np.mean([t.predict_proba(X) for t in model.estimators_[trees:]], axis=0)
+    expected = (before["model"].predict_proba(X) * trees + new_trees * (len(model.estimators_) - trees)) / len(model.estimators_)
+    np.testing.assert_allclose(model.predict_proba(X), expected)
+
+    # The result still compiles and serves
+    serving = RecommendationEngine(str(base), "v1", use_artifacts=False)
+    serving.load_feature_model(artifact)
+    assert serving.get_recommendations(FarmerContext(soilType="Black", temperature=41, nitrogen=5))
+
+    joblib.dump(artifact, base / FEATURE_MODEL_FILE)
+    with pytest.raises(ValueError):
+        train_incremental(str(base), engine=engine, n_jobs=1)
+
+def test_full_training_includes_outcomes(engines, tmp_path):
+    engine, async_engine = engines
+    log(async_engine, [(FarmerContext(soilType="Red", humidity=55), "Pulses", user) for user in range(10)])
+    artifact = train(os.path.join(MODEL_DIR, "v1"), engine=engine, n_jobs=1)
+    assert artifact["rows"] == 8010 and artifact["outcome_id"] == 10
+    assert all(np.isfinite(value) for value in artifact["defaults"].values()) # NaN measurements were filled
+
+def test_one_account_cannot_dominate_the_outcomes(engines):
+    engine, async_engine = engines
+    log(async_engine, [(FarmerContext(soilType="Black", nitrogen=i), "Maize", 1) for i in range(5)]
+        + [(FarmerContext(soilType="Black", nitrogen=0), "Maize", 1)] * 3 # repeats of one report
+        + [(FarmerContext(soilType="Black", nitrogen=0), "Maize", 2)])
+    limited = {"duplicates": 0, "over_quota": 0}
+    crops = [crop for _, chunk_crops, _, _ in outcome_chunks(engine=engine, per_user=3, chunk_size=4, limited=limited) for crop in chunk_crops]
+    assert len(crops) == 4 # three from user 1, one from user 2
+    assert limited == {"duplicates": 3, "over_quota": 2}
+
+def test_incremental_skips_crops_the_forest_was_not_fit_on(engines, tmp_path):
+    engine, async_engine = engines
+    base = tmp_path / "v1"
+    shutil.copytree(os.path.join(MODEL_DIR, "v1"), base)
+    # The encoder learns a crop the forest has no trees for
+    crop_encoder = joblib.load(base / CROP_ENCODER_FILE)
+    crop_encoder.classes_ = np.append(crop_encoder.classes_, "yam")
+    joblib.dump(crop_encoder, base / CROP_ENCODER_FILE)
+    classes = joblib.load(base / FEATURE_MODEL_FILE)["model"].classes_
+
+    log(async_engine, [(FarmerContext(soilType="Black", nitrogen=i), "Yam", i) for i in range(3)])
+    with pytest.raises(ValueError):
+        train_incremental(str(base), engine=engine, n_jobs=1)
+
+    log(async_engine, [(FarmerContext(soilType="Red", nitrogen=i), "Maize", i) for i in range(20)])
+    artifact = train_incremental(str(base), engine=engine, n_jobs=1)
+    assert artifact["metrics"]["incremental"]["rows"] == 20
+    assert artifact["metrics"]["incremental"]["skipped"] == 3
+    assert np.array_equal(artifact["model"].classes_, classes)
+
+def test_outcome_endpoint_validates_labels():
+    client = TestClient(app)
+    context = {"context": {"soilType": "Loamy"}, "crop": "Maize"}
+    assert client.post("/recommendations/outcomes", json=context).status_code == 401
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, phone="+910000000001")
+    try:
+        assert client.post("/recommendations/outcomes", json={"context": {"soilType": "Loamy"}, "crop": "Rye"}).status_code == 400
+        assert client.post("/recommendations/outcomes", json={"context": {"soilType": "Mars"}, "crop": "Maize"}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
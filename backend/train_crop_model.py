@@ -0,0 +1,240 @@
+"""
+Train the multi-feature crop model (soil type, temperature, humidity, moisture, N, P, K)
+on datasets/Crop_and_Soil_Dataset.csv plus the outcomes logged through
+POST /recommendations/outcomes, and save it as a new model version:
+models/<version>/ gets a copy of the base version's soil model and encoders plus
+the new crop_feature_model.pkl, exported to .npy artifacts (see
+export_model_artifacts.py). Activate it with POST /models/<version>/activate.
+
+With --incremental the base version's forest is kept and only new trees are
+fit, on the outcomes logged since the base was trained. Every tree is walked
+per request, so retrain from scratch now and then to keep the forest small.
+
+Usage: python train_crop_model.py [--base v1] [--version v2] [--incremental [--add-trees N]] [--jobs N] [dataset_csv]
+"""
+import argparse
+import itertools
+import os
+import shutil
+from typing import Iterator
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from app.database import create_db_and_tables, engine as db_engine
+from app.services.dataset_cache import CACHE_SUFFIX, CROP_SOIL_DATASET, load_dataset as load_columns
+from app.services.model_registry import ModelRegistry
+from app.services.outcome_log import OUTCOME_CHUNK_SIZE, iter_outcomes
+from app.services.recommendation_engine import CLIMATE_FIELDS, CROP_ENCODER_FILE, FEATURE_MODEL_FILE, MANIFEST_FILE, SOIL_ENCODER_FILE
+from export_model_artifacts import export_version
+
+DATASET_PATH = CROP_SOIL_DATASET
+# Dataset column for each FarmerContext field (the CSV spells it "Temparature")
+DATASET_COLUMNS = {
+    "temperature": "Temparature",
+    "humidity": "Humidity",
+    "moisture": "Moisture",
+    "nitrogen": "Nitrogen",
+    "potassium": "Potassium",
+    "phosphorous": "Phosphorous",
+}
+# Dataset rows encoded per step
+TRAIN_CHUNK_SIZE = 5000
+# Distinct outcomes one account contributes to a training run (rows logged without a user share one quota)
+MAX_OUTCOMES_PER_USER = int(os.getenv("MAX_OUTCOMES_PER_USER", 50))
+N_ESTIMATORS = 25
+
+def dataset_chunks(path: str, chunk_size: int = TRAIN_CHUNK_SIZE) -> Iterator[tuple]:
+    """(soil labels, crop labels, measurement matrix, None) per slice of the dataset's columnar cache."""
+    dataset = load_columns(path)
+    soils, crops = dataset["Soil Type"], dataset["Crop Type"]
+    for start in range(0, len(dataset), chunk_size):
+        stop = start + chunk_size
+        climate = np.column_stack([dataset[DATASET_COLUMNS[field]][start:stop] for field in CLIMATE_FIELDS]).astype(float)
+        yield [s.lower() for s in soils[start:stop]], [c.lower() for c in crops[start:stop]], climate, None
+
+def outcome_chunks(after_id: int = 0, chunk_size: int = OUTCOME_CHUNK_SIZE, engine=db_engine,
+                   per_user: int = MAX_OUTCOMES_PER_USER, limited: dict = None) -> Iterator[tuple]:
+    """
+    Same as dataset_chunks for logged outcomes with id > after_id; missing
+    measurements are NaN. Ends with the chunk's last id. So no single account
+    decides what a retrain learns, repeats of a user's (context, crop) and a
+    user's outcomes beyond `per_user` are left out, counted in `limited`.
+    """
+    limited = {"duplicates": 0, "over_quota": 0} if limited is None else limited
+    seen, counts = set(), {}
+    for chunk in iter_outcomes(after_id, chunk_size, engine):
+        kept = []
+        for o in chunk:
+            key = (o.user_id, o.soil_type, o.season, o.crop) + tuple(getattr(o, field) for field in CLIMATE_FIELDS)
+            if key in seen:
+                limited["duplicates"] += 1
+            elif counts.get(o.user_id, 0) >= per_user:
+                limited["over_quota"] += 1
+            else:
+                seen.add(key)
+                counts[o.user_id] = counts.get(o.user_id, 0) + 1
+                kept.append(o)
+        climate = np.array([[np.nan if getattr(o, field) is None else getattr(o, field) for field in CLIMATE_FIELDS] for o in kept])
+        yield [o.soil_type for o in kept], [o.crop for o in kept], climate.reshape(len(kept), len(CLIMATE_FIELDS)), chunk[-1].id
+
+def encode(chunks, soil_encoder, crop_encoder) -> tuple:
+    """
+    (X, y, skipped rows, last outcome id) from labelled chunks, encoded with the
+    base version's encoders so codes mean the same thing in every version.
+    Rows whose soil or crop the encoders do not know are skipped.
+    """
+    X_parts, y_parts, skipped, last_id = [], [], 0, None
+    for soils, crops, climate, chunk_last_id in chunks:
+        soils, crops = np.asarray(soils), np.asarray(crops)
+        known = np.isin(soils, soil_encoder.classes_) & np.isin(crops, crop_encoder.classes_)
+        skipped += int((~known).sum())
+        # LabelEncoder classes are sorted, so searchsorted is its transform()
+        X_parts.append(np.column_stack([np.searchsorted(soil_encoder.classes_, soils[known]), climate[known]]))
+        y_parts.append(np.searchsorted(crop_encoder.classes_, crops[known]))
+        last_id = chunk_last_id if chunk_last_id is not None else last_id
+    if not X_parts:
+        return np.empty((0, 1 + len(CLIMATE_FIELDS))), np.empty(0, dtype=np.intp), skipped, last_id
+    return np.concatenate(X_parts), np.concatenate(y_parts), skipped, last_id
+
+def fill_missing(X: np.ndarray, defaults: dict) -> np.ndarray:
+    """Missing measurements take the training median, as they do at serving time."""
+    for i, field in enumerate(CLIMATE_FIELDS):
+        column = X[:, i + 1]
+        column[np.isnan(column)] = defaults[field]
+    return X
+
+def top_k_accuracy(probs, y, classes, k: int) -> float:
+    top = classes[np.argsort(probs, axis=1)[:, -k:]]
+    return float(np.mean([label in row for label, row in zip(y, top)]))
+
+def load_encoders(base_dir: str) -> tuple:
+    return joblib.load(os.path.join(base_dir, SOIL_ENCODER_FILE)), joblib.load(os.path.join(base_dir, CROP_ENCODER_FILE))
+
+def train(base_dir: str, dataset_path: str = DATASET_PATH, engine=db_engine, n_jobs: int = -1,
+          chunk_size: int = TRAIN_CHUNK_SIZE) -> dict:
+    """A new forest on the dataset plus every logged outcome."""
+    soil_encoder, crop_encoder = load_encoders(base_dir)
+    limited = {"duplicates": 0, "over_quota": 0}
+    chunks = itertools.chain(dataset_chunks(dataset_path, chunk_size), outcome_chunks(0, chunk_size, engine, limited=limited))
+    X, y, skipped, last_id = encode(chunks, soil_encoder, crop_encoder)
+    defaults = {field: float(np.nanmedian(X[:, i + 1])) for i, field in enumerate(CLIMATE_FIELDS)}
+    X = fill_missing(X, defaults)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    # Shallow trees with large leaves: the compiled path walks every tree per request
+    model = RandomForestClassifier(n_estimators=N_ESTIMATORS, max_depth=8, min_samples_leaf=20, random_state=42, n_jobs=n_jobs)
+    model.fit(X_train, y_train)
+    probs = model.predict_proba(X_test)
+    metrics = {
+        "accuracy": float(np.mean(model.classes_[probs.argmax(axis=1)] == y_test)),
+        "top3_accuracy": top_k_accuracy(probs, y_test, model.classes_, 3),
+        "chance": 1.0 / len(model.classes_),
+        "outcomes_left_out": limited,
+    }
+
+    # Refit on everything for serving
+    model.fit(X, y)
+    model.n_jobs = 1
+    return {
+        "model": model, "features": ("soil_enc",) + CLIMATE_FIELDS, "defaults": defaults, "metrics": metrics,
+        "rows": len(y), "skipped": skipped, "outcome_id": last_id or 0,
+    }
+
+def train_incremental(base_dir: str, engine=db_engine, add_trees: int = None, n_jobs: int = -1,
+                      chunk_size: int = OUTCOME_CHUNK_SIZE) -> dict:
+    """
+    The base version's forest plus new trees fit only on outcomes logged after
+    the ones it was trained on (RandomForest warm_start). By default the new
+    trees' share of the forest matches the new rows' share of all training rows.
+    """
+    artifact = joblib.load(os.path.join(base_dir, FEATURE_MODEL_FILE))
+    soil_encoder, crop_encoder = load_encoders(base_dir)
+    after_id = artifact.get("outcome_id", 0)
+    limited = {"duplicates": 0, "over_quota": 0}
+    X, y, skipped, last_id = encode(outcome_chunks(after_id, chunk_size, engine, limited=limited), soil_encoder, crop_encoder)
+    model = artifact["model"]
+    # The encoder can know crops the forest was never fit on; its trees have no output for them
+    fitted = np.isin(y, model.classes_)
+    skipped += int((~fitted).sum())
+    X, y = X[fitted], y[fitted]
+    if not len(y):
+        raise ValueError(f"No new outcomes after id {after_id} ({skipped} skipped, {sum(limited.values())} over the per-user limit)")
+    X = fill_missing(X, artifact["defaults"])
+
+    trees = len(model.estimators_)
+    base_rows = artifact.get("rows") or len(load_columns(DATASET_PATH))
+    add_trees = add_trees or max(1, round(trees * len(y) / base_rows))
+    accuracy_before = float(np.mean(model.predict(X) == y))
+
+    # fit() takes classes_ from y, so every class must appear; zero-weight rows
+    # for the ones missing from the new data are never placed in a tree
+    classes = model.classes_.copy()
+    missing = np.setdiff1d(classes, y)
+    X_fit = np.vstack([X, np.repeat(X[:1], len(missing), axis=0)])
+    y_fit = np.concatenate([y, missing])
+    weights = np.concatenate([np.ones(len(y)), np.zeros(len(missing))])
+    model.set_params(warm_start=True, n_estimators=trees + add_trees, n_jobs=n_jobs)
+    model.fit(X_fit, y_fit, sample_weight=weights)
+    model.set_params(warm_start=False, n_jobs=1)
+    if not np.array_equal(model.classes_, classes):
+        raise RuntimeError("Incremental fit changed the forest's classes; the old trees no longer line up")
+
+    metrics = dict(artifact["metrics"])
+    metrics["incremental"] = {
+        "rows": len(y),
+        "skipped": skipped,
+        "left_out": limited,
+        "trees_added": add_trees,
+        "trees": trees + add_trees,
+        # In-sample: these rows were just fit
+        "new_rows_accuracy_before": accuracy_before,
+        "new_rows_accuracy_after": float(np.mean(model.predict(X) == y)),
+    }
+    return {**artifact, "model": model, "metrics": metrics, "rows": base_rows + len(y), "outcome_id": last_id}
+
+def next_version(versions: list) -> str:
+    numbers = [int(v[1:]) for v in versions if v[:1] == "v" and v[1:].isdigit()]
+    return f"v{max(numbers, default=0) + 1}"
+
+def main():
+    registry = ModelRegistry()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", nargs="?", default=DATASET_PATH)
+    parser.add_argument("--base", default=registry.target_version(), help="version whose soil model and encoders are reused")
+    parser.add_argument("--version", default=next_version(registry.versions()), help="name of the new version")
+    parser.add_argument("--incremental", action="store_true", help="add trees fit on outcomes logged since the base version")
+    parser.add_argument("--add-trees", type=int, help="trees to add with --incremental (default: proportional to the new rows)")
+    parser.add_argument("--jobs", type=int, default=-1, help="training processes (default: all cores)")
+    args = parser.parse_args()
+
+    base_dir = os.path.join(registry.model_dir, args.base)
+    out_dir = os.path.join(registry.model_dir, args.version)
+    if os.path.exists(out_dir):
+        parser.error(f"{out_dir} already exists")
+
+    create_db_and_tables()
+    if args.incremental:
+        artifact = train_incremental(base_dir, add_trees=args.add_trees, n_jobs=args.jobs)
+    else:
+        artifact = train(base_dir, args.dataset, n_jobs=args.jobs)
+    # Build next to the target and rename, so the registry never lists a half-written version
+    tmp_dir = os.path.join(registry.model_dir, f".{args.version}.tmp")
+    shutil.copytree(base_dir, tmp_dir, ignore=shutil.ignore_patterns(FEATURE_MODEL_FILE, MANIFEST_FILE, "*.npy", "*" + CACHE_SUFFIX + "*"))
+    joblib.dump(artifact, os.path.join(tmp_dir, FEATURE_MODEL_FILE), compress=3)
+    export_version(tmp_dir, args.version)
+    os.rename(tmp_dir, out_dir)
+
+    m = artifact["metrics"]
+    if args.incremental:
+        inc = m["incremental"]
+        print(f"Added {inc['trees_added']} trees ({inc['trees']} total) fit on {inc['rows']} new outcomes, {inc['skipped']} skipped, "
+              f"{sum(inc['left_out'].values())} left out by the per-user limit")
+        print(f"Accuracy on the new rows {inc['new_rows_accuracy_before']:.3f} -> {inc['new_rows_accuracy_after']:.3f} (in-sample)")
+    else:
+        print(f"Trained on {artifact['rows']} rows ({artifact['skipped']} skipped, outcomes through id {artifact['outcome_id']})")
+        print(f"Hold-out accuracy {m['accuracy']:.3f} (top-3 {m['top3_accuracy']:.3f}, chance {m['chance']:.3f})")
+    print(f"Saved model version {args.version} to {out_dir}")
+
+if __name__ == "__main__":
+    main()